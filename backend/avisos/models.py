@@ -1,6 +1,9 @@
 from django.db import models
 
-class Aviso(models.Model):
+from crminm.modelos import ValoresCargadosMixin
+
+
+class Aviso(ValoresCargadosMixin, models.Model):
     ESTADOS = [
         ("pendiente", "Pendiente"),
         ("completado", "Completado"),
@@ -0,0 +1,148 @@
+# avisos/realtime.py
+"""
+Pub/sub de cambios de avisos por owner (para el stream SSE de avisos/views.py).
+
+- LocalBroker: fan-out en proceso (una asyncio.Queue por conexión abierta).
+  Es el default y alcanza con un solo proceso ASGI.
+- RedisBroker: si settings.AVISOS_PUBSUB_URL está configurado y `redis` instalado,
+  publica en Redis y cada proceso re-distribuye localmente lo que recibe. Un solo
+  listener por proceso (thread propio), aunque haya conexiones en varios event loops:
+  cada mensaje llega una vez a cada conexión.
+
+Las signals (sync, en cualquier thread) llaman a `publish()`; las conexiones SSE
+(async) leen de su cola. Sin cambios no hay trabajo ni queries.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Cuántos eventos pendientes bufferear por conexión (si se llena, se descartan:
+# el cliente igual refresca al recibir el siguiente)
+QUEUE_MAXSIZE = 100
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}  # owner_id -> set[(loop, queue)]
+
+    def subscribe(self, owner_id) -> asyncio.Queue:
+        """Registra una conexión del owner (debe llamarse desde el event loop)."""
+        queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        with self._lock:
+            self._subs.setdefault(owner_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, owner_id, queue):
+        with self._lock:
+            subs = self._subs.get(owner_id)
+            if not subs:
+                return
+            subs.difference_update({s for s in subs if s[1] is queue})
+            if not subs:
+                del self._subs[owner_id]
+
+    def publish(self, owner_id, event: dict):
+        self._deliver(owner_id, event)
+
+    def _deliver(self, owner_id, event: dict):
+        with self._lock:
+            targets = list(self._subs.get(owner_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_put_nowait, queue, event)
+            except RuntimeError:
+                pass  # loop cerrado: la conexión ya no existe (se desuscribe al cerrar)
+
+    def connection_count(self, owner_id=None) -> int:
+        with self._lock:
+            if owner_id is not None:
+                return len(self._subs.get(owner_id, ()))
+            return sum(len(s) for s in self._subs.values())
+
+
+def _put_nowait(queue: asyncio.Queue, event: dict):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+class RedisBroker(LocalBroker):
+    channel_prefix = "avisos:"
+
+    def __init__(self, url: str):
+        import redis  # dependencia opcional
+
+        super().__init__()
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, owner_id, event: dict):
+        try:
+            self._redis.publish(f"{self.channel_prefix}{owner_id}", json.dumps(event))
+        except Exception:
+            logger.exception("No se pudo publicar en Redis; entrego solo localmente")
+            self._deliver(owner_id, event)
+
+    def subscribe(self, owner_id) -> asyncio.Queue:
+        self._ensure_listener()
+        return super().subscribe(owner_id)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="avisos-redis", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(f"{self.channel_prefix}*")
+            for msg in pubsub.listen():
+                if msg.get("type") != "pmessage":
+                    continue
+                try:
+                    channel = msg["channel"].decode() if isinstance(msg["channel"], bytes) else msg["channel"]
+                    owner_id = int(channel[len(self.channel_prefix):])
+                    self._deliver(owner_id, json.loads(msg["data"]))
+                except Exception:
+                    logger.exception("Mensaje de avisos inválido en Redis")
+        except Exception:
+            # La próxima conexión que se suscriba vuelve a levantar el listener
+            logger.exception("Se cortó la suscripción de avisos en Redis")
+        finally:
+            pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, "AVISOS_PUBSUB_URL", None)
+                if url:
+                    try:
+                        _broker = RedisBroker(url)
+                    except ImportError:
+                        logger.warning("AVISOS_PUBSUB_URL configurado pero falta 'redis'; uso pub/sub local")
+                if _broker is None:
+                    _broker = LocalBroker()
+    return _broker
+
+
+def publish(owner_id, event: dict):
+    """Publica un cambio para el owner (no-op si no hay owner)."""
+    if owner_id is None:
+        return
+    get_broker().publish(owner_id, event)
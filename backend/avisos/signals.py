@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from leads import versiones
+from leads.models import Contacto, Evento, proximo_contacto_label
+from .models import Aviso
+from .realtime import publish
+
+
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def _publish_on_commit(owner_id, event: dict):
+    # Solo avisamos cambios confirmados (si la transacción se revierte, no hubo cambio)
+    if owner_id is not None:
+        transaction.on_commit(lambda: publish(owner_id, event))
+
+
+def _aviso_owner_id(aviso: Aviso):
+    """Owner del aviso vía el lead (o el evento). Usa lo ya cargado antes de ir a la DB."""
+    cache = aviso._state.fields_cache
+    if cache.get("lead") is not None:
+        return cache["lead"].owner_id
+    if cache.get("evento") is not None:
+        return cache["evento"].owner_id
+    if aviso.lead_id:
+        return Contacto.objects.filter(pk=aviso.lead_id).values_list("owner_id", flat=True).first()
+    if aviso.evento_id:
+        return Evento.objects.filter(pk=aviso.evento_id).values_list("owner_id", flat=True).first()
+    return None
+
+
+# =========================
+# Contacto: cambia de bucket
+# =========================
+@receiver(post_save, sender=Contacto, dispatch_uid="avisos_stream_contacto_saved_v1")
+@receiver(post_delete, sender=Contacto, dispatch_uid="avisos_stream_contacto_deleted_v1")
+def _stream_contacto(sender, instance: Contacto, **kwargs):
+    deleted = "created" not in kwargs
+    # Solo lo ya cargado: un save con .only(...) no debe disparar lecturas diferidas
+    loaded = instance.__dict__
+    _publish_on_commit(instance.owner_id, {
+        "recurso": "contacto",
+        "accion": "eliminado" if deleted else "guardado",
+        "id": instance.id,
+        "next_contact_at": _iso(loaded.get("next_contact_at")),
+        "last_contact_at": _iso(loaded.get("last_contact_at")),
+        "proximo_contacto_estado": (
+            proximo_contacto_label(loaded["next_contact_at"])
+            if not deleted and "next_contact_at" in loaded else None
+        ),
+    })
+
+
+@receiver(post_save, sender=Evento, dispatch_uid="avisos_stream_evento_saved_v1")
+@receiver(post_delete, sender=Evento, dispatch_uid="avisos_stream_evento_deleted_v1")
+def _stream_evento(sender, instance: Evento, **kwargs):
+    _publish_on_commit(instance.owner_id, {
+        "recurso": "evento",
+        "accion": "guardado" if "created" in kwargs else "eliminado",
+        "id": instance.id,
+        "contacto": instance.contacto_id,
+        "fecha_hora": _iso(instance.fecha_hora),
+    })
+
+
+@receiver(post_save, sender=Aviso, dispatch_uid="avisos_stream_aviso_saved_v1")
+@receiver(post_delete, sender=Aviso, dispatch_uid="avisos_stream_aviso_deleted_v1")
+def _stream_aviso(sender, instance: Aviso, **kwargs):
+    owner_id = _aviso_owner_id(instance)
+    versiones.incrementar(owner_id, "avisos")  # ETag de /api/avisos/
+    _publish_on_commit(owner_id, {
+        "recurso": "aviso",
+        "accion": "guardado" if "created" in kwargs else "eliminado",
+        "id": instance.id,
+        "estado": instance.estado,
+        "fecha": _iso(instance.fecha),
+        "lead": instance.lead_id,
+    })
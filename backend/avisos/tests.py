@@ -1,3 +1,208 @@
-from django.test import TestCase
+import asyncio
+import os
+import threading
+import time
+import tracemalloc
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.client import AsyncRequestFactory
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from leads.models import Contacto
+from leads.tests import PresupuestoQueriesMixin
+
+from . import views
+from .realtime import LocalBroker, RedisBroker, get_broker
+
+User = get_user_model()
+
+# Benchmarks (lentos, imprimen tiempos): CRMINM_BENCH=1 python manage.py test avisos
+BENCH = bool(os.environ.get("CRMINM_BENCH"))
+
+
+# === Autenticación del stream SSE ===
+class StreamTicketTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+
+    def autenticar(self, **params):
+        request = AsyncRequestFactory().get("/api/avisos/stream/", params)
+        return async_to_sync(views._authenticate_stream)(request)
+
+    def pedir_ticket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/avisos/stream/ticket/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["ticket"]
+
+    def test_ticket_abre_el_stream(self):
+        self.assertEqual(self.autenticar(ticket=self.pedir_ticket()), self.user)
+
+    def test_ticket_requiere_autenticacion(self):
+        self.assertEqual(APIClient().post("/api/avisos/stream/ticket/").status_code, 401)
+
+    def test_ticket_vencido(self):
+        ticket = self.pedir_ticket()
+        with mock.patch.object(views, "STREAM_TICKET_SECONDS", -1):
+            self.assertIsNone(self.autenticar(ticket=ticket))
+
+    def test_ticket_de_otro_proposito_o_adulterado(self):
+        self.assertIsNone(self.autenticar(ticket=signing.dumps({"u": self.user.pk})))
+        self.assertIsNone(self.autenticar(ticket=self.pedir_ticket() + "x"))
+
+    def test_jwt_en_la_url_no_se_acepta(self):
+        jwt = str(AccessToken.for_user(self.user))
+        self.assertIsNone(self.autenticar(token=jwt))
+        self.assertIsNone(self.autenticar(ticket=jwt))
+
+    def test_jwt_en_el_header(self):
+        jwt = str(AccessToken.for_user(self.user))
+        request = AsyncRequestFactory().get("/api/avisos/stream/", headers={"Authorization": f"Bearer {jwt}"})
+        self.assertEqual(async_to_sync(views._authenticate_stream)(request), self.user)
+
+
+class StreamTests(TransactionTestCase):
+    """Punta a punta: ticket => stream abierto => un cambio confirmado llega como evento."""
+
+    async def test_cambio_llega_por_el_stream(self):
+        user = await User.objects.acreate(username="agente")
+        ticket = signing.dumps({"u": user.pk}, salt=views.STREAM_TICKET_SALT)
+        sin_ticket = await views.avisos_stream(AsyncRequestFactory().get("/api/avisos/stream/"))
+        self.assertEqual(sin_ticket.status_code, 401)
+
+        response = await views.avisos_stream(AsyncRequestFactory().get("/api/avisos/stream/", {"ticket": ticket}))
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        self.assertEqual(await anext(stream), b"event: ready\ndata: {}\n\n")
+        self.assertEqual(get_broker().connection_count(user.pk), 1)
+
+        await Contacto.objects.acreate(owner=user, nombre="Juan")
+        self.assertTrue((await asyncio.wait_for(anext(stream), 2)).startswith(b"event: avisos\n"))
+        # el cliente se desconecta: el handler ASGI cancela la lectura del stream
+        lectura = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        lectura.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await lectura
+        self.assertEqual(get_broker().connection_count(user.pk), 0)
+
+
+# === Pub/sub de avisos (avisos/realtime.py) ===
+class _Suscriptor(threading.Thread):
+    """Una conexión SSE en su propio event loop: junta lo que recibe durante `segundos`."""
+
+    def __init__(self, broker, owner_id, segundos=0.5):
+        super().__init__(daemon=True)
+        self.broker, self.owner_id, self.segundos = broker, owner_id, segundos
+        self.listo = threading.Event()
+        self.recibidos = []
+
+    def run(self):
+        asyncio.run(self._escuchar())
+
+    async def _escuchar(self):
+        queue = self.broker.subscribe(self.owner_id)
+        self.listo.set()
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + self.segundos
+        try:
+            while (resta := fin - loop.time()) > 0:
+                try:
+                    self.recibidos.append(await asyncio.wait_for(queue.get(), resta))
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            self.broker.unsubscribe(self.owner_id, queue)
+
+
+def _difundir(broker, owner_id, event, conexiones=3, espera=0.0):
+    suscriptores = [_Suscriptor(broker, owner_id) for _ in range(conexiones)]
+    for s in suscriptores:
+        s.start()
+        s.listo.wait(5)
+    threading.Event().wait(espera)  # que el listener de Redis termine de suscribirse
+    broker.publish(owner_id, event)
+    for s in suscriptores:
+        s.join(5)
+    return [s.recibidos for s in suscriptores]
+
+
+class BrokerTests(TestCase):
+    def test_local_entrega_una_vez_por_conexion_en_cada_loop(self):
+        recibidos = _difundir(LocalBroker(), 7, {"recurso": "aviso"})
+        self.assertEqual(recibidos, [[{"recurso": "aviso"}]] * 3)
+
+    def test_local_loop_cerrado_no_rompe_la_entrega(self):
+        broker = LocalBroker()
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(asyncio.sleep(0))
+        queue = loop.run_until_complete(self._suscribir(broker, 7))
+        loop.close()  # conexión muerta sin desuscribirse
+        self.assertEqual(_difundir(broker, 7, {"n": 1}, conexiones=1), [[{"n": 1}]])
+        self.assertTrue(queue.empty())
+
+    @staticmethod
+    async def _suscribir(broker, owner_id):
+        return broker.subscribe(owner_id)
+
+    @skipUnless(os.environ.get("AVISOS_PUBSUB_URL"), "requiere Redis: AVISOS_PUBSUB_URL=redis://...")
+    def test_redis_entrega_una_vez_por_conexion_en_cada_loop(self):
+        broker = RedisBroker(os.environ["AVISOS_PUBSUB_URL"])
+        recibidos = _difundir(broker, 7, {"recurso": "aviso"}, espera=0.3)
+        self.assertEqual(recibidos, [[{"recurso": "aviso"}]] * 3)
+        self.assertEqual(sum(t.name == "avisos-redis" for t in threading.enumerate()), 1)
+
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class StreamConexionesBenchmark(SimpleTestCase):
+    """
+    N streams SSE abiertos del mismo owner (CRMINM_BENCH_N, 5000) con el LocalBroker:
+    memoria por conexión y latencia de un publish hasta que llega a todas.
+    SimpleTestCase: si un stream abierto tocara la DB, el test falla.
+    """
+
+    async def test_fan_out(self):
+        n = int(os.environ.get("CRMINM_BENCH_N", 5_000))
+        broker = LocalBroker()
+        with mock.patch.object(views, "get_broker", return_value=broker):
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            streams = [views._event_stream(7) for _ in range(n)]
+            for stream in streams:
+                await anext(stream)  # retry
+                await anext(stream)  # ready: ya suscripto
+            lecturas = [asyncio.ensure_future(anext(stream)) for stream in streams]
+            await asyncio.sleep(0.1)  # todas esperando en su cola
+            por_conexion = (tracemalloc.get_traced_memory()[0] - base) / n
+            tracemalloc.stop()
+            self.assertEqual(broker.connection_count(7), n)
+
+            inicio = time.perf_counter()
+            broker.publish(7, {"recurso": "aviso"})
+            recibidos = await asyncio.gather(*lecturas)
+            fan_out = (time.perf_counter() - inicio) * 1000
+            for stream in streams:
+                await stream.aclose()
+
+        self.assertTrue(all(r.startswith("event: avisos\n") for r in recibidos))
+        self.assertEqual(broker.connection_count(7), 0)
+        print(f"\n{n} conexiones: fan-out {fan_out:.1f} ms ({fan_out * 1000 / n:.1f} µs por conexión), "
+              f"{por_conexion / 1024:.1f} KiB por conexión")
+
+# === Presupuesto de queries (ver leads.tests.PresupuestoQueriesMixin) ===
+class PresupuestoQueriesTests(PresupuestoQueriesMixin, TestCase):
+    medir_staff = False  # AvisoViewSet filtra por lead__owner también para staff
+    urls = (
+        "/api/avisos/",
+        "/api/avisos/?fields=id&expand=lead",
+        "/api/avisos/?fields=id,titulo&expand=propiedad",
+        "/api/avisos/{aviso}/",
+    )
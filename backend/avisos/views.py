@@ -1,10 +1,25 @@
+import asyncio
+import json
+
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+
+from leads.campos import CamposListMixin
+from leads.versiones import ETagListMixin
+
 from .models import Aviso
+from .realtime import get_broker
 from .serializers import AvisoSerializer
 
-class AvisoViewSet(viewsets.ModelViewSet):
+class AvisoViewSet(ETagListMixin, CamposListMixin, viewsets.ModelViewSet):
     # Usamos IsAuthenticated para asegurar que solo usuarios logeados accedan
     permission_classes = [permissions.IsAuthenticated]
+    etag_recursos = ("avisos", "contactos", "propiedades")  # lead_detalle, propiedad_detalle
+    campos_expandibles = {"lead": "lead_detalle", "propiedad": "propiedad_detalle"}
     
     # Ordenamos por fecha, los más próximos primero
     queryset = Aviso.objects.all().order_by("fecha") 
@@ -26,7 +41,8 @@ class AvisoViewSet(viewsets.ModelViewSet):
             # 
             # Nota: Si tu modelo Aviso fue diseñado para tener el owner a través de Contacto,
             # lo correcto es buscar avisos donde el lead tenga al usuario como dueño.
-            return Aviso.objects.filter(lead__owner=user).order_by("fecha")
+            # lead_detalle / propiedad_detalle en la misma query
+            return Aviso.objects.filter(lead__owner=user).select_related("lead", "propiedad").order_by("fecha")
         
         # Devolver un QuerySet vacío si no hay usuario autenticado
         return Aviso.objects.none()
@@ -42,3 +58,84 @@ class AvisoViewSet(viewsets.ModelViewSet):
         else:
             # No permitir crear si no está autenticado
             raise permissions.PermissionDenied("Debes estar autenticado para crear un Aviso.")
+
+
+# =========================================
+# Stream SSE de cambios (reemplaza el polling de 60s del Topbar)
+# =========================================
+# 1) POST /api/avisos/stream/ticket/ (JWT en el header, como cualquier request) => {"ticket": ...}
+# 2) GET  /api/avisos/stream/?ticket=<ticket>
+# EventSource no permite headers: en la URL (logs, proxies, historial) va un ticket firmado
+# que solo sirve para abrir el stream y vence a los STREAM_TICKET_SECONDS, nunca el JWT.
+# Clientes que sí pueden mandar headers usan "Authorization: Bearer <JWT>" directamente.
+# Requiere servidor ASGI (crminm/asgi.py, p. ej. `uvicorn crminm.asgi:application`).
+STREAM_HEARTBEAT_SECONDS = 25
+STREAM_TICKET_SECONDS = 60
+STREAM_TICKET_SALT = "avisos.stream"
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def avisos_stream_ticket(request):
+    ticket = signing.dumps({"u": request.user.pk}, salt=STREAM_TICKET_SALT)
+    return Response({"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS})
+
+
+def _ticket_user_id(ticket):
+    try:
+        return signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_SECONDS)["u"]
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+async def _authenticate_stream(request):
+    from asgiref.sync import sync_to_async
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    ticket = request.GET.get("ticket")
+    if ticket:
+        user_id = _ticket_user_id(ticket)
+        if user_id is None:
+            return None
+        return await get_user_model().objects.filter(pk=user_id).afirst()
+
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    auth = JWTAuthentication()
+    try:
+        validated = auth.get_validated_token(header[len("Bearer "):])
+        return await sync_to_async(auth.get_user)(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def _event_stream(owner_id):
+    broker = get_broker()
+    queue = broker.subscribe(owner_id)
+    try:
+        yield "retry: 5000\n\n"
+        yield "event: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión (proxies) sin tocar la DB
+                yield ": ping\n\n"
+                continue
+            yield f"event: avisos\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(owner_id, queue)
+
+
+async def avisos_stream(request):
+    user = await _authenticate_stream(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "No autenticado"}, status=401)
+
+    resp = StreamingHttpResponse(_event_stream(user.id), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # nginx: no bufferear el stream
+    return resp
@@ -3,6 +3,10 @@ ASGI config for crminm project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Servir con un servidor ASGI (p. ej. ``uvicorn crminm.asgi:application``) para que
+el stream SSE de avisos (``/api/avisos/stream/``) mantenga conexiones abiertas sin
+ocupar un worker por pestaña.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -0,0 +1,47 @@
+# crminm/middleware.py
+import logging
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("crminm.sql")
+
+
+class SQLRepetidoMiddleware:
+    """
+    Solo desarrollo (se agrega con DEBUG, ver settings). Cuenta las consultas de cada
+    request por forma (el SQL sin parámetros) y registra en el logger "crminm.sql" las
+    que se repiten SQL_REPETIDO_UMBRAL veces o más: el síntoma de un N+1.
+
+    Los requests async (stream SSE) pasan sin contar.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.umbral = settings.SQL_REPETIDO_UMBRAL
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.get_response(request)
+
+        formas = Counter()
+
+        def contar(execute, sql, params, many, context):
+            formas[sql] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(contar):
+            response = self.get_response(request)
+
+        for sql, veces in formas.most_common():
+            if veces < self.umbral:
+                break
+            logger.warning("%s %s: %d veces la misma consulta: %s", request.method, request.path, veces, sql)
+        return response
@@ -0,0 +1,51 @@
+# crminm/modelos.py
+"""
+Helpers compartidos por los modelos de las apps (sin modelos propios).
+"""
+
+
+class ValoresCargadosMixin:
+    """
+    Seguimiento de cambios en memoria (sin re-SELECT en cada save): recuerda los valores
+    con que la instancia se cargó de la DB y, después de cada save(), los que se guardaron.
+    Las signals pre_save/post_save comparan contra eso para saber qué cambió.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores tal como vinieron de la DB (solo los cargados; los diferidos no están)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Las signals post_save ya compararon contra lo cargado; ahora lo guardado pasa a ser la base
+        update_fields = kwargs.get("update_fields")
+        fields = self._meta.concrete_fields
+        if update_fields is not None:
+            fields = [f for f in fields if f.name in update_fields or f.attname in update_fields]
+        loaded = getattr(self, "_loaded_values", None) or {}
+        loaded.update({f.attname: getattr(self, f.attname) for f in fields if f.attname in self.__dict__})
+        self._loaded_values = loaded
+
+    def loaded_value(self, attname, default=None):
+        """Valor de `attname` al cargarse/guardarse por última vez (o `default` si no se conoce)."""
+        return getattr(self, "_loaded_values", {}).get(attname, default)
+
+    def loaded_values(self, *attnames):
+        """Tupla de valores cargados de `attnames`, o None si falta alguno (hay que leer la fila)."""
+        loaded = getattr(self, "_loaded_values", {})
+        if not all(name in loaded for name in attnames):
+            return None
+        return tuple(loaded[name] for name in attnames)
+
+    def changed_fields(self) -> set[str]:
+        """attnames cuyo valor actual difiere del cargado. Campos no cargados no cuentan."""
+        loaded = getattr(self, "_loaded_values", None)
+        if not loaded:
+            return set()
+        return {
+            name for name, old in loaded.items()
+            if name in self.__dict__ and self.__dict__[name] != old
+        }
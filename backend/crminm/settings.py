@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'propiedades',
     'avisos',
     'exportacion',
+    'dashboard',
     'asistente.apps.AsistenteConfig',  # ← agregado
 
     'rest_framework',
@@ -41,6 +42,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Solo desarrollo: loguea las consultas SQL que se repiten en un request (N+1)
+SQL_REPETIDO_UMBRAL = int(os.environ.get("SQL_REPETIDO_UMBRAL", "5"))
+if DEBUG:
+    MIDDLEWARE.append("crminm.middleware.SQLRepetidoMiddleware")
+
 ROOT_URLCONF = 'crminm.urls'
 
 TEMPLATES = [
@@ -112,6 +118,42 @@ AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
 
+# Horario laboral para el buscador de huecos libres (/api/propiedades/{id}/slots/)
+AGENDA_HORARIO_LABORAL = {
+    "desde": "09:00",
+    "hasta": "19:00",
+    "dias": [0, 1, 2, 3, 4, 5],  # lunes=0 ... sábado=5
+}
+
+# Pub/sub del stream de avisos (SSE). Sin URL => broker local en proceso.
+# Con varios procesos ASGI: "redis://localhost:6379/0" (requiere el paquete `redis`).
+AVISOS_PUBSUB_URL = os.environ.get("AVISOS_PUBSUB_URL", "")
+
+# Cache (snapshots del dashboard, métricas). Sin URL => memoria local del proceso.
+# Con varios procesos: "redis://localhost:6379/1" (requiere el paquete `redis`).
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}
+        if CACHE_URL else
+        {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "OPTIONS": {"MAX_ENTRIES": 5000}}
+    ),
+}
+# ETag/304 de los listados, snapshots del dashboard (leads/versiones.py) y meses cerrados de
+# las métricas (exportacion/metricas.py) viven en el cache y se invalidan ahí, así que solo se
+# habilitan con un cache compartido. VERSIONES_EN_CACHE=1 las
+# fuerza con el cache local (un único proceso, p. ej. runserver).
+VERSIONES_EN_CACHE = bool(CACHE_URL) or os.environ.get("VERSIONES_EN_CACHE") == "1"
+
+# Procesos para normalizar filas en los imports en segundo plano (procesar_tareas).
+# 0/1 => en el mismo proceso. Conviene ~ cantidad de núcleos libres del worker.
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "0"))
+
+# Días que se guardan los tombstones del sync incremental (exportacion.Borrado).
+# `manage.py purgar_borrados` (cron diario) borra los más viejos; un cursor de antes de
+# eso recibe 410 y el cliente tiene que re-sincronizar todo (sin `since`).
+SYNC_RETENCION_DIAS = int(os.environ.get("SYNC_RETENCION_DIAS", "90"))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
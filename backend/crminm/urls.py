@@ -7,7 +7,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 # ViewSets existentes
-from avisos.views import AvisoViewSet
+from avisos.views import AvisoViewSet, avisos_stream, avisos_stream_ticket
 from leads.views import EstadoLeadViewSet, ContactoViewSet, EventoViewSet
 from propiedades.views import PropiedadViewSet
 
@@ -36,6 +36,10 @@ router.register(r"avisos", AvisoViewSet)
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # Stream SSE de avisos (antes del router: si no, "stream" matchea como pk)
+    path("api/avisos/stream/", avisos_stream, name="avisos-stream"),
+    path("api/avisos/stream/ticket/", avisos_stream_ticket, name="avisos-stream-ticket"),
+
     # API base (routers)
     path("api/", include(router.urls)),
 
@@ -0,0 +1,172 @@
+# dashboard/contadores.py
+"""
+Contadores del dashboard por tenant (ContadoresDashboard), mantenidos en forma incremental.
+
+- Cada escritura suma/resta su "aporte" (ver aporte_contacto / aporte_aviso) dentro de la
+  misma transacción: si se revierte, los contadores también.
+- Las signals de Contacto / Aviso aplican la diferencia entre el aporte anterior y el nuevo.
+  Los caminos en lote (import) miden las filas afectadas antes y después (ver medir()).
+- Si un tenant todavía no tiene fila, no se ajusta nada: leer() la arma desde cero.
+- `manage.py reconstruir_contadores` recalcula todo (por si algo escribió sin signals).
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from avisos.models import Aviso
+from leads.models import Contacto, EstadoLead
+
+from .models import ContadoresDashboard
+
+CAMPOS = ("total_contactos", "con_proximo", "avisos_pendientes", "avisos_atrasados")
+
+# Estados de aviso que se cuentan -> campo
+CAMPO_AVISO = {"pendiente": "avisos_pendientes", "atrasado": "avisos_atrasados"}
+
+
+def _estado(estado_id) -> str:
+    return f"estado:{estado_id or ''}"
+
+
+def aporte_contacto(estado_id, next_contact_at) -> Counter:
+    return Counter({"total_contactos": 1, "con_proximo": int(next_contact_at is not None), _estado(estado_id): 1})
+
+
+def aporte_aviso(estado) -> Counter:
+    campo = CAMPO_AVISO.get(estado)
+    return Counter({campo: 1}) if campo else Counter()
+
+
+def diferencia(antes: dict, despues: dict) -> dict:
+    """{owner_id: Counter} despues - antes (con negativos, a diferencia de Counter.__sub__)."""
+    deltas = defaultdict(Counter)
+    for owner_id, c in despues.items():
+        deltas[owner_id].update(c)
+    for owner_id, c in antes.items():
+        deltas[owner_id].subtract(c)
+    return deltas
+
+
+def medir(contactos=(), eventos=()) -> dict:
+    """
+    {owner_id: Counter} con el aporte actual (en la DB) de esos contactos y de los avisos
+    de esos eventos. Dos queries agrupadas como máximo.
+    """
+    total = defaultdict(Counter)
+    if contactos:
+        filas = (
+            Contacto.objects.filter(pk__in=list(contactos))
+            .values("owner_id", "estado_id")
+            .annotate(n=Count("id"), con_proximo=Count("next_contact_at"))
+            .order_by()
+        )
+        for f in filas:
+            c = total[f["owner_id"]]
+            c["total_contactos"] += f["n"]
+            c["con_proximo"] += f["con_proximo"]
+            c[_estado(f["estado_id"])] += f["n"]
+    if eventos:
+        filas = (
+            Aviso.objects.filter(evento_id__in=list(eventos), estado__in=list(CAMPO_AVISO))
+            .values("estado", owner_id=Coalesce("lead__owner_id", "evento__owner_id"))
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for f in filas:
+            total[f["owner_id"]][CAMPO_AVISO[f["estado"]]] += f["n"]
+    return total
+
+
+def aplicar(deltas: dict):
+    """Suma {owner_id: Counter} a los contadores (con lock de la fila del tenant)."""
+    for owner_id, delta in deltas.items():
+        delta = {k: v for k, v in delta.items() if v}
+        if owner_id is None or not delta:
+            continue
+        with transaction.atomic():
+            fila = ContadoresDashboard.objects.select_for_update().filter(owner_id=owner_id).first()
+            if fila is None:
+                # Sin fila no hay nada que ajustar: leer() la arma con lo que haya en la DB.
+                # (Tampoco hay que crearla acá: puede ser un usuario que se está borrando.)
+                continue
+            por_estado = dict(fila.por_estado)
+            for clave, n in delta.items():
+                if clave.startswith("estado:"):
+                    clave = clave.removeprefix("estado:")
+                    por_estado[clave] = por_estado.get(clave, 0) + n
+                    if not por_estado[clave]:
+                        del por_estado[clave]
+                else:
+                    setattr(fila, clave, getattr(fila, clave) + n)
+            fila.por_estado = por_estado
+            fila.save()
+
+
+def reconstruir(owner_id=None) -> int:
+    """Recalcula desde cero los contadores de un tenant (o de todos). Devuelve cuántos escribió."""
+    contactos = Contacto.objects.exclude(owner_id=None)
+    avisos = Aviso.objects.annotate(owner_id=Coalesce("lead__owner_id", "evento__owner_id"))
+    if owner_id is not None:
+        contactos = contactos.filter(owner_id=owner_id)
+        avisos = avisos.filter(owner_id=owner_id)
+    else:
+        avisos = avisos.exclude(owner_id=None)
+
+    filas = defaultdict(lambda: ContadoresDashboard(por_estado={}))
+    if owner_id is not None:
+        filas[owner_id] = ContadoresDashboard(por_estado={})  # fila aunque no tenga datos
+
+    for f in contactos.values("owner_id", "estado_id").annotate(n=Count("id"), cp=Count("next_contact_at")).order_by():
+        fila = filas[f["owner_id"]]
+        fila.total_contactos += f["n"]
+        fila.con_proximo += f["cp"]
+        fila.por_estado[str(f["estado_id"] or "")] = f["n"]
+    for f in avisos.filter(estado__in=list(CAMPO_AVISO)).values("owner_id", "estado").annotate(n=Count("id")).order_by():
+        fila = filas[f["owner_id"]]
+        setattr(fila, CAMPO_AVISO[f["estado"]], f["n"])
+
+    with transaction.atomic():
+        if owner_id is None:
+            ContadoresDashboard.objects.exclude(owner_id__in=list(filas)).delete()
+        for oid, fila in filas.items():
+            fila.owner_id = oid
+        # upsert (MySQL no acepta unique_fields: usa la PK/unique que choque)
+        ContadoresDashboard.objects.bulk_create(
+            filas.values(),
+            update_conflicts=True,
+            unique_fields=["owner"] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=[*CAMPOS, "por_estado", "actualizado_en"],
+        )
+    return len(filas)
+
+
+def leer(owner_id) -> dict:
+    """Los números del dashboard del tenant (una fila + el corte próximos/atrasados por "ahora")."""
+    fila = ContadoresDashboard.objects.filter(owner_id=owner_id).first()
+    if fila is None:
+        reconstruir(owner_id)
+        fila = ContadoresDashboard.objects.get(owner_id=owner_id)
+
+    # Próximos/atrasados dependen de la hora: rango sobre el índice (owner, next_contact_at)
+    atrasados = Contacto.objects.filter(owner_id=owner_id, next_contact_at__lt=timezone.now()).count()
+
+    fases = dict(EstadoLead.objects.values_list("id", "fase"))
+    por_estado = sorted(
+        (
+            # Como antes (Count("estado")): el grupo "sin estado" figura con total 0
+            {"estado__fase": fases.get(int(k)) if k else None, "total": n if k else 0}
+            for k, n in fila.por_estado.items() if n
+        ),
+        key=lambda e: (e["estado__fase"] is not None, e["estado__fase"] or ""),  # NULL primero, como en SQL
+    )
+    return {
+        "total_contactos": fila.total_contactos,
+        "contactos_por_estado": por_estado,
+        "proximos_contactos": fila.con_proximo - atrasados,
+        "atrasados": atrasados,
+        "avisos_pendientes": fila.avisos_pendientes,
+        "avisos_atrasados": fila.avisos_atrasados,
+    }
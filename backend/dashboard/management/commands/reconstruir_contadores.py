@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import snapshots
+from dashboard.contadores import CAMPOS, reconstruir
+from dashboard.models import ContadoresDashboard
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores del dashboard (ContadoresDashboard) desde los datos reales."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None, help="Solo este owner (id)")
+
+    def handle(self, *args, **opts):
+        qs = ContadoresDashboard.objects.all()
+        if opts["owner"] is not None:
+            qs = qs.filter(owner_id=opts["owner"])
+        antes = {f.owner_id: _valores(f) for f in qs}
+
+        total = reconstruir(opts["owner"])
+        snapshots.invalidar(opts["owner"])
+
+        distintos = sum(1 for f in qs.all() if antes.get(f.owner_id) not in (None, _valores(f)))
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores de {total} owners recalculados ({distintos} tenían diferencias)."
+        ))
+
+
+def _valores(fila):
+    return tuple(getattr(fila, c) for c in CAMPOS), {k: v for k, v in fila.por_estado.items() if v}
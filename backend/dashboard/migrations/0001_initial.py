@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadoresDashboard',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contadores_dashboard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_contactos', models.IntegerField(default=0)),
+                ('con_proximo', models.IntegerField(default=0)),
+                ('por_estado', models.JSONField(blank=True, default=dict)),
+                ('avisos_pendientes', models.IntegerField(default=0)),
+                ('avisos_atrasados', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import models
+
+
+# ✅ Contadores del dashboard por tenant (los mantienen las signals, ver contadores.py)
+class ContadoresDashboard(models.Model):
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="contadores_dashboard",
+    )
+    total_contactos = models.IntegerField(default=0)
+    # Contactos con next_contact_at (próximos + atrasados; el corte por "ahora" se hace al leer)
+    con_proximo = models.IntegerField(default=0)
+    # {"<estado_id>": n, "": n sin estado}
+    por_estado = models.JSONField(default=dict, blank=True)
+    avisos_pendientes = models.IntegerField(default=0)
+    avisos_atrasados = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Contadores de {self.owner_id}"
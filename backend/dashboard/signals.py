@@ -0,0 +1,155 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from avisos.models import Aviso
+from avisos.signals import _aviso_owner_id
+from leads import versiones
+from leads.models import Contacto, EstadoLead
+
+from . import contadores
+
+# Campos de Contacto que cambian su aporte a los contadores
+_CAMPOS_CONTACTO = {"owner", "owner_id", "estado", "estado_id", "next_contact_at"}
+
+
+# =========================================
+# Contacto
+# =========================================
+@receiver(pre_save, sender=Contacto, dispatch_uid="dashboard_contadores_contacto_previo_v1")
+def _contacto_previo(sender, instance: Contacto, update_fields=None, **kwargs):
+    """(owner, estado, next_contact_at) antes del save: de lo cargado o, si no se conoce, de la fila."""
+    instance._contadores_previo = None
+    if not instance.pk or instance._state.adding:
+        return
+    if update_fields is not None and not (set(update_fields) & _CAMPOS_CONTACTO):
+        instance._contadores_previo = _contacto_actual(instance)  # no cambia nada
+        return
+    missing = object()
+    previo = tuple(instance.loaded_value(k, missing) for k in ("owner_id", "estado_id", "next_contact_at"))
+    if missing in previo:
+        previo = (
+            Contacto.objects.filter(pk=instance.pk)
+            .values_list("owner_id", "estado_id", "next_contact_at")
+            .first()
+        )
+    instance._contadores_previo = previo
+
+
+def _contacto_actual(instance: Contacto):
+    return instance.owner_id, instance.estado_id, instance.next_contact_at
+
+
+def _aporte_contacto(datos) -> dict:
+    if datos is None:
+        return {}
+    owner_id, estado_id, next_contact_at = datos
+    return {owner_id: contadores.aporte_contacto(estado_id, next_contact_at)}
+
+
+@receiver(post_save, sender=Contacto, dispatch_uid="dashboard_contadores_contacto_guardado_v1")
+def _contacto_guardado(sender, instance: Contacto, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, "_contadores_previo", None)
+    actual = _contacto_actual(instance)
+    if previo is not None and (previo[0], previo[1], previo[2] is None) == (actual[0], actual[1], actual[2] is None):
+        return
+    contadores.aplicar(contadores.diferencia(_aporte_contacto(previo), _aporte_contacto(actual)))
+
+
+@receiver(post_delete, sender=Contacto, dispatch_uid="dashboard_contadores_contacto_borrado_v1")
+def _contacto_borrado(sender, instance: Contacto, **kwargs):
+    contadores.aplicar(contadores.diferencia(_aporte_contacto(_contacto_actual(instance)), {}))
+
+
+@receiver(pre_delete, sender=EstadoLead, dispatch_uid="dashboard_contadores_estado_borrado_v1")
+def _estado_por_borrar(sender, instance: EstadoLead, **kwargs):
+    """Sus contactos pasan a "sin estado" (SET_NULL, sin signals de Contacto)."""
+    deltas = {}
+    afectados = Contacto.objects.filter(estado_id=instance.pk).values_list("pk", flat=True)
+    for owner_id, c in contadores.medir(contactos=afectados).items():
+        n = c["total_contactos"]
+        deltas[owner_id] = Counter({f"estado:{instance.pk}": -n, "estado:": n})
+    contadores.aplicar(deltas)
+
+
+# =========================================
+# Aviso (el owner sale del lead o del evento)
+# =========================================
+# Marca en el "previo": el aviso sigue en el mismo lead/evento, su owner es el actual
+_MISMO_OWNER = object()
+
+
+@receiver(pre_save, sender=Aviso, dispatch_uid="dashboard_contadores_aviso_previo_v1")
+def _aviso_previo(sender, instance: Aviso, **kwargs):
+    """(owner, estado) antes del save: de lo cargado o, si no se conoce, de la fila."""
+    instance._contadores_previo = None
+    if not instance.pk or instance._state.adding:
+        return
+    cargado = instance.loaded_values("lead_id", "evento_id", "estado")
+    if cargado is not None and cargado[:2] == (instance.lead_id, instance.evento_id):
+        # El owner se resuelve en post_save y solo si cambió el estado
+        instance._contadores_previo = (_MISMO_OWNER, cargado[2])
+        return
+    fila = (
+        Aviso.objects.filter(pk=instance.pk)
+        .values_list("lead__owner_id", "evento__owner_id", "estado")
+        .first()
+    )
+    if fila:
+        instance._contadores_previo = (fila[0] if fila[0] is not None else fila[1], fila[2])
+
+
+def _aporte_aviso(datos) -> dict:
+    if datos is None:
+        return {}
+    owner_id, estado = datos
+    return {owner_id: contadores.aporte_aviso(estado)}
+
+
+@receiver(post_save, sender=Aviso, dispatch_uid="dashboard_contadores_aviso_guardado_v1")
+def _aviso_guardado(sender, instance: Aviso, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, "_contadores_previo", None)
+    if previo is None and instance.estado not in contadores.CAMPO_AVISO:
+        return
+    if previo is not None and previo[0] is _MISMO_OWNER:
+        if previo[1] == instance.estado:
+            return
+        previo = (_aviso_owner_id(instance), previo[1])
+        actual = (previo[0], instance.estado)
+    else:
+        actual = (_aviso_owner_id(instance), instance.estado)
+    if previo == actual:
+        return
+    contadores.aplicar(contadores.diferencia(_aporte_aviso(previo), _aporte_aviso(actual)))
+
+
+# Aporte del aviso: se toma en pre_delete (después el lead puede ya no existir) y viaja
+# en la instancia hasta post_delete (sin estado compartido entre threads/requests).
+@receiver(pre_delete, sender=Aviso, dispatch_uid="dashboard_contadores_aviso_por_borrar_v1")
+def _aviso_por_borrar(sender, instance: Aviso, **kwargs):
+    if instance.estado in contadores.CAMPO_AVISO:
+        instance._aviso_previo = (_aviso_owner_id(instance), instance.estado)
+
+
+@receiver(post_delete, sender=Aviso, dispatch_uid="dashboard_contadores_aviso_borrado_v1")
+def _aviso_borrado(sender, instance: Aviso, **kwargs):
+    previo = getattr(instance, "_aviso_previo", None)
+    if previo is not None:
+        instance._aviso_previo = None
+        contadores.aplicar(contadores.diferencia(_aporte_aviso(previo), {}))
+
+
+# =========================================
+# Versiones (leads/versiones.py): un aviso que pasa a otro owner cambia también los
+# avisos del owner anterior (el actual lo versiona avisos/signals.py)
+# =========================================
+@receiver(post_save, sender=Aviso, dispatch_uid="dashboard_version_aviso_owner_previo_v1")
+def _version_aviso_owner_previo(sender, instance: Aviso, **kwargs):
+    previo = getattr(instance, "_contadores_previo", None)
+    if previo and previo[0] is not _MISMO_OWNER and previo[0] != _aviso_owner_id(instance):
+        versiones.incrementar(previo[0], "avisos")
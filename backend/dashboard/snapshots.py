@@ -0,0 +1,85 @@
+# dashboard/snapshots.py
+"""
+Cache del payload de /api/dashboard/data/ por tenant (Django cache compartido, CACHE_URL;
+sin él no se cachea, ver versiones.habilitadas()).
+
+- La clave lleva el owner y las versiones de sus datos (leads/versiones.py, las mismas
+  de los ETag de los listados) más las compartidas (estados, "dashboard" para la
+  reconstrucción de contadores). Nunca se borra nada: al escribir sube una versión y la
+  clave vieja deja de usarse (y vence sola).
+- Próximos vs atrasados dependen de la hora (y el seguimiento, del día): un snapshot vale
+  hasta que vence el próximo next_contact_at del tenant, la medianoche o SNAPSHOT_TTL, lo
+  que ocurra antes.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from leads import versiones
+from leads.models import Contacto
+from leads.seguimiento import cortes_del_dia
+
+# Vida máxima de un snapshot (segundos); las escrituras lo invalidan antes
+SNAPSHOT_TTL = 300
+
+# Versiones de las que depende el payload: las del owner + las compartidas
+RECURSOS = ("contactos", "eventos", "avisos", "propiedades")
+GLOBALES = ("estados", "dashboard")
+
+_STATS = ("hits", "misses")
+
+
+def invalidar(owner_id=None):
+    """Invalida los snapshots de un tenant (o de todos, con None) al confirmarse la transacción."""
+    if owner_id is None:
+        versiones.incrementar(versiones.GLOBAL, "dashboard")
+    else:
+        versiones.incrementar(owner_id, *RECURSOS)
+
+
+def _contar(stat):
+    clave = f"dashboard:stats:{stat}"
+    cache.add(clave, 0, None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def estadisticas() -> dict:
+    valores = cache.get_many([f"dashboard:stats:{s}" for s in _STATS])
+    stats = {s: valores.get(f"dashboard:stats:{s}", 0) for s in _STATS}
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else None
+    return stats
+
+
+def _vigencia(owner_id, ahora) -> int:
+    """Segundos hasta que el próximo contacto pendiente pasa a atrasado o cambia el día (tope SNAPSHOT_TTL)."""
+    proximo = (
+        Contacto.objects.filter(owner_id=owner_id, next_contact_at__gte=ahora)
+        .order_by("next_contact_at")
+        .values_list("next_contact_at", flat=True)
+        .first()
+    )
+    limite = cortes_del_dia(ahora)[1]
+    if proximo is not None:
+        limite = min(limite, proximo)
+    return max(1, min(SNAPSHOT_TTL, int((limite - ahora).total_seconds())))
+
+
+def obtener(owner_id, calcular) -> tuple[dict, bool]:
+    """(payload, hit): del cache o `calcular()` y se guarda. Cuenta hits/misses."""
+    if not versiones.habilitadas():
+        return calcular(), False  # cache por proceso: otro worker no vería las escrituras
+    pares = [(owner_id, r) for r in RECURSOS] + [(versiones.GLOBAL, r) for r in GLOBALES]
+    clave = "dashboard:snapshot:{}:{}".format(owner_id, ":".join(map(str, versiones.actuales(pares))))
+    data = cache.get(clave)
+    if data is not None:
+        _contar("hits")
+        return data, True
+
+    _contar("misses")
+    ahora = timezone.now()
+    data = calcular()
+    cache.set(clave, data, _vigencia(owner_id, ahora))
+    return data, False
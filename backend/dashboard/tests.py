@@ -1,3 +1,237 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from avisos.models import Aviso
+from leads.models import Contacto, Evento
+from propiedades.models import Propiedad
+
+from . import contadores, snapshots
+from .models import ContadoresDashboard
+
+User = get_user_model()
+
+
+# === Contadores incrementales al borrar avisos (dashboard/signals.py) ===
+class ContadoresAvisosBorradosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.propiedad = Propiedad.objects.create(
+            owner=cls.user, codigo="P1", titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1, superficie=1
+        )
+
+    def setUp(self):
+        contadores.leer(self.user.pk)  # crea la fila del tenant: desde acá se ajusta en forma incremental
+
+    def evento(self, contacto, dias=1):
+        return Evento.objects.create(
+            owner=self.user, propiedad=self.propiedad, contacto=contacto, tipo="Visita",
+            fecha_hora=timezone.now() + timedelta(days=dias),
+        )
+
+    def pendientes(self):
+        return ContadoresDashboard.objects.get(owner=self.user).avisos_pendientes
+
+    def assertIgualAReconstruir(self):
+        fila = ContadoresDashboard.objects.get(owner=self.user)
+        incremental = {c: getattr(fila, c) for c in contadores.CAMPOS}
+        contadores.reconstruir(self.user.pk)
+        fila.refresh_from_db()
+        self.assertEqual(incremental, {c: getattr(fila, c) for c in contadores.CAMPOS})
+
+    def test_borrar_evento_descuenta_su_aviso_una_vez(self):
+        contacto = Contacto.objects.create(owner=self.user, nombre="Juan", email="juan@x.com")
+        eventos = [self.evento(contacto, dias) for dias in (1, 2)]
+        self.assertEqual(self.pendientes(), 2)
+        eventos[0].delete()  # el aviso se va por CASCADE
+        self.assertEqual(self.pendientes(), 1)
+        self.assertIgualAReconstruir()
+
+    def test_borrar_aviso_y_lead(self):
+        contacto = Contacto.objects.create(owner=self.user, nombre="Juan", email="juan@x.com")
+        self.evento(contacto)
+        self.evento(contacto, dias=2)
+        Aviso.objects.filter(evento__fecha_hora__lt=timezone.now() + timedelta(days=1, hours=1)).delete()
+        self.assertEqual(self.pendientes(), 1)
+        contacto.delete()
+        self.assertIgualAReconstruir()
+
+    def test_snapshot_viaja_en_la_instancia(self):
+        contacto = Contacto.objects.create(owner=self.user, nombre="Juan", email="juan@x.com")
+        aviso = Aviso.objects.get(evento=self.evento(contacto))
+        aviso.delete()
+        self.assertIsNone(aviso._aviso_previo)  # consumido en post_delete, nada queda colgado
+        self.assertEqual(self.pendientes(), 0)
+
+
+# === Contadores al guardar avisos: el estado previo sale de lo cargado (ValoresCargadosMixin) ===
+class ContadoresAvisosGuardadosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.otro = User.objects.create_user("otro", "otro@x.com", "x")
+        propiedad = Propiedad.objects.create(
+            owner=cls.user, codigo="P1", titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1, superficie=1
+        )
+        cls.contacto = Contacto.objects.create(owner=cls.user, nombre="Juan", email="juan@x.com")
+        cls.ajeno = Contacto.objects.create(owner=cls.otro, nombre="Ana", email="ana@x.com")
+        evento = Evento.objects.create(
+            owner=cls.user, propiedad=propiedad, contacto=cls.contacto, tipo="Visita",
+            fecha_hora=timezone.now() + timedelta(days=1),
+        )
+        cls.aviso_id = Aviso.objects.get(evento=evento).pk
+
+    def setUp(self):
+        for owner in (self.user, self.otro):
+            contadores.leer(owner.pk)
+
+    def avisos(self, owner):
+        fila = ContadoresDashboard.objects.get(owner=owner)
+        return fila.avisos_pendientes, fila.avisos_atrasados
+
+    def guardar(self, aviso):
+        """Guarda y devuelve los SELECT sobre la tabla de avisos."""
+        with CaptureQueriesContext(connection) as ctx:
+            aviso.save()
+        return [q["sql"] for q in ctx.captured_queries
+                if q["sql"].startswith("SELECT") and '"avisos_aviso"' in q["sql"].split(" WHERE ")[0]]
+
+    def assertIgualAReconstruir(self):
+        for owner in (self.user, self.otro):
+            incremental = self.avisos(owner)
+            contadores.reconstruir(owner.pk)
+            self.assertEqual(incremental, self.avisos(owner))
+
+    def test_cambio_de_estado_sin_releer_el_aviso(self):
+        aviso = Aviso.objects.select_related("lead").get(pk=self.aviso_id)
+        self.assertEqual(self.avisos(self.user), (1, 0))
+        for estado, esperado in (("atrasado", (0, 1)), ("completado", (0, 0)), ("pendiente", (1, 0))):
+            aviso.estado = estado
+            self.assertEqual(self.guardar(aviso), [])  # ni la fila previa ni el owner (lead en cache)
+            self.assertEqual(self.avisos(self.user), esperado)
+        self.assertIgualAReconstruir()
+
+    def test_sin_cambios_no_toca_contadores(self):
+        aviso = Aviso.objects.get(pk=self.aviso_id)
+        aviso.titulo = "Otro"
+        with CaptureQueriesContext(connection) as ctx:
+            aviso.save()
+        self.assertFalse([q for q in ctx.captured_queries if "dashboard_contadoresdashboard" in q["sql"]])
+
+    def test_sin_valores_cargados_lee_la_fila(self):
+        aviso = Aviso.objects.only("id", "titulo").get(pk=self.aviso_id)
+        aviso.estado = "atrasado"
+        selects = self.guardar(aviso)
+        self.assertTrue([q for q in selects if "JOIN" in q], selects)  # la fila previa, con el owner del lead/evento
+        self.assertEqual(self.avisos(self.user), (0, 1))
+        self.assertIgualAReconstruir()
+
+    def test_cambio_de_lead_a_otro_owner(self):
+        aviso = Aviso.objects.get(pk=self.aviso_id)
+        aviso.lead = self.ajeno
+        aviso.evento = None
+        self.guardar(aviso)
+        self.assertEqual((self.avisos(self.user), self.avisos(self.otro)), ((0, 0), (1, 0)))
+        self.assertIgualAReconstruir()
+
+
+# === Snapshots de /api/dashboard/data/ (dashboard/snapshots.py) ===
+@override_settings(VERSIONES_EN_CACHE=True)
+class SnapshotsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.staff = User.objects.create_user("admin", "admin@x.com", "x", is_staff=True)
+        cls.propiedad = Propiedad.objects.create(
+            owner=cls.user, codigo="P1", titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1, superficie=1
+        )
+        cls.contacto = Contacto.objects.create(owner=cls.user, nombre="Juan", email="juan@x.com")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def dashboard(self, esperado):
+        response = self.client.get("/api/dashboard/data/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Dashboard-Cache"], esperado)
+        return response.json()
+
+    def test_segunda_carga_es_hit(self):
+        primera = self.dashboard("miss")
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.dashboard("hit"), primera)
+        self.assertFalse([q for q in ctx.captured_queries if "leads_contacto" in q["sql"]])
+
+    def test_escritura_invalida_el_snapshot(self):
+        antes = self.dashboard("miss")
+        self.assertEqual((antes["total_contactos"], antes["avisos_pendientes"]), (1, 0))
+
+        def escribir(fn):
+            with self.captureOnCommitCallbacks(execute=True):
+                fn()
+            return self.dashboard("miss")
+
+        data = escribir(lambda: Contacto.objects.create(owner=self.user, nombre="Ana", email="ana@x.com"))
+        self.assertEqual(data["total_contactos"], 2)
+        self.assertEqual(data["ultimos_contactos"][0]["nombre"], "Ana")
+
+        data = escribir(lambda: Evento.objects.create(  # crea su aviso pendiente
+            owner=self.user, propiedad=self.propiedad, contacto=self.contacto, tipo="Visita",
+            fecha_hora=timezone.now() + timedelta(days=1),
+        ))
+        self.assertEqual(data["avisos_pendientes"], 1)
+
+        def completar():
+            aviso = Aviso.objects.get(lead=self.contacto)
+            aviso.estado = "completado"
+            aviso.save()
+        data = escribir(completar)
+        self.assertEqual(data["avisos_pendientes"], 0)
+
+        def editar_propiedad():
+            self.propiedad.precio = 2
+            self.propiedad.save()
+        self.assertEqual(escribir(editar_propiedad), data)
+        self.dashboard("hit")
+
+    def test_contadores_del_cache(self):
+        self.dashboard("miss")
+        self.dashboard("hit")
+        self.dashboard("hit")
+        self.assertEqual(self.client.get("/api/dashboard/cache/").status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get("/api/dashboard/cache/").json(), {"hits": 2, "misses": 1, "hit_ratio": 0.6667})
+
+    def test_vence_con_el_proximo_contacto(self):
+        ahora = timezone.make_aware(datetime.combine(timezone.localdate(), time(12)))
+        Contacto.objects.filter(pk=self.contacto.pk).update(next_contact_at=ahora + timedelta(seconds=60))
+
+        @contextmanager
+        def en(segundos):
+            # La hora de la app y la del cache (LocMemCache: al guardar y al leer) avanzan juntas
+            reloj = mock.Mock(time=mock.Mock(return_value=ahora.timestamp() + segundos))
+            with mock.patch.object(timezone, "now", return_value=ahora + timedelta(seconds=segundos)), \
+                    mock.patch("django.core.cache.backends.base.time", reloj), \
+                    mock.patch("django.core.cache.backends.locmem.time", reloj):
+                yield
+
+        with en(0):
+            data = self.dashboard("miss")
+        self.assertEqual((data["proximos_contactos"], data["atrasados"]), (1, 0))
+        with en(30):
+            self.dashboard("hit")
+        with en(61):
+            data = self.dashboard("miss")
+        self.assertEqual((data["proximos_contactos"], data["atrasados"]), (0, 1))
@@ -1,57 +1,45 @@
 from django.shortcuts import render
 from django.utils import timezone
 from django.db.models import Count
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from leads.models import Contacto, EstadoLead
-from avisos.models import Aviso # Nueva importación
+from leads import seguimiento
+from leads.models import Contacto
+
+from . import contadores, snapshots
 
 
 @api_view(["GET"])
+@permission_classes([IsAuthenticated])
 def dashboard_data(request):
-    """API REST para métricas del dashboard basadas en Contacto y Avisos"""
-
-    # Total de contactos
-    total_contactos = Contacto.objects.count()
-
-    # Contactos por estado (fase del lead)
-    contactos_por_estado = (
-        Contacto.objects.values("estado__fase")
-        .annotate(total=Count("estado"))
-        .order_by("estado__fase")
-    )
-
-    # Próximos contactos programados (para hoy en adelante)
-    ahora = timezone.now()
-    proximos_contactos_count = Contacto.objects.filter(
-        next_contact_at__gte=ahora
-    ).count()
-
-    # Contactos atrasados (proximo_contacto en el pasado)
-    atrasados_count = Contacto.objects.filter(
-        next_contact_at__lt=ahora
-    ).count()
+    """
+    API REST para métricas del dashboard basadas en Contacto y Avisos (del usuario).
+    Los totales salen de la fila de contadores del tenant (dashboard/contadores.py) y el
+    payload completo se cachea por tenant hasta la próxima escritura (dashboard/snapshots.py).
+    """
+    owner_id = request.user.pk
+
+    def calcular():
+        data = contadores.leer(owner_id)
+        # Vencidos / vencen hoy / próximos / pendientes por día local (anotación en la DB)
+        data["seguimiento"] = seguimiento.contar(Contacto.objects.filter(owner_id=owner_id))
+        # Últimos 5 contactos registrados
+        data["ultimos_contactos"] = list(
+            Contacto.objects.filter(owner_id=owner_id).order_by("-id").values("id", "nombre", "apellido", "email")[:5]
+        )
+        return data
+
+    data, hit = snapshots.obtener(owner_id, calcular)
+    return Response(data, headers={"X-Dashboard-Cache": "hit" if hit else "miss"})
 
-    # Últimos 5 contactos registrados
-    ultimos_contactos = list(
-        Contacto.objects.order_by("-id").values("id", "nombre", "apellido", "email")[:5]
-    )
-    
-    # Nuevas consultas para avisos pendientes y atrasados
-    avisos_pendientes_count = Aviso.objects.filter(estado="pendiente").count()
-    avisos_atrasados_count = Aviso.objects.filter(estado="atrasado").count()
 
-    data = {
-        "total_contactos": total_contactos,
-        "contactos_por_estado": list(contactos_por_estado),
-        "proximos_contactos": proximos_contactos_count,
-        "atrasados": atrasados_count,
-        "ultimos_contactos": ultimos_contactos,
-        "avisos_pendientes": avisos_pendientes_count,
-        "avisos_atrasados": avisos_atrasados_count,
-    }
-    return Response(data)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def dashboard_cache_stats(request):
+    """Hits / misses del cache de snapshots del dashboard (desde que arrancó el cache)."""
+    return Response(snapshots.estadisticas())
 
 
 # Si también querés usar Templates (HTML)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ExportacionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exportacion'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,690 @@
+# exportacion/importacion.py
+"""
+Motor de importación por lotes (lo usa ImportView).
+
+Cada fila se normaliza por separado (los errores se siguen reportando por fila) y
+después se aplica de a chunks:
+
+1. Se precargan en dicts las claves existentes del chunk (owner+email, codigo, ids):
+   unas pocas queries por chunk en lugar de 4-6 por fila.
+2. Los upserts se resuelven en memoria, fila por fila y en orden (una fila puede
+   pisar lo que dejó otra anterior del mismo chunk).
+3. bulk_create / bulk_update por chunk. Si la DB rechaza el lote, se reintenta de a
+   un objeto (con savepoint) para reportar el error en la fila que corresponde.
+4. Los efectos secundarios que antes hacían las signals en cada save() se aplican en
+   lote: historial de estados, tokens de búsqueda, fechas de seguimiento del contacto,
+   avisos de eventos futuros y un único aviso por SSE por chunk.
+
+La normalización (paso previo, solo CPU: fechas, decimales, strings) puede repartirse
+entre procesos con `workers` > 1 (ver IMPORT_WORKERS en settings); el proceso principal
+sigue haciendo las lecturas/escrituras en la DB, chunk por chunk y en el orden original.
+"""
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from avisos.models import Aviso
+from dashboard import contadores
+from avisos.realtime import publish
+from leads import versiones
+from leads.models import Contacto, ContactoToken, EstadoLead, EstadoLeadHistorial, Evento
+from leads.search import SEARCH_FIELDS, contacto_tokens
+from propiedades.models import Propiedad
+
+from . import resumenes
+from .metricas import invalidar_meses
+from .normalizacion import (
+    iniciar_worker, normalizar_chunk, normalizar_contacto, normalizar_evento, normalizar_propiedad,
+)
+
+# Filas por chunk (precarga + bulk ops)
+IMPORT_CHUNK_SIZE = 500
+
+
+# =======================
+# Normalización (ver normalizacion.py)
+# =======================
+
+def _normalizados(resource: str, chunks, workers: int):
+    """
+    (chunk, filas, errores) por cada chunk, en el mismo orden. Con workers > 1 la
+    normalización corre en un pool de procesos, con a lo sumo 2 chunks por worker en
+    vuelo (la memoria sigue acotada aunque el archivo sea enorme).
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield (chunk, *normalizar_chunk(resource, chunk))
+        return
+
+    # "spawn" y no fork: un hijo forkeado heredaría las conexiones abiertas a la DB
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=iniciar_worker) as pool:
+        en_vuelo = deque()
+        for chunk in chunks:
+            en_vuelo.append((chunk, pool.submit(normalizar_chunk, resource, chunk)))
+            if len(en_vuelo) >= workers * 2:
+                chunk, futuro = en_vuelo.popleft()
+                yield (chunk, *futuro.result())
+        while en_vuelo:
+            chunk, futuro = en_vuelo.popleft()
+            yield (chunk, *futuro.result())
+
+
+# =======================
+# Helpers de escritura
+# =======================
+
+class _Resultado:
+    """Conteos por fila de un chunk: cada fila marca el objeto que creó o modificó."""
+
+    def __init__(self):
+        self.marcas = []  # (row, obj, "created" | "updated")
+        self.errors = []
+
+    def marcar(self, row, obj, tipo):
+        self.marcas.append((row, obj, tipo))
+
+    def cerrar(self, fallidos: dict) -> tuple[int, int, list]:
+        created = updated = 0
+        for row, obj, tipo in self.marcas:
+            if id(obj) in fallidos:
+                self.errors.append({"row": row, "error": fallidos[id(obj)]})
+            elif tipo == "created":
+                created += 1
+            else:
+                updated += 1
+        return created, updated, self.errors
+
+
+def _faltantes(obj) -> list[str]:
+    """Campos NOT NULL sin valor (la DB rechazaría el INSERT de todo el lote)."""
+    return [
+        f.name for f in obj._meta.concrete_fields
+        if not f.null and not f.primary_key
+        and not getattr(f, "auto_now", False) and not getattr(f, "auto_now_add", False)
+        and getattr(obj, f.attname) is None
+    ]
+
+
+def _guardar_en_lote(model, user, nuevos, cambiados, campos, clave) -> dict:
+    """
+    bulk_create(nuevos) + bulk_update(cambiados, campos) en un savepoint. Si la DB rechaza
+    el lote, reintenta objeto por objeto. Devuelve {id(obj): mensaje} de los rechazados.
+    `clave`: campos para recuperar los pk de lo creado en backends sin RETURNING (MySQL).
+    """
+    fallidos = {}
+    if cambiados and campos:
+        # bulk_update no aplica auto_now: actualizado_en (cursor de /sync/) va a mano
+        ahora = timezone.now()
+        for obj in cambiados:
+            obj.actualizado_en = ahora
+        campos = {*campos, "actualizado_en"}
+
+    max_pk = None
+    if nuevos and not connection.features.can_return_rows_from_bulk_insert:
+        max_pk = model.objects.aggregate(m=Max("pk"))["m"] or 0
+
+    try:
+        with transaction.atomic():
+            if nuevos:
+                model.objects.bulk_create(nuevos)
+            if cambiados and campos:
+                model.objects.bulk_update(cambiados, sorted(campos))
+    except DatabaseError:
+        for obj in nuevos:
+            obj.pk = None
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([obj])
+            except DatabaseError as e:
+                fallidos[id(obj)] = str(e)
+        for obj in cambiados:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_update([obj], sorted(campos))
+            except DatabaseError as e:
+                fallidos[id(obj)] = str(e)
+
+    if max_pk is not None:
+        _asignar_pks(model, user, [o for o in nuevos if id(o) not in fallidos], max_pk, clave)
+    return fallidos
+
+
+def _asignar_pks(model, user, objs, max_pk, clave):
+    """Sin RETURNING: relee lo insertado por el owner después de `max_pk` y empareja por `clave`."""
+    pendientes = defaultdict(list)
+    for obj in objs:
+        pendientes[tuple(getattr(obj, f) for f in clave)].append(obj)
+    rows = (
+        model.objects.filter(owner=user, pk__gt=max_pk)
+        .order_by("pk")
+        .values_list("pk", *clave)
+    )
+    for pk, *valores in rows:
+        lista = pendientes.get(tuple(valores))
+        if lista:
+            lista.pop(0).pk = pk
+
+
+def _avisar(user, recurso, cantidad):
+    # Un solo evento SSE por chunk (en lugar de uno por save), recién al confirmar
+    if cantidad:
+        owner_id = user.pk
+        transaction.on_commit(lambda: publish(owner_id, {
+            "recurso": recurso, "accion": "importado", "cantidad": cantidad,
+        }))
+
+
+# =======================
+# Contactos
+# =======================
+
+def aplicar_contactos(user, filas):
+    res = _Resultado()
+
+    estados = {}
+    for e in EstadoLead.objects.order_by("id"):
+        estados.setdefault(e.fase.lower(), e)
+
+    emails = {f["email"].lower() for _, f in filas}
+    existentes = {}
+    qs = (
+        Contacto.objects.filter(owner=user)
+        .alias(email_l=Lower("email"))
+        .filter(email_l__in=emails)
+        .order_by("id")
+    )
+    for c in qs:
+        existentes.setdefault(c.email.lower(), c)
+
+    nuevos, cambiados, campos = [], {}, set()
+    historial = []   # (contacto, estado_id) por cada cambio de estado, en orden
+    creado_en = {}   # id(obj) -> fecha original (auto_now_add la pisa en el INSERT)
+    meses = []       # creado_en antes/después: meses de métricas a invalidar
+
+    for row, f in filas:
+        key = f["email"].lower()
+        obj = existentes.get(key)
+        es_nuevo = obj is None
+        if es_nuevo:
+            obj = Contacto(owner=user, email=f["email"])
+            existentes[key] = obj
+            nuevos.append(obj)
+
+        before = (obj.nombre, obj.apellido, obj.telefono, obj.estado_id, obj.creado_en)
+        for campo in ("nombre", "apellido", "telefono"):
+            if f[campo]:
+                setattr(obj, campo, f[campo])
+        estado = estados.get(f["estado_fase"].lower()) if f["estado_fase"] else None
+        if estado and obj.estado_id != estado.id:
+            obj.estado = estado
+            historial.append((obj, estado.id))
+        if f["creado_en"]:
+            obj.creado_en = f["creado_en"]
+            creado_en[id(obj)] = f["creado_en"]
+        after = (obj.nombre, obj.apellido, obj.telefono, obj.estado_id, obj.creado_en)
+
+        meses += [before[4], after[4]]
+
+        if es_nuevo:
+            res.marcar(row, obj, "created")
+        elif before != after:
+            res.marcar(row, obj, "updated")
+            if obj.pk:
+                cambiados[obj.pk] = obj
+                campos.update(n for n, a, b in zip(("nombre", "apellido", "telefono", "estado", "creado_en"), before, after) if a != b)
+
+    # Qué contactos existentes necesitan reindexar (antes de que cambie lo "cargado")
+    tracked = {*SEARCH_FIELDS, "owner_id"}
+    reindexar = [c for c in cambiados.values() if c.changed_fields() & tracked]
+
+    antes = contadores.medir(contactos=list(cambiados))
+    resumen_antes = resumenes.medir(contactos=list(cambiados))
+    fallidos = _guardar_en_lote(Contacto, user, nuevos, list(cambiados.values()), campos, ("email",))
+
+    # creado_en explícito de los nuevos (el INSERT usó "ahora")
+    fechas = [o for o in nuevos if id(o) in creado_en and id(o) not in fallidos and o.pk]
+    for o in fechas:
+        o.creado_en = creado_en[id(o)]
+    if fechas:
+        Contacto.objects.bulk_update(fechas, ["creado_en"])
+
+    def ok(o):
+        return id(o) not in fallidos and o.pk
+
+    despues = contadores.medir(contactos=[*cambiados, *(o.pk for o in nuevos if ok(o))])
+    contadores.aplicar(contadores.diferencia(antes, despues))
+
+    EstadoLeadHistorial.objects.bulk_create([
+        EstadoLeadHistorial(contacto=o, estado_id=estado_id) for o, estado_id in historial if ok(o)
+    ])
+    resumenes.aplicar(resumenes.diferencia(
+        resumen_antes, resumenes.medir(contactos=[*cambiados, *(o.pk for o in nuevos if ok(o))]),
+    ))
+
+    indexar = [o for o in nuevos if ok(o)] + [o for o in reindexar if ok(o)]
+    if reindexar:
+        ContactoToken.objects.filter(contacto_id__in=[o.pk for o in reindexar]).delete()
+    ContactoToken.objects.bulk_create([
+        ContactoToken(contacto_id=o.pk, owner_id=o.owner_id, token=tok)
+        for o in indexar for tok in sorted(contacto_tokens(o))
+    ])
+
+    invalidar_meses(user.pk, meses)
+    versiones.incrementar(user.pk, "contactos")
+    created, updated, errors = res.cerrar(fallidos)
+    _avisar(user, "contacto", created + updated)
+    return created, updated, errors
+
+
+# =======================
+# Propiedades
+# =======================
+
+def aplicar_propiedades(user, filas):
+    res = _Resultado()
+
+    codigos = {f["codigo"] for _, f in filas}
+    existentes = {p.codigo: p for p in Propiedad.objects.filter(codigo__in=codigos)}
+
+    nuevos, cambiados, campos = [], {}, set()
+    fecha_alta = {}  # id(obj) -> fecha original (auto_now_add la pisa en el INSERT)
+    meses = []       # fechas de ventas antes/después: meses de métricas a invalidar
+
+    def venta(p):
+        if p.estado == "vendido":
+            meses.extend((p.vendida_en, p.fecha_alta))
+
+    for row, f in filas:
+        obj = existentes.get(f["codigo"])
+        if obj is not None and obj.owner_id != user.pk:
+            res.errors.append({"row": row, "error": f"El código '{f['codigo']}' ya está en uso."})
+            continue
+
+        if obj is None:
+            obj = Propiedad(owner=user, codigo=f["codigo"], **f["campos"])
+            faltan = _faltantes(obj)
+            if faltan:
+                res.errors.append({"row": row, "error": f"Propiedad requiere {', '.join(repr(n) for n in faltan)}."})
+                continue
+            existentes[f["codigo"]] = obj
+            nuevos.append(obj)
+            venta(obj)
+            if "fecha_alta" in f["campos"]:
+                fecha_alta[id(obj)] = f["campos"]["fecha_alta"]
+            res.marcar(row, obj, "created")
+            continue
+
+        venta(obj)
+        changed = False
+        for k, v in f["campos"].items():
+            if getattr(obj, k) != v:
+                setattr(obj, k, v)
+                changed = True
+                if obj.pk:
+                    campos.add(k)
+                if k == "fecha_alta" and not obj.pk:
+                    fecha_alta[id(obj)] = v
+        if changed:
+            res.marcar(row, obj, "updated")
+            venta(obj)
+            if obj.pk:
+                cambiados[obj.pk] = obj
+
+    resumen_antes = resumenes.medir(propiedades=list(cambiados))
+    fallidos = _guardar_en_lote(Propiedad, user, nuevos, list(cambiados.values()), campos, ("codigo",))
+
+    fechas = [o for o in nuevos if id(o) in fecha_alta and id(o) not in fallidos and o.pk]
+    for o in fechas:
+        o.fecha_alta = fecha_alta[id(o)]
+    if fechas:
+        Propiedad.objects.bulk_update(fechas, ["fecha_alta"])
+
+    creadas = [o.pk for o in nuevos if id(o) not in fallidos and o.pk]
+    resumenes.aplicar(resumenes.diferencia(resumen_antes, resumenes.medir(propiedades=[*cambiados, *creadas])))
+
+    invalidar_meses(user.pk, meses)
+    versiones.incrementar(user.pk, "propiedades")
+    return res.cerrar(fallidos)
+
+
+# =======================
+# Eventos
+# =======================
+
+def aplicar_eventos(user, filas):
+    res = _Resultado()
+
+    # --- precarga de propiedades, contactos y eventos referenciados ---
+    prop_ids = {f["propiedad_id"] for _, f in filas if f["propiedad_id"]}
+    prop_codigos = {f["propiedad_codigo"] for _, f in filas if f["propiedad_codigo"]}
+    props_por_id, props_por_codigo = {}, {}
+    if prop_ids or prop_codigos:
+        for p in Propiedad.objects.filter(owner=user).filter(Q(id__in=prop_ids) | Q(codigo__in=prop_codigos)):
+            props_por_id[p.id] = p
+            props_por_codigo[p.codigo] = p
+
+    ct_ids = {f["contacto_id"] for _, f in filas if f["contacto_id"]}
+    ct_emails = {f["contacto_email"].lower() for _, f in filas if f["contacto_email"]}
+    cts_por_id, cts_por_email = {}, {}
+    if ct_ids or ct_emails:
+        qs = (
+            Contacto.objects.filter(owner=user)
+            .alias(email_l=Lower("email"))
+            .filter(Q(id__in=ct_ids) | Q(email_l__in=ct_emails))
+            .order_by("id")
+        )
+        for c in qs:
+            cts_por_id[c.id] = c
+            cts_por_email.setdefault(c.email.lower(), c)
+
+    ev_ids = {f["id"] for _, f in filas if f["id"]}
+    existentes = {e.id: e for e in Evento.objects.filter(owner=user, id__in=ev_ids)} if ev_ids else {}
+
+    nuevos, cambiados, campos = [], {}, set()
+    guardados = []  # (row, evento) en orden: cada fila "guarda" su evento, como antes
+    tracked = ("tipo", "fecha_hora", "propiedad_id", "contacto_id", "nombre", "apellido", "email", "notas")
+
+    for row, f in filas:
+        prop = props_por_id.get(f["propiedad_id"]) if f["propiedad_id"] else None
+        if not prop and f["propiedad_codigo"]:
+            prop = props_por_codigo.get(f["propiedad_codigo"])
+        if not prop:
+            res.errors.append({"row": row, "error": "No se encontró la propiedad (propiedad_id o propiedad_codigo)."})
+            continue
+
+        ct = cts_por_id.get(f["contacto_id"]) if f["contacto_id"] else None
+        if not ct and f["contacto_email"]:
+            ct = cts_por_email.get(f["contacto_email"].lower())
+
+        ev = existentes.get(f["id"]) if f["id"] else None
+        if ev is None:
+            # crear con id específico no es trivial; creamos normal
+            ev = Evento(
+                owner=user, tipo=f["tipo"], fecha_hora=f["fecha_hora"],
+                propiedad=prop, contacto=ct, nombre=f["nombre"], apellido=f["apellido"],
+                email=f["email"] or None, notas=f["notas"],
+            )
+            ev.calcular_fecha_fin()
+            nuevos.append(ev)
+            guardados.append((row, ev))
+            res.marcar(row, ev, "created")
+            continue
+
+        before = tuple(getattr(ev, k) for k in tracked)
+        ev.tipo = f["tipo"]
+        ev.fecha_hora = f["fecha_hora"]
+        ev.propiedad = prop
+        ev.contacto = ct
+        if f["nombre"]:
+            ev.nombre = f["nombre"]
+        if f["apellido"]:
+            ev.apellido = f["apellido"]
+        ev.email = f["email"] or None
+        if f["notas"]:
+            ev.notas = f["notas"]
+        ev.calcular_fecha_fin()
+        after = tuple(getattr(ev, k) for k in tracked)
+
+        guardados.append((row, ev))
+        if before != after:
+            res.marcar(row, ev, "updated")
+            cambiados[ev.pk] = ev
+            campos.update(k.removesuffix("_id") for k, a, b in zip(tracked, before, after) if a != b)
+            if "fecha_hora" in campos:
+                campos.add("fecha_fin")
+
+    resumen_antes = resumenes.medir(eventos=list(cambiados))
+    fallidos = _guardar_en_lote(
+        Evento, user, nuevos, list(cambiados.values()), campos,
+        ("propiedad_id", "fecha_hora", "tipo", "contacto_id"),
+    )
+    creados = [ev.pk for ev in nuevos if id(ev) not in fallidos and ev.pk]
+    resumenes.aplicar(resumenes.diferencia(resumen_antes, resumenes.medir(eventos=[*cambiados, *creados])))
+    guardados = [(row, ev) for row, ev in guardados if id(ev) not in fallidos and ev.pk]
+    _sincronizar_contactos_y_avisos(guardados)
+    versiones.incrementar(user.pk, "eventos", "contactos", "avisos")
+
+    created, updated, errors = res.cerrar(fallidos)
+    _avisar(user, "evento", len(guardados))
+    return created, updated, errors
+
+
+def _sincronizar_contactos_y_avisos(guardados):
+    """
+    Lo mismo que `sync_contacto_and_aviso_from_evento` hace en cada save, pero en lote:
+    se recorren los eventos en orden de fila (mismo resultado que guardarlos uno por uno)
+    y al final se escriben los contactos y avisos afectados.
+    """
+    now = timezone.localtime()
+    contactos, campos_ct = {}, set()
+    futuros = {}       # evento_id -> defaults del aviso (update_or_create)
+    completar = set()  # evento_id de eventos ya ocurridos (aviso pendiente -> completado)
+
+    # Contadores del dashboard: aporte de los contactos/avisos tocados antes y después
+    afectados = {
+        "contactos": {ev.contacto_id for _, ev in guardados if ev.contacto_id},
+        "eventos": [ev.pk for _, ev in guardados],
+    }
+    antes = contadores.medir(**afectados)
+
+    for _, ev in guardados:
+        contacto = ev.contacto
+        if not contacto:
+            continue
+        evento_dt = timezone.localtime(ev.fecha_hora)
+
+        # Evento ocurrido (pasado o hoy)
+        if evento_dt <= now:
+            if not contacto.last_contact_at or evento_dt > contacto.last_contact_at:
+                contacto.last_contact_at = evento_dt
+                contactos[contacto.pk] = contacto
+                campos_ct.add("last_contact_at")
+            if ev.pk in futuros:
+                futuros[ev.pk]["estado"] = "completado"
+            else:
+                completar.add(ev.pk)
+            continue
+
+        # Evento futuro
+        completar.discard(ev.pk)
+        if not contacto.next_contact_at or evento_dt < timezone.localtime(contacto.next_contact_at):
+            contacto.next_contact_at = evento_dt
+            if not contacto.next_contact_note:
+                base = f"{ev.tipo}"
+                if ev.notas:
+                    snippet = (ev.notas or "").strip().replace("\n", " ")
+                    if len(snippet) > 80:
+                        snippet = snippet[:77] + "..."
+                    base = f"{base} · {snippet}"
+                contacto.next_contact_note = base
+            contactos[contacto.pk] = contacto
+            campos_ct.update(("next_contact_at", "next_contact_note"))
+
+        futuros[ev.pk] = {
+            "titulo": f"Próximo contacto con {contacto.nombre} {contacto.apellido}",
+            "descripcion": (
+                f"{ev.tipo} sobre la propiedad {ev.propiedad.titulo}" if ev.propiedad else f"{ev.tipo} con el lead"
+            ),
+            "fecha": ev.fecha_hora,
+            "lead": contacto,
+            "propiedad": ev.propiedad,
+            "estado": "pendiente",
+        }
+
+    if contactos:
+        ahora = timezone.now()
+        for contacto in contactos.values():
+            contacto.actualizado_en = ahora
+        Contacto.objects.bulk_update(list(contactos.values()), sorted({*campos_ct, "actualizado_en"}))
+
+    if completar:
+        Aviso.objects.filter(evento_id__in=completar, estado="pendiente").update(
+            estado="completado", actualizado_en=timezone.now(),
+        )
+
+    if futuros:
+        avisos = {}
+        for a in Aviso.objects.filter(evento_id__in=list(futuros)).order_by("id"):
+            avisos.setdefault(a.evento_id, a)
+        actualizar, crear = [], []
+        for evento_id, defaults in futuros.items():
+            aviso = avisos.get(evento_id)
+            if aviso is None:
+                crear.append(Aviso(evento_id=evento_id, **defaults))
+                continue
+            for k, v in defaults.items():
+                setattr(aviso, k, v)
+            aviso.actualizado_en = timezone.now()
+            actualizar.append(aviso)
+        if actualizar:
+            Aviso.objects.bulk_update(actualizar, [*futuros[actualizar[0].evento_id], "actualizado_en"])
+        Aviso.objects.bulk_create(crear)
+
+    contadores.aplicar(contadores.diferencia(antes, contadores.medir(**afectados)))
+
+
+# =======================
+# Validación (solo lecturas)
+# =======================
+# Mismas reglas que el import pero sin escribir nada: una query de existencia por chunk.
+# "updated" cuenta las filas que caerían sobre un registro existente (aunque no cambie nada).
+
+def validar_contactos(user, filas):
+    emails = {f["email"].lower() for _, f in filas}
+    existentes = set(
+        Contacto.objects.filter(owner=user)
+        .annotate(email_l=Lower("email"))
+        .filter(email_l__in=emails)
+        .values_list("email_l", flat=True)
+    )
+    created = updated = 0
+    for _, f in filas:
+        key = f["email"].lower()
+        if key in existentes:
+            updated += 1
+        else:
+            created += 1
+            existentes.add(key)
+    return created, updated, []
+
+
+def validar_propiedades(user, filas):
+    codigos = {f["codigo"] for _, f in filas}
+    owners = dict(Propiedad.objects.filter(codigo__in=codigos).values_list("codigo", "owner_id"))
+    created = updated = 0
+    errors = []
+    for row, f in filas:
+        codigo = f["codigo"]
+        if codigo in owners:
+            if owners[codigo] != user.pk:
+                errors.append({"row": row, "error": f"El código '{codigo}' ya está en uso."})
+            else:
+                updated += 1
+            continue
+        faltan = _faltantes(Propiedad(owner_id=user.pk, codigo=codigo, **f["campos"]))
+        if faltan:
+            errors.append({"row": row, "error": f"Propiedad requiere {', '.join(repr(n) for n in faltan)}."})
+            continue
+        owners[codigo] = user.pk
+        created += 1
+    return created, updated, errors
+
+
+def validar_eventos(user, filas):
+    prop_ids = {f["propiedad_id"] for _, f in filas if f["propiedad_id"]}
+    prop_codigos = {f["propiedad_codigo"] for _, f in filas if f["propiedad_codigo"]}
+    ids, codigos = set(), set()
+    if prop_ids or prop_codigos:
+        for pid, codigo in Propiedad.objects.filter(owner=user).filter(
+            Q(id__in=prop_ids) | Q(codigo__in=prop_codigos)
+        ).values_list("id", "codigo"):
+            ids.add(pid)
+            codigos.add(codigo)
+
+    ev_ids = {f["id"] for _, f in filas if f["id"]}
+    existentes = set(Evento.objects.filter(owner=user, id__in=ev_ids).values_list("id", flat=True)) if ev_ids else set()
+
+    created = updated = 0
+    errors = []
+    for row, f in filas:
+        if f["propiedad_id"] not in ids and f["propiedad_codigo"] not in codigos:
+            errors.append({"row": row, "error": "No se encontró la propiedad (propiedad_id o propiedad_codigo)."})
+        elif f["id"] in existentes:
+            updated += 1
+        else:
+            created += 1
+    return created, updated, errors
+
+
+# =======================
+# Entrada
+# =======================
+
+# recurso -> (normalizar fila, aplicar chunk)
+IMPORTADORES = {
+    "leads": (normalizar_contacto, aplicar_contactos),
+    "propiedades": (normalizar_propiedad, aplicar_propiedades),
+    "eventos": (normalizar_evento, aplicar_eventos),
+}
+
+# recurso -> validar chunk (modo "validate")
+VALIDADORES = {
+    "leads": validar_contactos,
+    "propiedades": validar_propiedades,
+    "eventos": validar_eventos,
+}
+
+
+def importar_por_chunks(user, resource: str, rows, chunk_size: int = IMPORT_CHUNK_SIZE, desde: int = 0,
+                        solo_validar: bool = False, workers: int = 0):
+    """
+    Generador: importa `rows` de a chunks y por cada uno devuelve
+    (última fila procesada, created, updated, errors). Cada chunk se aplica recién al
+    pedir el siguiente valor, así quien consume puede envolverlo en su propia transacción
+    (ver tareas.py). `desde` saltea las filas ya importadas (reanudar un import).
+    Con `solo_validar` no se escribe nada (ver VALIDADORES). Con `workers` > 1 la
+    normalización de los chunks siguientes corre en paralelo mientras se aplica el actual.
+    """
+    aplicar = VALIDADORES[resource] if solo_validar else IMPORTADORES[resource][1]
+
+    def chunks():
+        chunk = []
+        for row, raw in enumerate(rows, start=1):
+            if row <= desde:
+                continue
+            chunk.append((row, raw))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    for chunk, filas, errors in _normalizados(resource, chunks(), workers):
+        created = updated = 0
+        if filas:
+            created, updated, errores_db = aplicar(user, filas)
+            errors.extend(errores_db)
+        errors.sort(key=lambda e: e["row"])
+        yield chunk[-1][0], created, updated, errors
+
+
+def importar_filas(user, resource: str, rows, chunk_size: int = IMPORT_CHUNK_SIZE,
+                   solo_validar: bool = False, workers: int = 0) -> dict:
+    """
+    Importa `rows` (iterable de dicts) del recurso. Devuelve
+    {"created": n, "updated": n, "errors": [{"row": n, "error": "..."}]} con las filas
+    numeradas desde 1, igual que antes.
+    """
+    result = {"created": 0, "updated": 0, "errors": []}
+    for _, created, updated, errors in importar_por_chunks(user, resource, rows, chunk_size,
+                                                           solo_validar=solo_validar, workers=workers):
+        result["created"] += created
+        result["updated"] += updated
+        result["errors"].extend(errors)
+    return result
@@ -0,0 +1,144 @@
+# exportacion/lectura.py
+"""
+Lectura en streaming de archivos de importación (CSV / JSON).
+
+Nada se carga entero en memoria: el archivo subido (Django ya lo deja en disco si es
+grande) se decodifica de a bloques y las filas salen de a una, así que el consumo no
+depende del tamaño del archivo. El motor de importación las va tomando por chunks.
+"""
+import codecs
+import csv
+import json
+
+# Bytes leídos por vez del archivo subido
+BLOCK_SIZE = 64 * 1024
+
+_ESPACIOS = " \t\n\r"
+
+
+class ArchivoInvalido(ValueError):
+    """El archivo no se puede leer (JSON mal formado, no es una lista, etc.)."""
+
+
+def detectar_encoding(file_obj) -> str:
+    """
+    'utf-8-sig' si todo el archivo es UTF-8 válido; si no 'latin-1' (mismo criterio
+    que antes). Recorre el archivo de a bloques sin guardarlo y vuelve al inicio.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        for block in iter(lambda: file_obj.read(BLOCK_SIZE), b""):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    file_obj.seek(0)
+    return encoding
+
+
+def bloques_de_texto(file_obj, encoding: str):
+    """Texto decodificado de a bloques (un carácter multibyte puede quedar entre dos bloques)."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for block in iter(lambda: file_obj.read(BLOCK_SIZE), b""):
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _lineas(bloques):
+    """Corta solo en '\\n' (como iterar un StringIO) y conserva el fin de línea para csv."""
+    pendiente = ""
+    for bloque in bloques:
+        partes = (pendiente + bloque).split("\n")
+        pendiente = partes.pop()
+        for linea in partes:
+            yield linea + "\n"
+    if pendiente:
+        yield pendiente
+
+
+def leer_csv(file_obj, encoding: str):
+    """Filas del CSV como dicts (csv.DictReader), de a una."""
+    reader = csv.DictReader(_lineas(bloques_de_texto(file_obj, encoding)))
+    try:
+        yield from reader
+    except csv.Error as e:
+        raise ArchivoInvalido(f"CSV inválido (línea {reader.line_num}): {e}")
+
+
+def leer_json(file_obj, encoding: str):
+    """Elementos de un array JSON de nivel superior, de a uno."""
+    return iter(_ArrayJSON(bloques_de_texto(file_obj, encoding)))
+
+
+class _ArrayJSON:
+    """
+    Parser incremental de `[v1, v2, ...]`: cada elemento se decodifica con
+    JSONDecoder.raw_decode apenas está completo en el buffer; lo ya leído se descarta.
+    """
+
+    def __init__(self, bloques):
+        self._bloques = iter(bloques)
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.fin = False
+
+    def _leer(self) -> bool:
+        bloque = next(self._bloques, None)
+        if bloque is None:
+            self.fin = True
+            return False
+        self.buf = self.buf[self.pos:] + bloque
+        self.pos = 0
+        return True
+
+    def _proximo_caracter(self):
+        """Salta espacios y devuelve el próximo carácter (sin consumirlo) o None al final."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _ESPACIOS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._leer():
+                return None
+
+    def _valor(self, n: int):
+        while True:
+            try:
+                valor, fin = self._decoder.raw_decode(self.buf, self.pos)
+                # Un número al borde del buffer puede seguir en el próximo bloque
+                if fin < len(self.buf) or self.fin:
+                    self.pos = fin
+                    return valor
+            except json.JSONDecodeError as e:
+                if self.fin:
+                    raise ArchivoInvalido(f"JSON inválido (elemento {n}): {e.msg}")
+            self._leer()
+
+    def __iter__(self):
+        if self._proximo_caracter() != "[":
+            raise ArchivoInvalido("El JSON debe ser una lista de objetos.")
+        self.pos += 1
+
+        n = 0
+        while True:
+            c = self._proximo_caracter()
+            if c == "]":
+                self.pos += 1
+                if self._proximo_caracter() is not None:
+                    raise ArchivoInvalido("JSON inválido: hay datos después de la lista.")
+                return
+            if n:
+                if c != ",":
+                    raise ArchivoInvalido(f"JSON inválido (elemento {n + 1}): se esperaba ',' o ']'.")
+                self.pos += 1
+                c = self._proximo_caracter()
+            if c is None:
+                raise ArchivoInvalido("JSON inválido: la lista no está cerrada.")
+            n += 1
+            yield self._valor(n)
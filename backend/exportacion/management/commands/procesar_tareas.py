@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from exportacion.tareas import TAREA_TIMEOUT, ejecutar_tarea, tomar_tarea
+
+
+class Command(BaseCommand):
+    help = "Worker de tareas de import/export en segundo plano (exportacion.Tarea)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Segundos de espera cuando no hay tareas")
+        parser.add_argument(
+            "--timeout-min", type=int, default=int(TAREA_TIMEOUT.total_seconds() // 60),
+            help="Minutos sin latido para retomar una tarea 'en_curso' (worker caído)",
+        )
+
+    def handle(self, *args, **opts):
+        timeout = timedelta(minutes=opts["timeout_min"])
+        self.stdout.write("Esperando tareas...")
+        while True:
+            tarea = tomar_tarea(timeout)
+            if tarea is None:
+                if opts["once"]:
+                    return
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"Procesando {tarea} desde la fila {tarea.filas_procesadas}")
+            ejecutar_tarea(tarea)
+            tarea.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f"{tarea}: {tarea.filas_procesadas} filas, {tarea.creados} creados, "
+                f"{tarea.actualizados} actualizados, {tarea.errores} errores"
+            ))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exportacion.models import Borrado
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los tombstones del sync incremental (exportacion.Borrado) más viejos que "
+        "SYNC_RETENCION_DIAS. Correrlo a diario (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=settings.SYNC_RETENCION_DIAS, help="Días a conservar")
+        parser.add_argument("--lote", type=int, default=5000, help="Filas por DELETE")
+
+    def handle(self, *args, **opts):
+        limite = timezone.now() - timedelta(days=opts["dias"])
+        total = 0
+        # Por lotes: un único DELETE de millones de filas bloquea la tabla mientras se sincroniza
+        while True:
+            ids = list(Borrado.objects.filter(borrado_en__lt=limite).values_list("pk", flat=True)[: opts["lote"]])
+            if not ids:
+                break
+            total += Borrado.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{total} borrados purgados."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from exportacion.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Arma desde cero los resúmenes diarios (exportacion.ResumenDiario) desde los datos reales. "
+        "Correrlo una vez al desplegar (backfill) y cuando haga falta reconciliar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None, help="Solo este owner (id)")
+
+    def handle(self, *args, **opts):
+        total = reconstruir(opts["owner"])
+        self.stdout.write(self.style.SUCCESS(f"{total} resúmenes diarios escritos."))
@@ -0,0 +1,109 @@
+# exportacion/metricas.py
+"""
+Métricas mensuales (leads, ventas, conversión) para MetricsView.
+
+- Se calculan sumando los resúmenes diarios (ResumenDiario, ver resumenes.py): un rango
+  de años es una query sobre unos cientos de filas, no sobre Contacto/Propiedad.
+- Los meses cerrados se cachean por owner y mes. El mes en curso (y los futuros) no.
+  Solo con cache compartido (versiones.habilitadas()): con LocMemCache la invalidación
+  llegaría solo al proceso que escribe y los demás servirían meses viejos.
+- Invalidación: solo cuando una escritura cae en ese mes (creado_en del contacto;
+  vendida_en / fecha_alta de una propiedad vendida, antes o después del cambio).
+  Ver signals.py y el motor de importación (que no dispara signals).
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from leads import versiones
+
+from . import resumenes
+from .utils import _month_range
+
+# Los meses cerrados solo cambian si se invalidan; el TTL es un resguardo
+METRICAS_CACHE_TTL = int(timedelta(days=7).total_seconds())
+
+# Máximo de meses por pedido
+METRICAS_MAX_MESES = 120
+
+
+def _clave(owner_id, year: int, month: int) -> str:
+    return f"exportacion:metricas:{owner_id}:{year:04d}-{month:02d}"
+
+
+def mes_de(dt) -> tuple[int, int]:
+    """(año, mes) de una fecha en la zona horaria local (la misma que usa _month_range)."""
+    dt = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+    return dt.year, dt.month
+
+
+def meses_entre(desde: tuple[int, int], hasta: tuple[int, int]) -> list[tuple[int, int]]:
+    meses = []
+    year, month = desde
+    while (year, month) <= hasta:
+        meses.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return meses
+
+
+def metricas_mensuales(user, desde: tuple[int, int], hasta: tuple[int, int]) -> list[dict]:
+    """[{year, month, leads_mes, ventas_mes, conversion_pct}, ...] de `desde` a `hasta` (inclusive)."""
+    meses = meses_entre(desde, hasta)
+    actual = mes_de(timezone.now())
+
+    claves = {m: _clave(user.pk, *m) for m in meses if m < actual} if versiones.habilitadas() else {}
+    cacheados = cache.get_many(claves.values()) if claves else {}
+
+    faltan = [m for m in meses if claves.get(m) not in cacheados]
+    calculados = _calcular(user, faltan) if faltan else {}
+    nuevos = {claves[m]: calculados[m] for m in faltan if m in claves}
+    if nuevos:
+        cache.set_many(nuevos, METRICAS_CACHE_TTL)
+
+    resultado = []
+    for m in meses:
+        datos = cacheados[claves[m]] if m in claves and claves[m] in cacheados else calculados[m]
+        leads, ventas = datos["leads_mes"], datos["ventas_mes"]
+        resultado.append({
+            "year": m[0],
+            "month": m[1],
+            "leads_mes": leads,
+            "ventas_mes": ventas,
+            "conversion_pct": round((ventas / leads * 100.0), 2) if leads else 0.0,
+        })
+    return resultado
+
+
+def _calcular(user, meses) -> dict:
+    """{(año, mes): {"leads_mes", "ventas_mes"}} desde los resúmenes diarios del rango."""
+    desde, hasta = min(meses), max(meses)
+    por_mes = {
+        g["periodo"]: g
+        for g in resumenes.agrupar(
+            resumenes.del_rango(user.pk, date(*desde, 1), _month_range(*hasta)[1].date()),
+            lambda dia: (dia.year, dia.month),
+        )
+    }
+    vacio = {"leads_creados": 0, "propiedades_vendidas": 0, "vendidas_por_alta": 0}
+
+    # Ventas: por vendida_en; si ese mes no tiene ninguna, por fecha_alta (como antes)
+    resultado = {}
+    for m in meses:
+        g = por_mes.get(m, vacio)
+        resultado[m] = {"leads_mes": g["leads_creados"], "ventas_mes": g["propiedades_vendidas"] or g["vendidas_por_alta"]}
+    return resultado
+
+
+def invalidar_meses(owner_id, fechas):
+    """
+    Descarta del cache los meses cerrados de `fechas` (None se ignora) al confirmarse
+    la transacción: si se revierte, el cache sigue valiendo.
+    """
+    if owner_id is None or not versiones.habilitadas():
+        return
+    actual = mes_de(timezone.now())
+    claves = {_clave(owner_id, *m) for m in {mes_de(f) for f in fechas if f} if m < actual}
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(list(claves)))
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('import', 'Importación'), ('export', 'Exportación')], max_length=10)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida'), ('cancelada', 'Cancelada')], default='pendiente', max_length=12)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('archivo', models.FileField(blank=True, upload_to='exportacion/tareas/entrada/%Y/%m/')),
+                ('resultado', models.FileField(blank=True, upload_to='exportacion/tareas/resultado/')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('creados', models.PositiveIntegerField(default=0)),
+                ('actualizados', models.PositiveIntegerField(default=0)),
+                ('errores', models.PositiveIntegerField(default=0)),
+                ('detalle', models.TextField(blank=True, default='')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tareas_exportacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TareaError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fila', models.PositiveIntegerField()),
+                ('error', models.TextField()),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errores_filas', to='exportacion.tarea')),
+            ],
+            options={
+                'ordering': ['fila', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['estado', 'id'], name='exportacion_estado_257aba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['owner', 'id'], name='exportacion_owner_i_30a24a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tareaerror',
+            index=models.Index(fields=['tarea', 'fila'], name='exportacion_tarea_i_8cff5d_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exportacion', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Borrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recurso', models.CharField(choices=[('leads', 'Contacto'), ('propiedades', 'Propiedad'), ('eventos', 'Evento')], max_length=12)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('borrado_en', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'recurso', 'borrado_en', 'id'], name='exportacion_owner_i_e8af08_idx')],
+            },
+        ),
+    ]
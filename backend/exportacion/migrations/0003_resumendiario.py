@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # La tabla nace vacía: sin esto las métricas darían cero hasta correr reconstruir_resumenes
+    from exportacion.resumenes import RECONSTRUIR_CHUNK_SIZE, calcular
+
+    Contacto = apps.get_model("leads", "Contacto")
+    EstadoLeadHistorial = apps.get_model("leads", "EstadoLeadHistorial")
+    Evento = apps.get_model("leads", "Evento")
+    Propiedad = apps.get_model("propiedades", "Propiedad")
+    ResumenDiario = apps.get_model("exportacion", "ResumenDiario")
+    filas = calcular(
+        Contacto.objects.exclude(owner_id=None),
+        EstadoLeadHistorial.objects.exclude(contacto__owner_id=None),
+        Evento.objects.exclude(owner_id=None),
+        Propiedad.objects.exclude(owner_id=None),
+        modelo=ResumenDiario,
+    )
+    ResumenDiario.objects.bulk_create(filas, batch_size=RECONSTRUIR_CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exportacion', '0002_borrado'),
+        ('leads', '0005_contacto_actualizado_en_evento_actualizado_en_and_more'),
+        ('propiedades', '0004_propiedad_actualizado_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('leads_creados', models.IntegerField(default=0)),
+                ('propiedades_alta', models.IntegerField(default=0)),
+                ('propiedades_vendidas', models.IntegerField(default=0)),
+                ('vendidas_por_alta', models.IntegerField(default=0)),
+                ('transiciones', models.JSONField(blank=True, default=dict)),
+                ('eventos_por_tipo', models.JSONField(blank=True, default=dict)),
+                ('volumen_vendido', models.JSONField(blank=True, default=dict)),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'dia'), name='resumen_diario_owner_dia')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
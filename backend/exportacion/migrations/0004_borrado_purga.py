@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-17 08:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exportacion', '0003_resumendiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['borrado_en'], name='exportacion_borrado_c90942_idx'),
+        ),
+    ]
@@ -1,3 +1,137 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+# ✅ Tareas de import/export en segundo plano (las procesa `manage.py procesar_tareas`)
+class Tarea(models.Model):
+    TIPOS = [
+        ("import", "Importación"),
+        ("export", "Exportación"),
+    ]
+    ESTADOS = [
+        ("pendiente", "Pendiente"),
+        ("en_curso", "En curso"),
+        ("completada", "Completada"),
+        ("fallida", "Fallida"),
+        ("cancelada", "Cancelada"),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tareas_exportacion",
+    )
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default="pendiente")
+    # Parámetros del pedido (resource / format / compress / resources / filters ...)
+    params = models.JSONField(default=dict, blank=True)
+
+    # Archivo subido (import) y resultado descargable (export o reporte de errores)
+    archivo = models.FileField(upload_to="exportacion/tareas/entrada/%Y/%m/", blank=True)
+    resultado = models.FileField(upload_to="exportacion/tareas/resultado/", blank=True)
+
+    # Progreso: filas_procesadas es también el punto de reanudación de un import
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    errores = models.PositiveIntegerField(default=0)
+    detalle = models.TextField(blank=True, default="")  # motivo si falló
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    # Latido del worker: se actualiza en cada chunk (una tarea "en_curso" sin latido se retoma)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["estado", "id"]),  # cola del worker
+            models.Index(fields=["owner", "id"]),   # listado del usuario
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+    @property
+    def terminada(self) -> bool:
+        return self.estado in ("completada", "fallida", "cancelada")
+
+
+class TareaError(models.Model):
+    """Errores por fila de un import (se guardan en la misma transacción que su chunk)."""
+    tarea = models.ForeignKey(Tarea, on_delete=models.CASCADE, related_name="errores_filas")
+    fila = models.PositiveIntegerField()
+    error = models.TextField()
+
+    class Meta:
+        ordering = ["fila", "id"]
+        indexes = [
+            models.Index(fields=["tarea", "fila"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.tarea_id} fila {self.fila}: {self.error[:60]}"
+
+
+# ✅ Tombstones: registros borrados, para que /sync/ también informe las bajas
+class Borrado(models.Model):
+    RECURSOS = [
+        ("leads", "Contacto"),
+        ("propiedades", "Propiedad"),
+        ("eventos", "Evento"),
+    ]
+
+    # Sin FK real: el borrado de un usuario borra sus registros en cascada y esos
+    # tombstones se crean en la misma transacción (un FK con constraint lo rompería)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+        null=True,
+    )
+    recurso = models.CharField(max_length=12, choices=RECURSOS)
+    objeto_id = models.PositiveBigIntegerField()
+    borrado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "recurso", "borrado_en", "id"]),
+            models.Index(fields=["borrado_en"]),  # purgar_borrados
+        ]
+
+    def __str__(self):
+        return f"{self.recurso} #{self.objeto_id} borrado {self.borrado_en:%Y-%m-%d %H:%M}"
+
+
+# ✅ Resumen diario por owner (series de métricas sin recorrer las tablas crudas, ver resumenes.py)
+class ResumenDiario(models.Model):
+    # Sin FK real, igual que Borrado: el borrado en cascada de un usuario ajusta sus
+    # resúmenes en la misma transacción (las filas se limpian al confirmar)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    dia = models.DateField()  # día local (TIME_ZONE)
+
+    leads_creados = models.IntegerField(default=0)           # Contacto.creado_en
+    propiedades_alta = models.IntegerField(default=0)        # Propiedad.fecha_alta
+    propiedades_vendidas = models.IntegerField(default=0)    # vendidas, por vendida_en
+    vendidas_por_alta = models.IntegerField(default=0)       # vendidas, por fecha_alta
+    # {"<estado_id>" (o "" si se borró el estado): n} de EstadoLeadHistorial.changed_at
+    transiciones = models.JSONField(default=dict, blank=True)
+    # {"<tipo>": n} por Evento.fecha_hora
+    eventos_por_tipo = models.JSONField(default=dict, blank=True)
+    # {"<moneda>": "monto"} de las vendidas ese día (Decimal como string)
+    volumen_vendido = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "dia"], name="resumen_diario_owner_dia"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} {self.dia:%Y-%m-%d}"
@@ -0,0 +1,134 @@
+# exportacion/normalizacion.py
+"""
+Normalización de filas de importación: solo CPU (strings, enteros, decimales, fechas),
+sin tocar la DB. Está aparte de importacion.py (que importa modelos) para que los
+procesos del pool de normalización puedan importarla antes de configurar Django.
+"""
+from .utils import _parse_dt, _to_decimal
+
+# =======================
+# Normalización (sin DB)
+# =======================
+
+def _texto(raw: dict, key: str) -> str:
+    val = raw.get(key)
+    return str(val).strip() if val is not None else ""
+
+
+def _entero(raw: dict, key: str):
+    val = raw.get(key)
+    if val in (None, ""):
+        return None
+    try:
+        return int(str(val).strip())
+    except ValueError:
+        raise ValueError(f"'{key}' debe ser un número entero.")
+
+
+def _como_dict(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("Cada fila debe ser un objeto con columnas.")
+    return raw
+
+
+def normalizar_contacto(raw) -> dict:
+    raw = _como_dict(raw)
+    email = _texto(raw, "email")
+    if not email:
+        raise ValueError("Contacto requiere 'email' como clave.")
+    return {
+        "email": email,
+        "nombre": _texto(raw, "nombre"),
+        "apellido": _texto(raw, "apellido"),
+        "telefono": _texto(raw, "telefono"),
+        # estado por descripción/fase opcional
+        "estado_fase": _texto(raw, "estado_fase") or _texto(raw, "estado") or None,
+        "creado_en": _parse_dt(raw.get("creado_en")),
+    }
+
+
+def normalizar_propiedad(raw) -> dict:
+    raw = _como_dict(raw)
+    codigo = _texto(raw, "codigo")
+    if not codigo:
+        raise ValueError("Propiedad requiere 'codigo' como clave.")
+
+    campos = {}
+    # campos opcionales
+    for key in ("titulo", "descripcion", "ubicacion", "tipo_de_propiedad",
+                "disponibilidad", "moneda", "estado"):
+        val = raw.get(key)
+        if val is not None and val != "":
+            campos[key] = val
+
+    # numéricos (los inválidos se ignoran, como antes)
+    for key in ("precio", "superficie"):
+        val = _to_decimal(raw.get(key))
+        if val is not None:
+            campos[key] = val
+    for key in ("ambiente", "antiguedad", "banos"):
+        try:
+            val = _entero(raw, key)
+        except ValueError:
+            continue
+        if val is not None:
+            campos[key] = val
+
+    # fechas
+    for key in ("fecha_alta", "vendida_en"):
+        val = _parse_dt(raw.get(key))
+        if val:
+            campos[key] = val
+
+    return {"codigo": codigo, "campos": campos}
+
+
+def normalizar_evento(raw) -> dict:
+    raw = _como_dict(raw)
+    tipo = _texto(raw, "tipo")
+    if not tipo:
+        raise ValueError("Evento requiere 'tipo'.")
+    fecha_hora = _parse_dt(raw.get("fecha_hora"))
+    if not fecha_hora:
+        raise ValueError("Evento requiere 'fecha_hora' válida.")
+    return {
+        "id": _entero(raw, "id"),
+        "tipo": tipo,
+        "fecha_hora": fecha_hora,
+        "propiedad_id": _entero(raw, "propiedad_id"),
+        "propiedad_codigo": _texto(raw, "propiedad_codigo"),
+        "contacto_id": _entero(raw, "contacto_id"),
+        "contacto_email": _texto(raw, "contacto_email"),
+        "nombre": _texto(raw, "nombre"),
+        "apellido": _texto(raw, "apellido"),
+        "email": _texto(raw, "email"),
+        "notas": _texto(raw, "notas"),
+    }
+
+
+NORMALIZADORES = {
+    "leads": normalizar_contacto,
+    "propiedades": normalizar_propiedad,
+    "eventos": normalizar_evento,
+}
+
+
+def normalizar_chunk(resource: str, chunk):
+    """
+    Normaliza [(fila, raw), ...] -> ([(fila, normalizada), ...], errores). No usa la DB,
+    así que puede correr en otro proceso.
+    """
+    normalizar = NORMALIZADORES[resource]
+    filas, errors = [], []
+    for row, raw in chunk:
+        try:
+            filas.append((row, normalizar(raw)))
+        except Exception as e:
+            errors.append({"row": row, "error": str(e)})
+    return filas, errors
+
+
+def iniciar_worker():
+    # Procesos "spawn": arrancan sin Django (make_aware necesita TIME_ZONE de settings)
+    import django
+    django.setup()
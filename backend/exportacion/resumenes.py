@@ -0,0 +1,358 @@
+# exportacion/resumenes.py
+"""
+Resúmenes diarios por owner (ResumenDiario): leads creados, transiciones de estado
+(EstadoLeadHistorial), eventos por tipo, propiedades dadas de alta y vendidas, y
+volumen vendido por moneda. Un rango de años se responde con unos cientos de filas.
+
+- Cada fila de Contacto / EstadoLeadHistorial / Evento / Propiedad "aporta" a un día
+  (ver aporte_*). Las signals suman la diferencia entre el aporte anterior y el nuevo
+  dentro de la misma transacción; el import (sin signals) mide antes y después.
+- El día es el día local (TIME_ZONE), el mismo corte que usa _month_range en métricas.
+  Se calcula en Python: agrupar por día en la DB necesita las tablas de zonas de MySQL.
+- Los resúmenes reflejan los datos actuales: borrar un registro descuenta su aporte.
+- La migración que crea la tabla la llena con lo existente; `manage.py reconstruir_resumenes`
+  los arma desde cero cuando haga falta reconciliar.
+"""
+from collections import Counter, defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, NotSupportedError, transaction
+from django.db.models import F, Func, JSONField, Q, Value
+from django.utils import timezone
+
+from leads.models import Contacto, EstadoLeadHistorial, Evento
+from propiedades.models import Propiedad
+
+from .models import ResumenDiario
+
+CAMPOS = ("leads_creados", "propiedades_alta", "propiedades_vendidas", "vendidas_por_alta")
+
+# Campos JSON: en los aportes van como "<campo>:<clave>"
+CAMPOS_JSON = ("transiciones", "eventos_por_tipo", "volumen_vendido")
+
+# Lo que se lee de una Propiedad (en el orden de aporte_propiedad)
+CAMPOS_PROPIEDAD = ("owner_id", "fecha_alta", "estado", "vendida_en", "moneda", "precio")
+
+# Filas por query al reconstruir
+RECONSTRUIR_CHUNK_SIZE = 2000
+
+
+def dia_de(dt) -> date | None:
+    """Día local de una fecha (None si no hay fecha)."""
+    if not dt:
+        return None
+    return timezone.localdate(dt) if timezone.is_aware(dt) else dt.date()
+
+
+# =======================
+# Aportes: {(owner_id, dia): Counter}
+# =======================
+
+def aporte_contacto(owner_id, creado_en) -> dict:
+    return {(owner_id, dia_de(creado_en)): Counter({"leads_creados": 1})}
+
+
+def aporte_transicion(owner_id, changed_at, estado_id) -> dict:
+    return {(owner_id, dia_de(changed_at)): Counter({f"transiciones:{estado_id or ''}": 1})}
+
+
+def aporte_evento(owner_id, fecha_hora, tipo) -> dict:
+    return {(owner_id, dia_de(fecha_hora)): Counter({f"eventos_por_tipo:{tipo}": 1})}
+
+
+def aporte_propiedad(owner_id, fecha_alta, estado, vendida_en, moneda, precio) -> dict:
+    vendida = estado == "vendido"
+    aporte = {(owner_id, dia_de(fecha_alta)): Counter({"propiedades_alta": 1, "vendidas_por_alta": int(vendida)})}
+    if vendida and vendida_en:
+        aporte = sumar(aporte, {(owner_id, dia_de(vendida_en)): Counter({
+            "propiedades_vendidas": 1,
+            f"volumen_vendido:{moneda}": Decimal(str(precio or 0)),
+        })})
+    return aporte
+
+
+def sumar(*aportes) -> dict:
+    total = defaultdict(Counter)
+    for aporte in aportes:
+        for clave, c in aporte.items():
+            total[clave].update(c)
+    return total
+
+
+def diferencia(antes: dict, despues: dict) -> dict:
+    """despues - antes (con negativos, a diferencia de Counter.__sub__)."""
+    deltas = sumar(despues)
+    for clave, c in antes.items():
+        deltas[clave].subtract(c)
+    return deltas
+
+
+# =======================
+# Medir (lo que aportan hoy, en la DB)
+# =======================
+
+def transiciones(historial) -> dict:
+    """Aporte de un queryset de EstadoLeadHistorial."""
+    return sumar(*(
+        aporte_transicion(*fila)
+        for fila in historial.values_list("contacto__owner_id", "changed_at", "estado_id").iterator()
+    ))
+
+
+def medir(contactos=(), propiedades=(), eventos=()) -> dict:
+    """Aporte actual de esos contactos (con su historial de estados), propiedades y eventos."""
+    aportes = []
+    if contactos:
+        contactos = list(contactos)
+        qs = Contacto.objects.filter(pk__in=contactos).values_list("owner_id", "creado_en")
+        aportes += [aporte_contacto(*fila) for fila in qs]
+        aportes.append(transiciones(EstadoLeadHistorial.objects.filter(contacto_id__in=contactos)))
+    if propiedades:
+        qs = Propiedad.objects.filter(pk__in=list(propiedades)).values_list(*CAMPOS_PROPIEDAD)
+        aportes += [aporte_propiedad(*fila) for fila in qs]
+    if eventos:
+        qs = Evento.objects.filter(pk__in=list(eventos)).values_list("owner_id", "fecha_hora", "tipo")
+        aportes += [aporte_evento(*fila) for fila in qs]
+    return sumar(*aportes)
+
+
+# =======================
+# Escribir
+# =======================
+
+def _sumar_a_fila(fila: ResumenDiario, delta: Counter):
+    for clave, n in delta.items():
+        campo, _, sub = clave.partition(":")
+        if campo not in CAMPOS_JSON:
+            setattr(fila, campo, getattr(fila, campo) + n)
+            continue
+        valores = dict(getattr(fila, campo))
+        if campo == "volumen_vendido":
+            total = Decimal(valores.get(sub, "0")) + n
+            valores[sub] = str(total)
+        else:
+            total = valores.get(sub, 0) + n
+            valores[sub] = total
+        if not total:
+            del valores[sub]
+        setattr(fila, campo, valores)
+
+
+def _vacia(fila: ResumenDiario) -> bool:
+    return not any(getattr(fila, c) for c in CAMPOS) and not any(getattr(fila, c) for c in CAMPOS_JSON)
+
+
+class _SumarJSON(Func):
+    """
+    JSON con la clave `clave` de la columna `campo` incrementada en `n` (la crea si falta):
+    JSON_SET(base, '$."clave"', COALESCE(JSON_EXTRACT(campo, '$."clave"'), 0) + n).
+    `base` es la columna o otro _SumarJSON de la misma columna (varias claves en un UPDATE).
+    Con `decimal` el valor queda como string con 2 decimales (volumen_vendido).
+    SQL de MySQL y SQLite (JSON1): los dos backends del proyecto.
+    """
+    output_field = JSONField()
+
+    def __init__(self, base, campo, clave, n, decimal=False):
+        # claves: ids de estado, tipos de evento y monedas (nunca llevan comillas)
+        if '"' in clave or "\\" in clave:
+            raise ValueError(f"Clave de resumen inválida: {clave!r}")
+        ruta = f'$."{clave}"'
+        self.decimal = decimal
+        super().__init__(base if hasattr(base, "resolve_expression") else F(base), F(campo), Value(ruta), Value(n))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError("Los resúmenes diarios necesitan JSON_SET (MySQL o SQLite).")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        if self.decimal:
+            return self._json_set(compiler, "printf('%%.2f', COALESCE(JSON_EXTRACT({campo}, {ruta}), 0) + {n})")
+        return self._json_set(compiler, "COALESCE(JSON_EXTRACT({campo}, {ruta}), 0) + {n}")
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        if self.decimal:
+            return self._json_set(compiler, (
+                "CAST(CAST(COALESCE(JSON_UNQUOTE(JSON_EXTRACT({campo}, {ruta})), '0') AS DECIMAL(20, 2))"
+                " + CAST({n} AS DECIMAL(20, 2)) AS CHAR)"
+            ))
+        return self._json_set(compiler, "COALESCE(JSON_EXTRACT({campo}, {ruta}), 0) + {n}")
+
+    def _json_set(self, compiler, valor):
+        (base, p_base), (campo, p_campo), (ruta, p_ruta), (n, p_n) = (
+            compiler.compile(e) for e in self.get_source_expressions()
+        )
+        sql = f"JSON_SET({base}, {ruta}, {valor.format(campo=campo, ruta=ruta, n=n)})"
+        return sql, (*p_base, *p_ruta, *p_campo, *p_ruta, *p_n)
+
+
+def _incrementos(delta: dict) -> dict:
+    """{campo: expresión} que suma `delta` a una fila existente en un solo UPDATE."""
+    cambios = {}
+    for clave, n in delta.items():
+        campo, _, sub = clave.partition(":")
+        if campo not in CAMPOS_JSON:
+            cambios[campo] = F(campo) + n
+        elif campo == "volumen_vendido":
+            cambios[campo] = _SumarJSON(cambios.get(campo, campo), campo, sub, str(n), decimal=True)
+        else:
+            cambios[campo] = _SumarJSON(cambios.get(campo, campo), campo, sub, n)
+    return cambios
+
+
+# Hasta cuántos días se aplican con un UPDATE por día; más que eso (import) va en lote
+APLICAR_POR_DIA_MAX = 4
+
+
+def aplicar(deltas: dict):
+    """
+    Suma {(owner_id, dia): Counter} a los resúmenes.
+
+    - Pocos días (un save): un UPDATE atómico (F() / JSON_SET) por día, sin leer la fila;
+      solo si el día todavía no tiene fila, un INSERT.
+    - Muchos días (import): queries constantes, con lock de las filas (ver _aplicar_en_lote).
+
+    Las filas/claves que quedan en cero no se borran en el camino por día: agrupar() las omite.
+    """
+    deltas = {
+        (owner_id, dia): {k: v for k, v in delta.items() if v}
+        for (owner_id, dia), delta in sorted(deltas.items(), key=lambda e: e[0])  # orden fijo de locks
+        if owner_id is not None and dia is not None
+    }
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    if len(deltas) > APLICAR_POR_DIA_MAX:
+        _aplicar_en_lote(deltas)
+    elif len(deltas) > 1:
+        with transaction.atomic():
+            _aplicar_por_dia(deltas)
+    else:
+        _aplicar_por_dia(deltas)
+
+
+def _aplicar_por_dia(deltas: dict):
+    for (owner_id, dia), delta in deltas.items():
+        filas = ResumenDiario.objects.filter(owner_id=owner_id, dia=dia)
+        if filas.update(**_incrementos(delta)):
+            continue
+        fila = ResumenDiario(owner_id=owner_id, dia=dia, transiciones={}, eventos_por_tipo={}, volumen_vendido={})
+        _sumar_a_fila(fila, delta)
+        try:
+            with transaction.atomic():
+                fila.save(force_insert=True)
+        except IntegrityError:
+            # Otra transacción creó la fila del día entre el UPDATE y el INSERT
+            filas.update(**_incrementos(delta))
+
+
+def _aplicar_en_lote(deltas: dict):
+    """Crea las filas que falten, las lee con lock y las reescribe: 3-4 queries para cualquier cantidad de días."""
+    with transaction.atomic():
+        # Primero las filas que falten (vacías; si otra transacción la crea a la vez, se ignora)
+        ResumenDiario.objects.bulk_create(
+            [ResumenDiario(owner_id=owner_id, dia=dia) for owner_id, dia in deltas],
+            ignore_conflicts=True,
+        )
+        por_owner = defaultdict(list)
+        for owner_id, dia in deltas:
+            por_owner[owner_id].append(dia)
+        filtro = Q()
+        for owner_id, dias in por_owner.items():
+            filtro |= Q(owner_id=owner_id, dia__in=dias)
+        filas = ResumenDiario.objects.select_for_update().filter(filtro).order_by("owner_id", "dia")
+
+        cambiadas, vacias = [], []
+        for fila in filas:
+            _sumar_a_fila(fila, deltas[(fila.owner_id, fila.dia)])
+            (vacias if _vacia(fila) else cambiadas).append(fila)
+        if cambiadas:
+            ResumenDiario.objects.bulk_update(cambiadas, [*CAMPOS, *CAMPOS_JSON])
+        if vacias:
+            ResumenDiario.objects.filter(pk__in=[f.pk for f in vacias]).delete()
+
+
+def calcular(contactos, historial, eventos, propiedades, modelo=ResumenDiario) -> list:
+    """
+    Filas de `modelo` (sin guardar, solo las que tienen datos) con el aporte de esos
+    querysets, recorridos de a RECONSTRUIR_CHUNK_SIZE filas. `modelo` puede ser el
+    histórico de una migración (ver migrations/0003_resumendiario.py).
+    """
+    total = defaultdict(Counter)
+
+    def acumular(aporte):
+        for clave, c in aporte.items():
+            total[clave].update(c)
+
+    for fila in contactos.values_list("owner_id", "creado_en").iterator(RECONSTRUIR_CHUNK_SIZE):
+        acumular(aporte_contacto(*fila))
+    for fila in historial.values_list("contacto__owner_id", "changed_at", "estado_id").iterator(RECONSTRUIR_CHUNK_SIZE):
+        acumular(aporte_transicion(*fila))
+    for fila in eventos.values_list("owner_id", "fecha_hora", "tipo").iterator(RECONSTRUIR_CHUNK_SIZE):
+        acumular(aporte_evento(*fila))
+    for fila in propiedades.values_list(*CAMPOS_PROPIEDAD).iterator(RECONSTRUIR_CHUNK_SIZE):
+        acumular(aporte_propiedad(*fila))
+
+    filas = []
+    for (oid, dia), delta in sorted(total.items(), key=lambda e: e[0]):
+        if dia is None:
+            continue
+        fila = modelo(owner_id=oid, dia=dia, transiciones={}, eventos_por_tipo={}, volumen_vendido={})
+        _sumar_a_fila(fila, delta)
+        if not _vacia(fila):
+            filas.append(fila)
+    return filas
+
+
+def reconstruir(owner_id=None) -> int:
+    """Rearma desde cero los resúmenes de un owner (o de todos). Devuelve cuántas filas escribió."""
+    def de_owner(qs, campo="owner_id"):
+        qs = qs.exclude(**{campo: None})
+        return qs.filter(**{campo: owner_id}) if owner_id is not None else qs
+
+    filas = calcular(
+        de_owner(Contacto.objects.all()),
+        de_owner(EstadoLeadHistorial.objects.all(), "contacto__owner_id"),
+        de_owner(Evento.objects.all()),
+        de_owner(Propiedad.objects.all()),
+    )
+    with transaction.atomic():
+        existentes = ResumenDiario.objects.all()
+        if owner_id is not None:
+            existentes = existentes.filter(owner_id=owner_id)
+        existentes.delete()
+        ResumenDiario.objects.bulk_create(filas, batch_size=RECONSTRUIR_CHUNK_SIZE)
+    return len(filas)
+
+
+# =======================
+# Leer
+# =======================
+
+def del_rango(owner_id, desde: date, hasta: date):
+    """Resúmenes del owner entre `desde` y `hasta` (inclusive), por día (puede haber filas en cero)."""
+    return ResumenDiario.objects.filter(owner_id=owner_id, dia__range=(desde, hasta)).order_by("dia")
+
+
+def agrupar(filas, periodo) -> list[dict]:
+    """
+    Suma las filas por período: `periodo(dia)` da la clave (p. ej. el mismo día o (año, mes)).
+    [{"periodo", <CAMPOS>, <CAMPOS_JSON>}, ...] en orden; volumen_vendido como string.
+    """
+    grupos = {}
+    for fila in filas:
+        clave = periodo(fila.dia)
+        g = grupos.get(clave)
+        if g is None:
+            g = grupos[clave] = ResumenDiario(transiciones={}, eventos_por_tipo={}, volumen_vendido={})
+        delta = Counter({c: getattr(fila, c) for c in CAMPOS})
+        for campo in CAMPOS_JSON:
+            for sub, n in getattr(fila, campo).items():
+                delta[f"{campo}:{sub}"] += Decimal(n) if campo == "volumen_vendido" else n
+        _sumar_a_fila(g, delta)
+    return [
+        {
+            "periodo": clave,
+            **{c: getattr(g, c) for c in CAMPOS},
+            **{c: dict(sorted(getattr(g, c).items())) for c in CAMPOS_JSON},
+        }
+        for clave, g in grupos.items()
+        if not _vacia(g)  # días que volvieron a cero (aplicar() no borra filas)
+    ]
@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from leads.models import Contacto, EstadoLead, EstadoLeadHistorial, Evento
+from propiedades.models import Propiedad
+
+from . import resumenes
+from .metricas import invalidar_meses
+from .models import Borrado, ResumenDiario
+
+
+# =========================================
+# Cache de métricas: invalidar solo los meses tocados
+# =========================================
+@receiver(pre_save, sender=Contacto, dispatch_uid="exportacion_metricas_contacto_previo_v1")
+def _contacto_previo(sender, instance: Contacto, **kwargs):
+    """owner/creado_en antes del save (de lo cargado; solo si no se conoce, se lee la fila)."""
+    instance._metricas_previo = None
+    if not instance.pk or instance._state.adding:
+        return
+    previo = instance.loaded_values("owner_id", "creado_en")
+    if previo is None:
+        previo = Contacto.objects.filter(pk=instance.pk).values_list("owner_id", "creado_en").first()
+    instance._metricas_previo = previo
+
+
+@receiver(post_save, sender=Contacto, dispatch_uid="exportacion_metricas_contacto_guardado_v1")
+def _contacto_guardado(sender, instance: Contacto, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, "_metricas_previo", None)
+    actual = (instance.owner_id, instance.creado_en)
+    if previo == actual:
+        return
+    for owner_id, creado_en in filter(None, (previo, actual)):
+        invalidar_meses(owner_id, [creado_en])
+
+
+@receiver(post_delete, sender=Contacto, dispatch_uid="exportacion_metricas_contacto_borrado_v1")
+def _contacto_borrado(sender, instance: Contacto, **kwargs):
+    invalidar_meses(instance.owner_id, [instance.creado_en])
+
+
+def _venta(p):
+    """Lo que cuenta para métricas de una propiedad: (owner, vendida_en, fecha_alta) si está vendida."""
+    owner_id, estado, vendida_en, fecha_alta = p
+    return (owner_id, vendida_en, fecha_alta) if estado == "vendido" else None
+
+
+@receiver(pre_save, sender=Propiedad, dispatch_uid="exportacion_metricas_propiedad_previa_v1")
+def _propiedad_previa(sender, instance: Propiedad, **kwargs):
+    """Valores antes del save (de lo cargado; solo si no se conoce, se lee la fila): métricas y resúmenes."""
+    instance._metricas_previa = instance._resumen_previa = None
+    if not instance.pk or instance._state.adding:
+        return
+    previa = instance.loaded_values(*resumenes.CAMPOS_PROPIEDAD)
+    if previa is None:
+        previa = Propiedad.objects.filter(pk=instance.pk).values_list(*resumenes.CAMPOS_PROPIEDAD).first()
+    if previa:
+        owner_id, fecha_alta, estado, vendida_en, _, _ = previa
+        instance._metricas_previa = _venta((owner_id, estado, vendida_en, fecha_alta))
+        instance._resumen_previa = previa
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="exportacion_metricas_propiedad_guardada_v1")
+def _propiedad_guardada(sender, instance: Propiedad, raw=False, **kwargs):
+    if raw:
+        return
+    previa = getattr(instance, "_metricas_previa", None)
+    actual = _venta((instance.owner_id, instance.estado, instance.vendida_en, instance.fecha_alta))
+    if previa == actual:
+        return
+    for venta in (previa, actual):
+        if venta:
+            invalidar_meses(venta[0], venta[1:])
+
+
+@receiver(post_delete, sender=Propiedad, dispatch_uid="exportacion_metricas_propiedad_borrada_v1")
+def _propiedad_borrada(sender, instance: Propiedad, **kwargs):
+    venta = _venta((instance.owner_id, instance.estado, instance.vendida_en, instance.fecha_alta))
+    if venta:
+        invalidar_meses(venta[0], venta[1:])
+
+
+# =========================================
+# Resúmenes diarios (ver resumenes.py)
+# =========================================
+def _aplicar_resumen(antes, despues):
+    resumenes.aplicar(resumenes.diferencia(antes, despues))
+
+
+@receiver(post_save, sender=Contacto, dispatch_uid="exportacion_resumen_contacto_guardado_v1")
+def _resumen_contacto(sender, instance: Contacto, created=False, raw=False, **kwargs):
+    # Mismo "antes" que las métricas (_contacto_previo): owner y creado_en
+    if raw:
+        return
+    previo = getattr(instance, "_metricas_previo", None)
+    actual = (instance.owner_id, instance.creado_en)
+    if previo == actual:
+        return
+    antes = resumenes.aporte_contacto(*previo) if previo else {}
+    despues = resumenes.aporte_contacto(*actual)
+    if previo and previo[0] != actual[0]:
+        # Cambió de owner: su historial de estados pasa al nuevo
+        historial = resumenes.transiciones(EstadoLeadHistorial.objects.filter(contacto_id=instance.pk))
+        antes = resumenes.sumar(antes, {(previo[0], dia): c for (_, dia), c in historial.items()})
+        despues = resumenes.sumar(despues, historial)
+    _aplicar_resumen(antes, despues)
+
+
+@receiver(pre_delete, sender=Contacto, dispatch_uid="exportacion_resumen_contacto_por_borrar_v1")
+def _resumen_contacto_por_borrar(sender, instance: Contacto, **kwargs):
+    # Su historial cae en cascada (sin signals): se mide antes
+    instance._resumen_historial = resumenes.transiciones(
+        EstadoLeadHistorial.objects.filter(contacto_id=instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Contacto, dispatch_uid="exportacion_resumen_contacto_borrado_v1")
+def _resumen_contacto_borrado(sender, instance: Contacto, **kwargs):
+    antes = resumenes.sumar(
+        resumenes.aporte_contacto(instance.owner_id, instance.creado_en),
+        getattr(instance, "_resumen_historial", {}),
+    )
+    _aplicar_resumen(antes, {})
+
+
+@receiver(post_save, sender=EstadoLeadHistorial, dispatch_uid="exportacion_resumen_historial_creado_v1")
+def _resumen_historial(sender, instance: EstadoLeadHistorial, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    _aplicar_resumen({}, resumenes.aporte_transicion(instance.contacto.owner_id, instance.changed_at, instance.estado_id))
+
+
+@receiver(pre_delete, sender=EstadoLead, dispatch_uid="exportacion_resumen_estado_borrado_v1")
+def _resumen_estado_por_borrar(sender, instance: EstadoLead, **kwargs):
+    # El historial queda con estado NULL (SET_NULL, sin signals): pasa a la clave ""
+    historial = resumenes.transiciones(EstadoLeadHistorial.objects.filter(estado_id=instance.pk))
+    _aplicar_resumen(historial, {
+        clave: {"transiciones:": sum(c.values())} for clave, c in historial.items()
+    })
+
+
+@receiver(pre_save, sender=Evento, dispatch_uid="exportacion_resumen_evento_previo_v1")
+def _resumen_evento_previo(sender, instance: Evento, **kwargs):
+    instance._resumen_previo = None
+    if instance.pk and not instance._state.adding:
+        previo = instance.loaded_values("owner_id", "fecha_hora", "tipo")
+        if previo is None:
+            previo = Evento.objects.filter(pk=instance.pk).values_list("owner_id", "fecha_hora", "tipo").first()
+        instance._resumen_previo = previo
+
+
+@receiver(post_save, sender=Evento, dispatch_uid="exportacion_resumen_evento_guardado_v1")
+def _resumen_evento(sender, instance: Evento, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, "_resumen_previo", None)
+    actual = (instance.owner_id, instance.fecha_hora, instance.tipo)
+    if previo != actual:
+        _aplicar_resumen(resumenes.aporte_evento(*previo) if previo else {}, resumenes.aporte_evento(*actual))
+
+
+@receiver(post_delete, sender=Evento, dispatch_uid="exportacion_resumen_evento_borrado_v1")
+def _resumen_evento_borrado(sender, instance: Evento, **kwargs):
+    _aplicar_resumen(resumenes.aporte_evento(instance.owner_id, instance.fecha_hora, instance.tipo), {})
+
+
+def _fila_propiedad(instance: Propiedad):
+    return tuple(getattr(instance, campo) for campo in resumenes.CAMPOS_PROPIEDAD)
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="exportacion_resumen_propiedad_guardada_v1")
+def _resumen_propiedad(sender, instance: Propiedad, raw=False, **kwargs):
+    if raw:
+        return
+    previa = getattr(instance, "_resumen_previa", None)
+    actual = _fila_propiedad(instance)
+    if previa != actual:
+        _aplicar_resumen(resumenes.aporte_propiedad(*previa) if previa else {}, resumenes.aporte_propiedad(*actual))
+
+
+@receiver(post_delete, sender=Propiedad, dispatch_uid="exportacion_resumen_propiedad_borrada_v1")
+def _resumen_propiedad_borrada(sender, instance: Propiedad, **kwargs):
+    _aplicar_resumen(resumenes.aporte_propiedad(*_fila_propiedad(instance)), {})
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid="exportacion_resumen_owner_borrado_v1")
+def _resumen_owner_borrado(sender, instance, **kwargs):
+    # Sin FK real (ver ResumenDiario): lo que dejó la cascada se limpia al confirmar
+    owner_id = instance.pk
+    transaction.on_commit(lambda: ResumenDiario.objects.filter(owner_id=owner_id).delete())
+
+
+# =========================================
+# Sync incremental (/sync/): tombstones y cambios sin save()
+# =========================================
+@receiver(post_delete, sender=Contacto, dispatch_uid="exportacion_sync_contacto_borrado_v1")
+@receiver(post_delete, sender=Propiedad, dispatch_uid="exportacion_sync_propiedad_borrada_v1")
+@receiver(post_delete, sender=Evento, dispatch_uid="exportacion_sync_evento_borrado_v1")
+def _registrar_borrado(sender, instance, **kwargs):
+    """Deja un tombstone por cada registro borrado (también los que caen en cascada)."""
+    recurso = {Contacto: "leads", Propiedad: "propiedades", Evento: "eventos"}[sender]
+    Borrado.objects.create(owner_id=instance.owner_id, recurso=recurso, objeto_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Contacto, dispatch_uid="exportacion_sync_contacto_eventos_v1")
+def _contacto_por_borrar(sender, instance: Contacto, **kwargs):
+    # Sus eventos quedan con contacto_id = NULL (SET_NULL, sin save): cuentan como cambio
+    Evento.objects.filter(contacto_id=instance.pk).update(actualizado_en=timezone.now())
+
+
+@receiver(pre_delete, sender=EstadoLead, dispatch_uid="exportacion_sync_estado_contactos_v1")
+def _estado_por_borrar(sender, instance: EstadoLead, **kwargs):
+    # Ídem para los contactos en ese estado (se exporta estado__fase)
+    Contacto.objects.filter(estado_id=instance.pk).update(actualizado_en=timezone.now())
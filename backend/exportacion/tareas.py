@@ -0,0 +1,212 @@
+# exportacion/tareas.py
+"""
+Ejecución de tareas de import/export en segundo plano (ver models.Tarea).
+
+- El worker (`manage.py procesar_tareas`) toma la tarea pendiente más vieja, o una
+  "en_curso" cuyo latido quedó viejo (el worker anterior se reinició).
+- Import: cada chunk se confirma en su propia transacción junto con el progreso y sus
+  errores. Así, si el worker se corta, la tarea se retoma desde `filas_procesadas`
+  (lo ya confirmado no se repite). Al terminar se deja en disco un reporte de errores CSV.
+- Export: se escribe el archivo en disco en streaming (mismo formato que ExportView).
+  Un export interrumpido se vuelve a generar desde cero.
+- Cancelar: la vista marca la tarea como "cancelada" y el worker lo nota al cerrar el
+  próximo chunk (ese chunk se revierte y no se sigue).
+"""
+import csv
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from leads.pagination import iter_keyset
+
+from .importacion import importar_por_chunks
+from .lectura import detectar_encoding, leer_csv, leer_json
+from .models import Tarea, TareaError
+from .views import _export_archivo, _export_querysets
+
+logger = logging.getLogger(__name__)
+
+# Sin latido por más de esto, una tarea "en_curso" se considera abandonada
+TAREA_TIMEOUT = timedelta(minutes=10)
+
+# Cada cuántas filas exportadas se actualiza el progreso (y se mira si la cancelaron)
+EXPORT_PROGRESO_CADA = 10000
+
+
+class TareaCancelada(Exception):
+    pass
+
+
+def tomar_tarea(timeout=TAREA_TIMEOUT):
+    """Reserva la próxima tarea a procesar (o None). Con varios workers, SKIP LOCKED evita duplicados."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        tarea = (
+            Tarea.objects.select_for_update(skip_locked=True)
+            .filter(Q(estado="pendiente") | Q(estado="en_curso", actualizado_en__lt=ahora - timeout))
+            .order_by("id")
+            .first()
+        )
+        if tarea is None:
+            return None
+        tarea.estado = "en_curso"
+        tarea.iniciado_en = tarea.iniciado_en or ahora
+        tarea.save(update_fields=["estado", "iniciado_en", "actualizado_en"])
+    return tarea
+
+
+def ejecutar_tarea(tarea: Tarea):
+    """Corre la tarea hasta el final (o hasta que la cancelen / falle)."""
+    try:
+        if tarea.tipo == "import":
+            _ejecutar_import(tarea)
+        else:
+            _ejecutar_export(tarea)
+    except TareaCancelada:
+        if tarea.tipo == "import":
+            _escribir_reporte_errores(tarea)
+        Tarea.objects.filter(pk=tarea.pk).update(terminado_en=timezone.now())
+        return
+    except Exception as e:
+        logger.exception("Falló la tarea %s", tarea.pk)
+        Tarea.objects.filter(pk=tarea.pk, estado="en_curso").update(
+            estado="fallida", detalle=str(e)[:2000],
+            terminado_en=timezone.now(), actualizado_en=timezone.now(),
+        )
+        if tarea.tipo == "import":
+            _escribir_reporte_errores(tarea)
+        return
+
+    Tarea.objects.filter(pk=tarea.pk, estado="en_curso").update(
+        estado="completada", terminado_en=timezone.now(), actualizado_en=timezone.now(),
+    )
+
+
+def _latido(tarea: Tarea, **cambios):
+    """Actualiza el progreso; si la tarea ya no está en curso (la cancelaron), corta."""
+    n = Tarea.objects.filter(pk=tarea.pk, estado="en_curso").update(actualizado_en=timezone.now(), **cambios)
+    if not n:
+        raise TareaCancelada()
+
+
+# =======================
+# Import
+# =======================
+
+def _ejecutar_import(tarea: Tarea):
+    params = tarea.params
+    nombre = (params.get("nombre_archivo") or tarea.archivo.name or "").lower()
+
+    with tarea.archivo.open("rb") as fh:
+        encoding = detectar_encoding(fh)
+        rows = leer_json(fh, encoding) if nombre.endswith(".json") else leer_csv(fh, encoding)
+        chunks = importar_por_chunks(
+            tarea.owner, params["resource"], rows, desde=tarea.filas_procesadas,
+            workers=getattr(settings, "IMPORT_WORKERS", 0),
+        )
+
+        while True:
+            # chunk + progreso + errores: todo o nada (punto de reanudación consistente)
+            with transaction.atomic():
+                parcial = next(chunks, None)
+                if parcial is None:
+                    break
+                hasta, created, updated, errors = parcial
+                TareaError.objects.bulk_create([
+                    TareaError(tarea=tarea, fila=e["row"], error=e["error"]) for e in errors
+                ])
+                _latido(
+                    tarea,
+                    filas_procesadas=hasta,
+                    creados=F("creados") + created,
+                    actualizados=F("actualizados") + updated,
+                    errores=F("errores") + len(errors),
+                )
+
+    _escribir_reporte_errores(tarea)
+
+
+def _escribir_reporte_errores(tarea: Tarea):
+    """Deja en disco un CSV fila,error con los errores del import (si hubo)."""
+    qs = TareaError.objects.filter(tarea=tarea)
+    if not qs.exists():
+        return
+
+    def bloques():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["fila", "error"])
+        for e in iter_keyset(qs.order_by("fila", "id"), ["fila", "error"]):
+            writer.writerow([e["fila"], e["error"]])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    ruta = _escribir_archivo(tarea, f"errores_{tarea.pk}.csv", bloques())
+    Tarea.objects.filter(pk=tarea.pk).update(resultado=ruta)
+
+
+# =======================
+# Export
+# =======================
+
+def _ejecutar_export(tarea: Tarea):
+    params = tarea.params
+    filters = params.get("filters") or {}
+    sources = _export_querysets(tarea.owner, filters)
+
+    filas = 0
+    pendientes = 0
+
+    def progreso(n):
+        nonlocal filas, pendientes
+        filas += n
+        pendientes += n
+        if pendientes >= EXPORT_PROGRESO_CADA:
+            pendientes = 0
+            _latido(tarea, filas_procesadas=filas)
+
+    chunks, _, filename = _export_archivo(
+        sources, params.get("resources") or [], params.get("format") or "csv",
+        params.get("compress") or "", filters, progreso=progreso,
+    )
+    _latido(tarea, filas_procesadas=0)
+    ruta = _escribir_archivo(tarea, filename, chunks)
+    try:
+        _latido(tarea, filas_procesadas=filas, resultado=ruta)
+    except TareaCancelada:
+        os.remove(os.path.join(settings.MEDIA_ROOT, ruta))
+        raise
+
+
+# =======================
+# Archivos
+# =======================
+
+def _escribir_archivo(tarea: Tarea, filename: str, bloques) -> str:
+    """
+    Escribe los bloques (str o bytes) en MEDIA_ROOT/exportacion/tareas/<id>/<filename>
+    y devuelve la ruta relativa (para Tarea.resultado). Si se corta, no deja el parcial.
+    """
+    relativa = f"exportacion/tareas/{tarea.pk}/{filename}"
+    destino = os.path.join(settings.MEDIA_ROOT, relativa)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    parcial = destino + ".parcial"
+    try:
+        with open(parcial, "wb") as fh:
+            for bloque in bloques:
+                fh.write(bloque.encode("utf-8") if isinstance(bloque, str) else bloque)
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    return relativa
@@ -1,3 +1,1028 @@
-from django.test import TestCase
+import base64
+import codecs
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+from decimal import Decimal
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from functools import partial
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from avisos.models import Aviso
+from leads.models import Contacto, ContactoToken, EstadoLead, EstadoLeadHistorial, Evento
+from propiedades.models import Propiedad
+
+from . import lectura, metricas, resumenes, tareas, views
+from .importacion import IMPORT_CHUNK_SIZE, _normalizados, importar_filas, importar_por_chunks
+from .lectura import ArchivoInvalido, detectar_encoding, leer_csv, leer_json
+from .models import Borrado, ResumenDiario, Tarea
+
+User = get_user_model()
+
+# Benchmarks (lentos, imprimen tiempos/memoria): CRMINM_BENCH=1 python manage.py test exportacion
+BENCH = bool(os.environ.get("CRMINM_BENCH"))
+BENCH_N = int(os.environ.get("CRMINM_BENCH_N", 100_000))
+
+
+def _contactos(owner, n, desde=0):
+    Contacto.objects.bulk_create(
+        [Contacto(owner=owner, nombre=f"Nombre{i}", apellido=f"Apellido{i}", email=f"mail{i}@x.com",
+                  telefono=str(1_000_000 + i)) for i in range(desde, desde + n)],
+        batch_size=5000,
+    )
+
+
+def _pico_export(owner, chunk_size):
+    """Pico de memoria (bytes, tracemalloc) de recorrer el export CSV de leads sin guardarlo."""
+    sections = [("leads", views._export_querysets(owner, {})["leads"], views.EXPORT_FIELDS["leads"])]
+    tracemalloc.start()
+    try:
+        filas = sum(chunk.count("\n") for chunk in views._csv_stream(sections, chunk_size=chunk_size))
+        return filas, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _secciones_csv(texto) -> dict:
+    """{"leads": [fila como dict de strings], ...} de un export CSV."""
+    secciones, filas, encabezados = {}, None, None
+    for row in csv.reader(io.StringIO(texto)):
+        if len(row) == 1 and row[0].startswith("=== "):
+            filas, encabezados = secciones.setdefault(row[0].strip("= ").lower(), []), None
+        elif not row:
+            filas = None
+        elif encabezados is None:
+            encabezados = row
+        else:
+            filas.append(dict(zip(encabezados, row)))
+    return secciones
+
+
+def _comparable(valor):
+    """
+    Mismo valor escrito por csv.writer (str) o por DjangoJSONEncoder (ISO, Decimal como
+    string, fechas con milisegundos).
+    """
+    if valor is None:
+        return ""
+    if not isinstance(valor, str):
+        return str(valor)
+    fecha = parse_datetime(valor)
+    if fecha is None:
+        return valor
+    return fecha.replace(microsecond=fecha.microsecond // 1000 * 1000)
+
+
+# === Export en streaming (ExportView, CSV / NDJSON) ===
+class ExportStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        _contactos(cls.user, 25)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_igual_al_export_en_memoria(self):
+        response = self.client.post(
+            "/api/exportacion/export/", {"format": "csv", "resources": ["eventos", "leads"]}, format="json"
+        )
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="export.csv"')
+        # lo que armaba antes el export: todas las filas en memoria, secciones vacías omitidas
+        esperado = io.StringIO()
+        writer = csv.writer(esperado)
+        fields = views.EXPORT_FIELDS["leads"]
+        writer.writerow(["=== LEADS ==="])
+        writer.writerow(fields)
+        for row in Contacto.objects.filter(owner=self.user).order_by("pk").values(*fields):
+            writer.writerow([row[f] for f in fields])
+        writer.writerow([])
+        self.assertEqual(b"".join(response.streaming_content).decode(), esperado.getvalue())
+
+    def test_bloques_de_chunk_size_filas(self):
+        sections = [("leads", Contacto.objects.filter(owner=self.user), views.EXPORT_FIELDS["leads"])]
+        with self.assertNumQueries(3):  # 10 + 10 + 5 filas (keyset)
+            chunks = list(views._csv_stream(sections, chunk_size=10))
+        self.assertEqual(len(chunks), 3)
+
+
+class ExportFormatosTests(TestCase):
+    """NDJSON y gzip: las mismas filas que el CSV, con las tres secciones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        _contactos(cls.user, 25)
+        estado = EstadoLead.objects.create(fase="Nuevo")
+        Contacto.objects.filter(owner=cls.user, pk__lte=Contacto.objects.order_by("pk")[5].pk).update(estado=estado)
+        propiedades = [
+            Propiedad.objects.create(owner=cls.user, codigo=f"E{i}", titulo=f"Casa, \"{i}\"", ubicacion="Centro\nNorte",
+                                     disponibilidad="venta", precio=Decimal("1500.50") * i, superficie=40 + i)
+            for i in range(3)
+        ]
+        manana = timezone.now() + timedelta(days=1)
+        for i, p in enumerate(propiedades):
+            Evento.objects.create(owner=cls.user, propiedad=p, tipo="Visita", nombre="Ñandú",
+                                  fecha_hora=manana + timedelta(hours=i))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def exportar(self, **body):
+        return self.client.post(
+            "/api/exportacion/export/", {"resources": ["leads", "propiedades", "eventos"], **body}, format="json"
+        )
+
+    def test_ndjson_igual_al_csv(self):
+        texto_csv = b"".join(self.exportar(format="csv").streaming_content).decode()
+        response = self.exportar(format="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        ndjson = {}
+        for linea in b"".join(response.streaming_content).decode().splitlines():
+            obj = json.loads(linea)
+            ndjson.setdefault(obj.pop("resource"), []).append({k: _comparable(v) for k, v in obj.items()})
+
+        esperado = {
+            recurso: [{k: _comparable(v) for k, v in fila.items()} for fila in filas]
+            for recurso, filas in _secciones_csv(texto_csv).items()
+        }
+        self.assertEqual(set(esperado), {"leads", "propiedades", "eventos"})
+        self.assertEqual(ndjson, esperado)
+
+    def test_gzip_es_el_mismo_stream(self):
+        for fmt, content_type in (("csv", "text/csv"), ("ndjson", "application/x-ndjson")):
+            with self.subTest(format=fmt):
+                plano = self.exportar(format=fmt)
+                comprimido = self.exportar(format=fmt, compress="gzip")
+                self.assertEqual(plano["Content-Type"], content_type)
+                # es un archivo .gz para descargar, no una respuesta con Content-Encoding
+                self.assertEqual(comprimido["Content-Type"], "application/gzip")
+                self.assertNotIn("Content-Encoding", comprimido)
+                self.assertEqual(comprimido["Content-Disposition"], f'attachment; filename="export.{fmt}.gz"')
+                self.assertEqual(
+                    gzip.decompress(b"".join(comprimido.streaming_content)), b"".join(plano.streaming_content)
+                )
+
+
+class ExportMemoriaTests(TestCase):
+    """El pico de memoria del export depende de `chunk_size`, no de la cantidad de filas."""
+    n = 2_000
+    chunk_size = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        _contactos(cls.user, cls.n)
+
+    def test_pico_acotado_con_10_veces_mas_filas(self):
+        filas, pico_n = _pico_export(self.user, self.chunk_size)
+        self.assertEqual(filas, self.n + 3)
+        _contactos(self.user, 9 * self.n, desde=self.n)
+        filas, pico_10n = _pico_export(self.user, self.chunk_size)
+        self.assertEqual(filas, 10 * self.n + 3)
+        if BENCH:
+            print(f"\nexport {self.n} filas: pico {pico_n / 1024:.0f} KiB; {10 * self.n} filas: pico {pico_10n / 1024:.0f} KiB")
+        self.assertLess(pico_10n, pico_n * 1.5)
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class ExportMemoriaBenchmark(ExportMemoriaTests):
+    n = BENCH_N // 10
+    chunk_size = views.EXPORT_CHUNK_SIZE
+
+
+# === Lectura en streaming de archivos de import (lectura.py) ===
+# Tamaños de bloque chicos y coprimos: cortan strings, escapes, números y caracteres
+# multibyte en todas las posiciones posibles
+BLOQUES = (1, 2, 3, 5, 7, 64, lectura.BLOCK_SIZE)
+
+JSON_DE_PRUEBA = (
+    ' [ {"nombre": "Ñandú \\"el\\" grande", "email": "a\\\\b@x.com", "notas": "línea1\\nlínea2\\t\\u00e9\\ud83d\\ude00",'
+    ' "precio": 1234567.25, "banos": -3, "exp": 1.5e10, "ok": true, "no": false, "nada": null,'
+    ' "lista": [1, [2, {"k": "€"}], []], "obj": {}},\n'
+    '  {"nombre": "😀 emoji crudo", "codigo": "", "n": 0},'
+    '\r\n\t{"numero_al_final": 98765432109876543210}, 42, "suelto", [] ]  \n'
+)
+
+CSV_DE_PRUEBA = (
+    'email,nombre,notas,precio\r\n'
+    'a@x.com,Ñandú,"con, coma",1.5\r\n'
+    'b@x.com,"Comillas ""dobles""","varias\r\nlíneas\nadentro",\r\n'
+    'c@x.com,€uro 😀,,-3\n'
+    'd@x.com,sin fin de línea,x,0'
+)
+
+
+def _leer(lector, datos: bytes, bloque: int):
+    """Filas de `lector` sobre `datos` leyendo de a `bloque` bytes (con el encoding detectado)."""
+    archivo = io.BytesIO(datos)
+    with mock.patch.object(lectura, "BLOCK_SIZE", bloque):
+        return list(lector(archivo, detectar_encoding(archivo)))
+
+
+class LecturaTests(SimpleTestCase):
+    """Lo que sale de a bloques es lo mismo que json.loads / csv.DictReader sobre el texto entero."""
+
+    @staticmethod
+    def casos(texto):
+        """(encoding, bytes del archivo, texto que deben dar); latin-1 sin lo que no representa."""
+        latin1 = texto.replace("😀", "").replace("€", "E").replace("\\ud83d\\ude00", "")
+        return [
+            ("utf-8", texto.encode("utf-8"), texto),
+            ("utf-8 con BOM", codecs.BOM_UTF8 + texto.encode("utf-8"), texto),
+            ("latin-1", latin1.encode("latin-1"), latin1),
+        ]
+
+    def test_json_igual_a_json_loads(self):
+        for nombre, datos, texto in self.casos(JSON_DE_PRUEBA):
+            esperado = json.loads(texto)
+            for bloque in BLOQUES:
+                with self.subTest(encoding=nombre, bloque=bloque):
+                    self.assertEqual(_leer(leer_json, datos, bloque), esperado)
+
+    def test_csv_igual_a_dictreader(self):
+        for nombre, datos, texto in self.casos(CSV_DE_PRUEBA):
+            esperado = list(csv.DictReader(io.StringIO(texto, newline="")))
+            self.assertEqual(len(esperado), 4)
+            for bloque in BLOQUES:
+                with self.subTest(encoding=nombre, bloque=bloque):
+                    self.assertEqual(_leer(leer_csv, datos, bloque), esperado)
+
+    def test_encoding_detectado(self):
+        self.assertEqual(detectar_encoding(io.BytesIO("ñ".encode("utf-8"))), "utf-8-sig")
+        self.assertEqual(detectar_encoding(io.BytesIO(b"\xef\xbb\xbf[]")), "utf-8-sig")
+        self.assertEqual(detectar_encoding(io.BytesIO("ñ".encode("latin-1"))), "latin-1")
+
+    def test_json_invalido(self):
+        for texto in ('{"a": 1}', '"x"', "", "[1, 2", '[{"a": 1} {"b": 2}]', '[{"a": "sin cerrar}]', "[1] [2]", "[1,]"):
+            for bloque in (1, 3, lectura.BLOCK_SIZE):
+                with self.subTest(texto=texto, bloque=bloque), self.assertRaises(ArchivoInvalido):
+                    _leer(leer_json, texto.encode(), bloque)
+
+
+class ImportArchivoInvalidoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def importar(self, nombre, contenido: bytes):
+        archivo = SimpleUploadedFile(nombre, contenido)
+        return self.client.post("/api/exportacion/import/", {"resource": "leads", "file": archivo}, format="multipart")
+
+    def test_json_mal_formado_o_sin_lista_es_400(self):
+        for contenido in (b'{"email": "a@x.com"}', b'[{"email": "a@x.com"}, {"email": ', b"[1] basura"):
+            with self.subTest(contenido=contenido):
+                response = self.importar("leads.json", contenido)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("JSON", response.json()["detail"])
+        self.assertFalse(Contacto.objects.exists())  # lo leído antes del error se revierte
+
+    def test_json_valido_importa(self):
+        response = self.importar("leads.json", '[{"email": "ñandu@x.com", "nombre": "Ñandú"}]'.encode("latin-1"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Contacto.objects.get(owner=self.user).nombre, "Ñandú")
+
+
+# === Import por lotes (importacion.py) ===
+def _filas_leads(n, desde=0):
+    return [
+        {"email": f"User{i}@x.com", "nombre": f"N{i}", "telefono": f"351{i:06d}", "estado_fase": "nuevo" if i % 2 else ""}
+        for i in range(desde, desde + n)
+    ]
+
+
+def _filas_propiedades(n, prefijo="C"):
+    return [
+        {"codigo": f"{prefijo}{i}", "titulo": f"P{i}", "ubicacion": "x", "disponibilidad": "venta",
+         "precio": "100.5", "superficie": "50", "fecha_alta": "2024-01-02"}
+        for i in range(n)
+    ]
+
+
+def _filas_eventos(n, propiedades, contactos, prefijo="C"):
+    base = (timezone.localtime() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    return [
+        {"tipo": "Visita", "fecha_hora": (base + timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%S"),
+         "propiedad_codigo": f"{prefijo}{i % propiedades}", "contacto_email": f"user{i % contactos}@x.com"}
+        for i in range(n)
+    ]
+
+
+def _importar_fila_por_fila(user, filas):
+    """Lo que hacía ImportView antes: get_or_create + save() (con sus signals) por cada contacto."""
+    estados = {e.fase.lower(): e for e in EstadoLead.objects.all()}
+    for f in filas:
+        obj, _ = Contacto.objects.get_or_create(owner=user, email=f["email"])
+        obj.nombre, obj.telefono = f["nombre"], f["telefono"]
+        if f["estado_fase"]:
+            obj.estado = estados[f["estado_fase"]]
+        obj.save()
+
+
+class ImportacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        EstadoLead.objects.create(fase="Nuevo")
+        EstadoLead.objects.create(fase="Contactado")
+
+    def setUp(self):
+        self.n = 0
+
+    def importar(self, resource, filas, user=None):
+        """(resultado, queries) de importar `filas` con un usuario nuevo (o `user`)."""
+        if user is None:
+            self.n += 1
+            user = User.objects.create_user(f"agente{self.n}", f"agente{self.n}@x.com", "x")
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = importar_filas(user, resource, filas, chunk_size=1000)
+        return user, resultado, len(ctx.captured_queries)
+
+    def test_queries_por_chunk_no_por_fila(self):
+        for n in (10, 30):
+            with self.subTest(filas=n):
+                user, creados, q_crear = self.importar("leads", _filas_leads(n))
+                self.assertEqual((creados["created"], creados["errors"]), (n, []))
+                filas = _filas_leads(n)
+                for f in filas:
+                    f["estado_fase"] = "contactado"
+                _, actualizados, q_actualizar = self.importar("leads", filas, user)
+                self.assertEqual(actualizados["updated"], n)
+                _, props, q_props = self.importar("propiedades", _filas_propiedades(n, f"C{n}-"), user)
+                self.assertEqual(props["created"], n)
+                _, eventos, q_eventos = self.importar("eventos", _filas_eventos(n, n, n, f"C{n}-"), user)
+                self.assertEqual((eventos["created"], eventos["errors"]), (n, []))
+                queries = (q_crear, q_actualizar, q_props, q_eventos)
+                if n == 10:
+                    esperado = queries
+        self.assertEqual(queries, esperado)
+
+    def test_efectos_secundarios_en_lote(self):
+        user, _, _ = self.importar("leads", _filas_leads(20))
+        filas = _filas_leads(20)
+        for f in filas:
+            f["estado_fase"] = "contactado"
+        self.importar("leads", filas, user)
+        self.assertEqual(EstadoLeadHistorial.objects.filter(contacto__owner=user).count(), 10 + 20)
+        self.assertTrue(ContactoToken.objects.filter(owner=user, token="user7").exists())
+
+        self.importar("propiedades", _filas_propiedades(5), user)
+        self.importar("eventos", _filas_eventos(5, 5, 20), user)
+        self.assertEqual(Contacto.objects.filter(owner=user).exclude(next_contact_at=None).count(), 5)
+
+    def test_errores_con_el_numero_de_fila(self):
+        filas = _filas_leads(3)
+        filas.insert(1, {"email": ""})
+        _, resultado, _ = self.importar("leads", filas)
+        self.assertEqual(resultado["created"], 3)
+        self.assertEqual([e["row"] for e in resultado["errors"]], [2])
+
+        user, _, _ = self.importar("propiedades", _filas_propiedades(2) + [{"codigo": "C-mal", "titulo": "sin superficie"}])
+        self.assertEqual(Propiedad.objects.filter(owner=user).count(), 2)
+        _, eventos, _ = self.importar("eventos", _filas_eventos(2, 2, 1) + [{"tipo": "Visita", "fecha_hora": "2030-01-01", "propiedad_codigo": "nope"}], user)
+        self.assertEqual((eventos["created"], [e["row"] for e in eventos["errors"]]), (2, [3]))
+        self.assertEqual(Evento.objects.filter(owner=user).count(), 2)
+
+
+def _estado_db(owner) -> dict:
+    """Todo lo que un import puede escribir (filas completas), para comparar antes / después."""
+    modelos = {
+        Contacto: {"owner": owner}, ContactoToken: {"owner": owner}, Propiedad: {"owner": owner},
+        Evento: {"owner": owner}, EstadoLeadHistorial: {"contacto__owner": owner},
+        Aviso: {"lead__owner": owner}, ResumenDiario: {"owner": owner}, EstadoLead: {},
+    }
+    return {m.__name__: list(m.objects.filter(**f).order_by("pk").values()) for m, f in modelos.items()}
+
+
+class ImportModosTests(TestCase):
+    """mode=dry_run: mismos conteos que el import real y nada guardado; mode=validate: sin escrituras."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        EstadoLead.objects.create(fase="Nuevo")
+        EstadoLead.objects.create(fase="Contactado")
+        # la mitad de cada recurso ya existe: el import mezcla altas, actualizaciones y errores
+        importar_filas(cls.user, "leads", _filas_leads(10))
+        importar_filas(cls.user, "propiedades", _filas_propiedades(5))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def filas(self, resource):
+        if resource == "leads":
+            filas = _filas_leads(20)
+            for f in filas[:10]:
+                f["estado_fase"] = "contactado"  # estado nuevo + historial
+            return filas + [{"email": ""}, {"email": "no-es-mail"}]
+        if resource == "propiedades":
+            filas = _filas_propiedades(10)
+            for f in filas[:5]:
+                f["precio"] = "999"
+            return filas + [{"codigo": "C-mal", "titulo": "sin superficie"}]
+        return _filas_eventos(8, 5, 10) + [{"tipo": "Visita", "fecha_hora": "2030-01-01", "propiedad_codigo": "nope"}]
+
+    def importar(self, resource, mode):
+        response = self.client.post(
+            "/api/exportacion/import/", {"resource": resource, "mode": mode, "rows": self.filas(resource)}, format="json"
+        )
+        self.assertEqual(response.status_code, 207)  # con filas con error
+        data = response.json()
+        return data["created"], data["updated"], [e["row"] for e in data["errors"]]
+
+    def test_dry_run_revierte_todo_con_los_conteos_del_import(self):
+        for resource in ("leads", "propiedades", "eventos"):
+            with self.subTest(resource=resource):
+                antes = _estado_db(self.user)
+                with self.captureOnCommitCallbacks() as callbacks:
+                    simulado = self.importar(resource, "dry_run")
+                self.assertEqual(_estado_db(self.user), antes)
+                self.assertEqual(callbacks, [])  # ni avisos, ni versiones, ni pub/sub
+
+                real = self.importar(resource, "import")
+                self.assertEqual(simulado, real)
+                self.assertNotEqual(_estado_db(self.user), antes)
+
+    def test_validate_no_escribe(self):
+        for resource in ("leads", "propiedades", "eventos"):
+            with self.subTest(resource=resource):
+                with CaptureQueriesContext(connection) as ctx:
+                    validado = self.importar(resource, "validate")
+                escrituras = [
+                    q["sql"] for q in ctx.captured_queries
+                    if q["sql"].lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE")
+                ]
+                self.assertEqual(escrituras, [])
+                # "updated" de validate = filas sobre un registro existente; acá todas cambian algo
+                self.assertEqual(validado, self.importar(resource, "import"))
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class ImportacionBenchmark(TestCase):
+    """Filas por segundo: import por lotes vs get_or_create + save() por fila."""
+
+    def test_filas_por_segundo(self):
+        EstadoLead.objects.create(fase="Nuevo")
+        n = min(BENCH_N, 20_000)
+        lotes, por_fila = User.objects.create_user("lotes"), User.objects.create_user("por_fila")
+
+        inicio = time.perf_counter()
+        self.assertEqual(importar_filas(lotes, "leads", _filas_leads(n))["created"], n)
+        t_lotes = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        _importar_fila_por_fila(por_fila, _filas_leads(n))
+        t_por_fila = time.perf_counter() - inicio
+        print(f"\nimport {n} leads: por lotes {n / t_lotes:.0f} filas/s, fila por fila {n / t_por_fila:.0f} filas/s")
+        self.assertLess(t_lotes, t_por_fila)
+
+
+# === Normalización en un pool de procesos (IMPORT_WORKERS) ===
+def _en_chunks(rows, chunk_size):
+    chunk = []
+    for row, raw in enumerate(rows, start=1):
+        chunk.append((row, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _filas_crudas(n):
+    """Filas de eventos como llegan de un CSV (todo string), con algunas inválidas."""
+    for i in range(n):
+        yield {
+            "id": "" if i % 97 else "x",  # id no numérico: error en esa fila
+            "tipo": "Visita",
+            "fecha_hora": f"2030-{1 + i % 12:02d}-{1 + i % 28:02d} {8 + i % 10:02d}:30",
+            "propiedad_codigo": f"C{i % 50}",
+            "contacto_email": f" user{i % 1000}@x.com ",
+            "notas": "llamar antes",
+        }
+
+
+class NormalizacionWorkersTests(SimpleTestCase):
+    def test_mismo_resultado_y_orden_con_workers(self):
+        def normalizar(workers):
+            return [(chunk[0][0], filas, errores)
+                    for chunk, filas, errores in _normalizados("eventos", _en_chunks(_filas_crudas(300), 7), workers)]
+
+        secuencial = normalizar(0)
+        self.assertEqual(normalizar(2), secuencial)
+        self.assertEqual([e["row"] for _, _, errores in secuencial for e in errores], [1, 98, 195, 292])
+
+
+class ImportacionWorkersTests(TestCase):
+    def test_import_con_workers_igual_que_sin(self):
+        resultados = []
+        for workers in (0, 2):
+            user = User.objects.create_user(f"agente{workers}")
+            filas = _filas_propiedades(20, f"W{workers}-")
+            filas[13] = {"codigo": f"W{workers}-mal", "precio": "no es un número"}
+            resultados.append(importar_filas(user, "propiedades", filas, chunk_size=6, workers=workers))
+            self.assertEqual(
+                list(Propiedad.objects.filter(owner=user).order_by("pk").values_list("titulo", flat=True)),
+                [f"P{i}" for i in range(20) if i != 13],
+            )
+        self.assertEqual(resultados[0]["created"], 19)
+        self.assertEqual([e["row"] for e in resultados[0]["errors"]], [14])
+        self.assertEqual(resultados[1], resultados[0])
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class NormalizacionWorkersBenchmark(SimpleTestCase):
+    """CSV sintético de CRMINM_BENCH_N filas (1M: CRMINM_BENCH_N=1000000): filas/s normalizadas según workers."""
+
+    def test_escala_con_workers(self):
+        with tempfile.TemporaryFile() as archivo:
+            writer = csv.DictWriter(io.TextIOWrapper(archivo, "utf-8", newline="", write_through=True),
+                                    fieldnames=list(next(_filas_crudas(1))))
+            writer.writeheader()
+            writer.writerows(_filas_crudas(BENCH_N))
+            print(f"\nnormalizar {BENCH_N} eventos (CPUs: {os.cpu_count()}):")
+            for workers in (0, 2, 4, 8):
+                archivo.seek(0)
+                inicio = time.perf_counter()
+                filas = sum(len(f) + len(e) for _, f, e in _normalizados(
+                    "eventos", _en_chunks(leer_csv(archivo, "utf-8"), IMPORT_CHUNK_SIZE), workers))
+                segundos = time.perf_counter() - inicio
+                self.assertEqual(filas, BENCH_N)
+                print(f"  workers={workers}: {BENCH_N / segundos:.0f} filas/s")
+
+
+# === Tareas en segundo plano (tareas.py, Tarea*View, procesar_tareas) ===
+class _WorkerCaido(BaseException):
+    """Simula que matan el proceso del worker: no es Exception, ejecutar_tarea no la atrapa."""
+
+
+def _csv_leads(n, invalidas=()):
+    filas = ["email,nombre"] + [
+        f"{'' if i in invalidas else f'tarea{i}@x.com'},N{i}" for i in range(1, n + 1)
+    ]
+    return ("\n".join(filas) + "\n").encode()
+
+
+class TareasTests(TestCase):
+    chunk_size = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media = media.name
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # chunks chicos: varios puntos de reanudación con pocas filas
+        importar = mock.patch.object(tareas, "importar_por_chunks", partial(importar_por_chunks, chunk_size=self.chunk_size))
+        importar.start()
+        self.addCleanup(importar.stop)
+
+    def encolar_import(self, contenido, nombre="leads.csv"):
+        response = self.client.post(
+            "/api/exportacion/tareas/",
+            {"tipo": "import", "resource": "leads", "file": SimpleUploadedFile(nombre, contenido)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["estado"], "pendiente")
+        return response.json()["id"]
+
+    def encolar_export(self, **body):
+        response = self.client.post(
+            "/api/exportacion/tareas/", {"tipo": "export", "resources": ["leads"], **body}, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()["id"]
+
+    def procesar(self):
+        call_command("procesar_tareas", "--once", stdout=io.StringIO())
+
+    def estado(self, pk) -> dict:
+        response = self.client.get(f"/api/exportacion/tareas/{pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def descargar(self, pk):
+        return self.client.get(f"/api/exportacion/tareas/{pk}/descargar/")
+
+    def test_import_encolar_procesar_y_consultar(self):
+        pk = self.encolar_import(_csv_leads(25, invalidas={7, 18}))
+        self.assertIsNone(self.estado(pk)["descarga"])
+        self.procesar()
+
+        data = self.estado(pk)
+        self.assertEqual(data["estado"], "completada")
+        self.assertEqual((data["filas_procesadas"], data["creados"], data["errores"]), (25, 23, 2))
+        self.assertEqual([e["fila"] for e in data["errores_recientes"]], [7, 18])
+        self.assertEqual(Contacto.objects.filter(owner=self.user).count(), 23)
+
+        # reporte de errores
+        reporte = b"".join(self.descargar(pk).streaming_content).decode()
+        self.assertEqual([fila["fila"] for fila in csv.DictReader(io.StringIO(reporte))], ["7", "18"])
+
+    def test_export_descarga_el_mismo_archivo_que_export(self):
+        _contactos(self.user, 25)
+        pk = self.encolar_export(format="csv")
+        self.assertEqual(self.descargar(pk).status_code, 404)  # todavía no hay archivo
+        self.procesar()
+
+        self.assertEqual(self.estado(pk)["estado"], "completada")
+        response = self.descargar(pk)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="export.csv"')
+        directo = self.client.post("/api/exportacion/export/", {"format": "csv", "resources": ["leads"]}, format="json")
+        self.assertEqual(b"".join(response.streaming_content), b"".join(directo.streaming_content))
+
+    def test_el_parcial_nunca_se_sirve(self):
+        _contactos(self.user, 25)
+        pk = self.encolar_export(format="csv")
+        original = tareas._export_archivo
+        vistos = []
+
+        def export_que_se_corta(*args, **kwargs):
+            chunks, content_type, filename = original(*args, **kwargs)
+
+            def bloques():
+                yield next(chunks)
+                # a mitad de escribir: el .parcial existe pero la tarea no tiene resultado
+                carpeta = os.path.join(self.media, "exportacion", "tareas", str(pk))
+                vistos.append((os.listdir(carpeta), self.descargar(pk).status_code))
+                raise RuntimeError("disco lleno")
+
+            return bloques(), content_type, filename
+
+        with mock.patch.object(tareas, "_export_archivo", export_que_se_corta), self.assertLogs(tareas.logger, "ERROR"):
+            self.procesar()
+
+        self.assertEqual(vistos, [(["export.csv.parcial"], 404)])
+        data = self.estado(pk)
+        self.assertEqual((data["estado"], data["detalle"], data["descarga"]), ("fallida", "disco lleno", None))
+        self.assertEqual(os.listdir(os.path.join(self.media, "exportacion", "tareas", str(pk))), [])
+
+    def test_cancelar(self):
+        pk = self.encolar_export()
+        response = self.client.post(f"/api/exportacion/tareas/{pk}/cancelar/")
+        self.assertEqual((response.status_code, response.json()["estado"]), (200, "cancelada"))
+        self.assertEqual(self.client.post(f"/api/exportacion/tareas/{pk}/cancelar/").status_code, 409)
+        self.procesar()  # el worker no la toma
+        self.assertEqual(self.estado(pk)["estado"], "cancelada")
+
+    def test_cancelar_en_curso_corta_en_el_proximo_chunk(self):
+        pk = self.encolar_import(_csv_leads(35))
+        original = tareas._latido
+
+        def latido_y_cancelar(tarea, **cambios):
+            original(tarea, **cambios)
+            self.assertEqual(self.client.post(f"/api/exportacion/tareas/{tarea.pk}/cancelar/").status_code, 200)
+
+        with mock.patch.object(tareas, "_latido", latido_y_cancelar):
+            self.procesar()
+
+        data = self.estado(pk)
+        # el primer chunk quedó confirmado; el segundo vio la cancelación y se revirtió
+        self.assertEqual((data["estado"], data["filas_procesadas"], data["creados"]), ("cancelada", 10, 10))
+        self.assertEqual(Contacto.objects.filter(owner=self.user).count(), 10)
+        self.assertEqual(self.client.post(f"/api/exportacion/tareas/{pk}/cancelar/").status_code, 409)
+
+    def test_reanuda_desde_filas_procesadas_si_el_worker_se_cae(self):
+        pk = self.encolar_import(_csv_leads(35, invalidas={3, 25}))
+
+        def importar_y_caer(*args, **kwargs):
+            for i, parcial in enumerate(importar_por_chunks(*args, chunk_size=self.chunk_size, **kwargs)):
+                if i == 2:
+                    raise _WorkerCaido()  # con el tercer chunk ya escrito, sin confirmar
+                yield parcial
+
+        with mock.patch.object(tareas, "importar_por_chunks", importar_y_caer), self.assertRaises(_WorkerCaido):
+            self.procesar()
+
+        data = self.estado(pk)
+        self.assertEqual((data["estado"], data["filas_procesadas"], data["creados"]), ("en_curso", 20, 19))
+        self.assertEqual(Contacto.objects.filter(owner=self.user).count(), 19)
+
+        self.procesar()  # con latido reciente no se retoma: podría seguir vivo
+        self.assertEqual(self.estado(pk)["filas_procesadas"], 20)
+
+        Tarea.objects.filter(pk=pk).update(actualizado_en=timezone.now() - tareas.TAREA_TIMEOUT)
+        self.procesar()
+        data = self.estado(pk)
+        self.assertEqual(
+            (data["estado"], data["filas_procesadas"], data["creados"], data["errores"]), ("completada", 35, 33, 2)
+        )
+        self.assertEqual([e["fila"] for e in data["errores_recientes"]], [3, 25])
+        self.assertEqual(Contacto.objects.filter(owner=self.user).count(), 33)
+
+
+# === Resúmenes diarios (resumenes.py, signals.py) ===
+def _resumenes(owner):
+    """Lo que devuelve la API por día (sin filas/claves en cero), para comparar."""
+    return resumenes.agrupar(
+        ResumenDiario.objects.filter(owner=owner).order_by("dia"), lambda dia: dia.isoformat()
+    )
+
+
+class ResumenesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.estados = [EstadoLead.objects.create(fase=f) for f in ("Nuevo", "Contactado")]
+
+    def propiedad(self, codigo="P1", **campos):
+        return Propiedad.objects.create(
+            owner=self.user, codigo=codigo, titulo="Casa", ubicacion="Centro", disponibilidad="venta",
+            precio=Decimal("100.50"), superficie=1, **campos
+        )
+
+    def evento(self, dias, tipo="Visita", propiedad=None):
+        return Evento.objects.create(
+            owner=self.user, tipo=tipo, propiedad=propiedad or self.propiedad(f"E{Evento.objects.count()}"),
+            fecha_hora=timezone.now() + timedelta(days=dias),
+        )
+
+    def assertIgualAReconstruir(self):
+        incremental = _resumenes(self.user)
+        resumenes.reconstruir(self.user.pk)
+        self.assertEqual(incremental, _resumenes(self.user))
+
+    def test_incremental_igual_a_reconstruir(self):
+        contactos = [Contacto.objects.create(owner=self.user, nombre=f"C{i}", email=f"c{i}@x.com") for i in range(3)]
+        for c in contactos[:2]:
+            c.estado = self.estados[0]
+            c.save()
+        contactos[0].estado = self.estados[1]
+        contactos[0].save()
+
+        eventos = [self.evento(d, tipo) for d, tipo in ((1, "Visita"), (1, "Llamada"), (3, "Visita"))]
+        eventos[0].fecha_hora += timedelta(days=1)  # se mueve de día
+        eventos[0].save()
+        eventos[1].delete()
+
+        vendida = self.propiedad("V1")
+        vendida.estado, vendida.vendida_en = "vendido", timezone.now()
+        vendida.save()
+        self.propiedad("V2", estado="vendido", vendida_en=timezone.now())
+        vendida.precio = Decimal("250.25")
+        vendida.save()
+        contactos[2].delete()
+        self.assertIgualAReconstruir()
+        ventas = [g for g in _resumenes(self.user) if g["propiedades_vendidas"]]
+        self.assertEqual(ventas[0]["volumen_vendido"], {"USD": "350.75"})
+
+    def test_dia_que_vuelve_a_cero_no_aparece(self):
+        evento = self.evento(5)
+        dia = resumenes.dia_de(evento.fecha_hora).isoformat()
+        self.assertIn(dia, [g["periodo"] for g in _resumenes(self.user)])
+        evento.delete()
+        self.assertNotIn(dia, [g["periodo"] for g in _resumenes(self.user)])
+
+    def test_varias_claves_json_en_un_update(self):
+        dia = timezone.localdate()
+        delta = Counter({"transiciones:1": 2, "transiciones:": 1, "volumen_vendido:ARS": Decimal("0.10")})
+        for _ in range(3):
+            resumenes.aplicar({(self.user.pk, dia): delta})
+        fila = ResumenDiario.objects.get(owner=self.user, dia=dia)
+        self.assertEqual(fila.transiciones, {"1": 6, "": 3})
+        self.assertEqual(fila.volumen_vendido, {"ARS": "0.30"})
+
+    def test_save_sin_releer_y_un_solo_update(self):
+        evento = Evento.objects.get(pk=self.evento(1).pk)
+        propiedad = Propiedad.objects.get(pk=evento.propiedad_id)
+        contacto = Contacto.objects.create(owner=self.user, nombre="Juan", email="juan@x.com")
+
+        for instancia, cambio in (
+            (evento, lambda e: setattr(e, "tipo", "Llamada")),
+            (propiedad, lambda p: (setattr(p, "estado", "vendido"), setattr(p, "vendida_en", timezone.now()))),
+            (propiedad, lambda p: setattr(p, "precio", Decimal("99"))),  # vendida: cambia el volumen
+            (contacto, lambda c: setattr(c, "creado_en", c.creado_en - timedelta(days=40))),
+        ):
+            cambio(instancia)
+            tabla = instancia._meta.db_table
+            with CaptureQueriesContext(connection) as ctx:
+                instancia.save()
+            sql = [q["sql"] for q in ctx.captured_queries]
+            lecturas = [q for q in sql if q.startswith("SELECT") and (tabla in q or "exportacion_resumendiario" in q)]
+            self.assertEqual(lecturas, [])
+            updates = [q for q in sql if q.startswith('UPDATE "exportacion_resumendiario"')]
+            self.assertIn(len(updates), (1, 2), sql)  # uno por día tocado (+ INSERT si el día no tenía fila)
+        self.assertIgualAReconstruir()
+
+    def test_migracion_llena_la_tabla(self):
+        contacto = Contacto.objects.create(owner=self.user, nombre="Juan", email="juan@x.com")
+        contacto.estado = self.estados[0]
+        contacto.save()
+        self.evento(2)
+        self.propiedad("V1", estado="vendido", vendida_en=timezone.now())
+        esperado = _resumenes(self.user)
+        self.assertTrue(esperado)
+
+        ResumenDiario.objects.all().delete()  # como al crear la tabla
+        importlib.import_module("exportacion.migrations.0003_resumendiario").backfill(apps, None)
+        self.assertEqual(_resumenes(self.user), esperado)
+
+
+# === Métricas mensuales (metricas.py, MetricsView) ===
+def _en(year, month, day=15):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+@override_settings(VERSIONES_EN_CACHE=True)
+class MetricasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        # 2025 ya está cerrado: ene 2 leads, feb 4 leads y 1 venta, mar sin nada
+        for i, mes in enumerate((1, 1, 2, 2, 2, 2)):
+            contacto = Contacto.objects.create(owner=cls.user, nombre=f"C{i}", email=f"c{i}@x.com")
+            Contacto.objects.filter(pk=contacto.pk).update(creado_en=_en(2025, mes, 10 + i))
+        Propiedad.objects.create(
+            owner=cls.user, codigo="V1", titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1,
+            superficie=1, estado="vendido", vendida_en=_en(2025, 2),
+        )
+        resumenes.reconstruir(cls.user.pk)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def meses(self):
+        response = self.client.get("/api/exportacion/metrics/", {"from": "2025-01", "to": "2025-03"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["from"], data["to"]), ("2025-01", "2025-03"))
+        return [(m["year"], m["month"], m["leads_mes"], m["ventas_mes"], m["conversion_pct"]) for m in data["months"]]
+
+    def cacheados(self):
+        return [m for m in ((2025, 1), (2025, 2), (2025, 3)) if cache.get(metricas._clave(self.user.pk, *m)) is not None]
+
+    def test_rango(self):
+        self.assertEqual(self.meses(), [(2025, 1, 2, 0, 0.0), (2025, 2, 4, 1, 25.0), (2025, 3, 0, 0, 0.0)])
+        with self.assertNumQueries(0):  # meses cerrados: todo del cache
+            self.meses()
+
+        mes = self.client.get("/api/exportacion/metrics/", {"year": 2025, "month": 2}).json()
+        self.assertEqual((mes["leads_mes"], mes["ventas_mes"]), (4, 1))
+        for params in ({"from": "2025-03", "to": "2025-01"}, {"from": "2025-1x", "to": "2025-03"}, {"year": 2025}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get("/api/exportacion/metrics/", params).status_code, 400)
+
+    def test_escritura_invalida_solo_su_mes(self):
+        self.meses()
+        self.assertEqual(self.cacheados(), [(2025, 1), (2025, 2), (2025, 3)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Contacto.objects.filter(owner=self.user, creado_en__month=2).first().delete()
+        self.assertEqual(self.cacheados(), [(2025, 1), (2025, 3)])
+        self.assertEqual(self.meses()[1], (2025, 2, 3, 1, 33.33))
+
+    @override_settings(VERSIONES_EN_CACHE=False)
+    def test_sin_cache_compartido_no_se_cachea(self):
+        self.meses()
+        self.assertEqual(self.cacheados(), [])
+        with CaptureQueriesContext(connection) as ctx:
+            self.meses()
+        self.assertTrue(ctx.captured_queries)
+
+
+# === Sync incremental (SyncView, tombstones de signals.py) ===
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.otro = User.objects.create_user("otro", "otro@x.com", "x")
+        cls.estado = EstadoLead.objects.create(fase="Nuevo")
+        cls.contacto = Contacto.objects.create(owner=cls.user, nombre="Juan", email="juan@x.com", estado=cls.estado)
+        cls.suelto = Contacto.objects.create(owner=cls.user, nombre="Ana", email="ana@x.com")
+        cls.propiedad = Propiedad.objects.create(owner=cls.user, codigo="S1", titulo="Casa", ubicacion="Centro",
+                                                 disponibilidad="venta", precio=1, superficie=1)
+        cls.evento = Evento.objects.create(owner=cls.user, propiedad=cls.propiedad, contacto=cls.contacto,
+                                           tipo="Visita", fecha_hora=timezone.now() + timedelta(days=1))
+        # Todo escrito hace una hora: fuera de cualquier cursor de los últimos minutos
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        for model in (Contacto, Propiedad, Evento):
+            model.objects.update(actualizado_en=hace_una_hora)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, desde=None):
+        """Líneas del NDJSON (sin la del cursor, que se chequea contra el header)."""
+        params = {"since": views._sync_cursor(desde)} if desde is not None else {}
+        response = self.client.get("/api/exportacion/sync/", params)
+        self.assertEqual(response.status_code, 200)
+        lineas = [json.loads(linea) for linea in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+        self.assertEqual(lineas[-1], {"cursor": response["X-Sync-Cursor"]})
+        return lineas[:-1]
+
+    def cambios(self, desde):
+        return {(linea["resource"], linea["op"], linea.get("id", linea.get("objeto_id"))) for linea in self.sync(desde)}
+
+    def test_sin_since_todo_y_sin_borrados(self):
+        Contacto.objects.create(owner=self.otro, nombre="Ajeno", email="ajeno@x.com")
+        self.assertEqual(self.cambios(None), {
+            ("leads", "upsert", self.contacto.pk), ("leads", "upsert", self.suelto.pk),
+            ("propiedades", "upsert", self.propiedad.pk), ("eventos", "upsert", self.evento.pk),
+        })
+
+    def test_upserts_despues_de_since(self):
+        desde = timezone.now()
+        self.assertEqual(self.cambios(desde), set())
+
+        self.contacto.nombre = "Juana"
+        self.contacto.save()
+        self.propiedad.precio = 2
+        self.propiedad.save()
+        self.assertEqual(self.cambios(desde), {("leads", "upsert", self.contacto.pk),
+                                               ("propiedades", "upsert", self.propiedad.pk)})
+        (lead,) = [linea for linea in self.sync(desde) if linea["resource"] == "leads"]
+        self.assertEqual((lead["nombre"], lead["estado__fase"]), ("Juana", "Nuevo"))
+
+    def test_solapamiento_atrapa_commit_tardio(self):
+        # Filas con timestamp anterior al cursor que confirmaron después (transacción larga)
+        desde = timezone.now()
+        Contacto.objects.filter(pk=self.contacto.pk).update(actualizado_en=desde - timedelta(minutes=3))
+        Evento.objects.filter(pk=self.evento.pk).update(
+            actualizado_en=desde - views.SYNC_SOLAPAMIENTO - timedelta(minutes=1))
+        self.assertEqual(self.cambios(desde), {("leads", "upsert", self.contacto.pk)})
+
+    def test_tombstones_borrado_directo_y_en_cascada(self):
+        desde = timezone.now()
+        borrados = {("leads", "delete", self.suelto.pk), ("propiedades", "delete", self.propiedad.pk),
+                    ("eventos", "delete", self.evento.pk)}
+        self.suelto.delete()
+        self.propiedad.delete()  # se lleva el evento en cascada
+        self.assertEqual(self.cambios(desde), borrados)
+        self.assertEqual(set(Borrado.objects.values_list("owner_id", flat=True)), {self.user.pk})
+
+        self.client.force_authenticate(self.otro)
+        self.assertEqual(self.cambios(desde), set())
+
+    def test_borrar_contacto_actualiza_sus_eventos(self):
+        desde = timezone.now()
+        contacto = self.contacto.pk
+        self.contacto.delete()  # SET_NULL sin save() en los eventos
+        self.assertEqual(self.cambios(desde), {("leads", "delete", contacto), ("eventos", "upsert", self.evento.pk)})
+        (evento,) = [linea for linea in self.sync(desde) if linea["resource"] == "eventos"]
+        self.assertIsNone(evento["contacto_id"])
+
+    def test_borrar_estado_actualiza_sus_contactos(self):
+        desde = timezone.now()
+        self.estado.delete()  # SET_NULL en Contacto.estado
+        (lead,) = self.sync(desde)
+        self.assertEqual((lead["resource"], lead["op"], lead["id"]), ("leads", "upsert", self.contacto.pk))
+        self.assertIsNone(lead["estado__fase"])
+
+    def test_cursor_invalido(self):
+        ingenuo = base64.urlsafe_b64encode(json.dumps({"t": "2025-01-01T00:00:00"}).encode()).decode()
+        for since in ("xxx", ingenuo, views._sync_cursor(timezone.now())[:-4]):
+            with self.subTest(since=since):
+                response = self.client.get("/api/exportacion/sync/", {"since": since})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["detail"], "Cursor inválido.")
+
+    @override_settings(SYNC_RETENCION_DIAS=30)
+    def test_cursor_vencido(self):
+        viejo = views._sync_cursor(timezone.now() - timedelta(days=31))
+        self.assertEqual(self.client.get("/api/exportacion/sync/", {"since": viejo}).status_code, 410)
+        self.sync(timezone.now() - timedelta(days=29))
+
+    def test_purgar_borrados(self):
+        Borrado.objects.bulk_create([Borrado(owner=self.user, recurso="leads", objeto_id=i) for i in range(5)])
+        viejos = Borrado.objects.order_by("pk").values_list("pk", flat=True)[:3]
+        Borrado.objects.filter(pk__in=list(viejos)).update(borrado_en=timezone.now() - timedelta(days=11))
+
+        salida = io.StringIO()
+        call_command("purgar_borrados", dias=10, lote=2, stdout=salida)
+        self.assertIn("3 borrados purgados", salida.getvalue())
+        self.assertEqual(sorted(Borrado.objects.values_list("objeto_id", flat=True)), [3, 4])
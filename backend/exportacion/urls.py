@@ -1,8 +1,17 @@
 from django.urls import path
-from .views import ExportView, MetricsView, ImportView
+from .views import (
+    ExportView, SyncView, MetricsView, ResumenView, ImportView,
+    TareaListView, TareaDetailView, TareaCancelarView, TareaDescargarView,
+)
 
 urlpatterns = [
     path("export/", ExportView.as_view(), name="exportacion-export"),
+    path("sync/", SyncView.as_view(), name="exportacion-sync"),
     path("metrics/", MetricsView.as_view(), name="exportacion-metrics"),
+    path("resumen/", ResumenView.as_view(), name="exportacion-resumen"),
     path("import/", ImportView.as_view(), name="exportacion-import"),
+    path("tareas/", TareaListView.as_view(), name="exportacion-tareas"),
+    path("tareas/<int:pk>/", TareaDetailView.as_view(), name="exportacion-tarea"),
+    path("tareas/<int:pk>/cancelar/", TareaCancelarView.as_view(), name="exportacion-tarea-cancelar"),
+    path("tareas/<int:pk>/descargar/", TareaDescargarView.as_view(), name="exportacion-tarea-descargar"),
 ]
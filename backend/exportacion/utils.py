@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.utils.timezone import make_aware
+
+
+# =======================
+# Utilidades de fechas
+# =======================
+
+def _month_range(year: int, month: int):
+    from calendar import monthrange
+    start = datetime(year, month, 1, 0, 0, 0)
+    last_day = monthrange(year, month)[1]
+    end = datetime(year, month, last_day, 23, 59, 59)
+    return start, end
+
+
+def _to_aware(dt: datetime | None):
+    if not dt:
+        return None
+    return make_aware(dt) if dt.tzinfo is None else dt
+
+
+def _parse_dt(val):
+    if not val:
+        return None
+    if isinstance(val, datetime):
+        return _to_aware(val)
+    # Acepta ISO extendido u otros formatos comunes
+    for fmt in (
+        "%Y-%m-%dT%H:%M:%S%z",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%d",
+    ):
+        try:
+            dt = datetime.strptime(str(val), fmt)
+            return _to_aware(dt)
+        except Exception:
+            continue
+    # último intento: fromisoformat
+    try:
+        dt = datetime.fromisoformat(str(val))
+        return _to_aware(dt)
+    except Exception:
+        return None
+
+
+def _to_decimal(x):
+    if x is None or x == "":
+        return None
+    try:
+        return Decimal(str(x))
+    except (InvalidOperation, ValueError):
+        return None
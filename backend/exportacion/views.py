@@ -1,81 +1,206 @@
+import base64
 import csv
 import io
-from datetime import datetime
-from decimal import Decimal, InvalidOperation
+import json
+import os
+import zlib
+from datetime import date, datetime, timedelta
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.http import HttpResponse, JsonResponse
-from django.utils.timezone import make_aware
+from django.db.models import Value
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 
-from leads.models import Contacto, Evento
+from leads.models import Contacto, EstadoLead, Evento
+from leads.pagination import iter_keyset
 from propiedades.models import Propiedad
 
+from . import resumenes
+from .importacion import IMPORTADORES, importar_filas
+from .lectura import ArchivoInvalido, detectar_encoding, leer_csv, leer_json
+from .metricas import METRICAS_MAX_MESES, meses_entre, metricas_mensuales
+from .models import Borrado, Tarea
+from .utils import _month_range, _to_aware, _parse_dt
+
 
 # =======================
-# Utilidades de fechas
+# Export & Métricas
 # =======================
 
-def _month_range(year: int, month: int):
-    from calendar import monthrange
-    start = datetime(year, month, 1, 0, 0, 0)
-    last_day = monthrange(year, month)[1]
-    end = datetime(year, month, last_day, 23, 59, 59)
-    return start, end
-
-
-def _to_aware(dt: datetime | None):
-    if not dt:
-        return None
-    return make_aware(dt) if dt.tzinfo is None else dt
-
-
-def _parse_dt(val):
-    if not val:
-        return None
-    if isinstance(val, datetime):
-        return _to_aware(val)
-    # Acepta ISO extendido u otros formatos comunes
-    for fmt in (
-        "%Y-%m-%dT%H:%M:%S%z",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d",
-    ):
-        try:
-            dt = datetime.strptime(str(val), fmt)
-            return _to_aware(dt)
-        except Exception:
-            continue
-    # último intento: fromisoformat
-    try:
-        dt = datetime.fromisoformat(str(val))
-        return _to_aware(dt)
-    except Exception:
-        return None
-
-
-def _to_decimal(x):
-    if x is None or x == "":
-        return None
-    try:
-        return Decimal(str(x))
-    except (InvalidOperation, ValueError):
-        return None
+# Columnas exportadas por recurso (mismo orden que los encabezados del CSV)
+EXPORT_FIELDS = {
+    "leads": (
+        "id", "nombre", "apellido", "email", "telefono",
+        "estado__fase", "creado_en",
+    ),
+    "propiedades": (
+        "id", "codigo", "titulo", "ubicacion", "tipo_de_propiedad",
+        "disponibilidad", "precio", "moneda", "ambiente", "antiguedad",
+        "banos", "superficie", "estado", "fecha_alta", "vendida_en",
+    ),
+    "eventos": (
+        "id", "tipo", "fecha_hora", "propiedad_id", "contacto_id",
+        "email", "nombre", "apellido"
+    ),
+}
+
+# Filas por query al exportar (y por bloque escrito en la respuesta)
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _csv_stream(sections, chunk_size=EXPORT_CHUNK_SIZE, progreso=None):
+    """
+    Genera el CSV por bloques: "=== RECURSO ===", encabezados, filas y una fila vacía
+    por sección (las secciones sin filas se omiten). Cada recurso se lee de a
+    `chunk_size` filas con keyset, así la memoria no depende del tamaño del export.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    for key, qs, fields in sections:
+        started = False
+        pending = 0
+        for row in iter_keyset(qs, fields, chunk_size=chunk_size):
+            if not started:
+                writer.writerow([f"=== {key.upper()} ==="])
+                writer.writerow(fields)
+                started = True
+            writer.writerow([row[f] for f in fields])
+            pending += 1
+            if pending >= chunk_size:
+                if progreso:
+                    progreso(pending)
+                yield flush()
+                pending = 0
+        if started:
+            writer.writerow([])
+            if progreso and pending:
+                progreso(pending)
+            yield flush()
 
 
-# =======================
-# Export & Métricas
-# =======================
+def _ndjson_stream(sections, chunk_size=EXPORT_CHUNK_SIZE, progreso=None):
+    """
+    Un objeto JSON por línea: {"resource": "leads", "id": ..., ...}, recurso por recurso.
+    Mismo encoder que JsonResponse (fechas ISO, Decimal como string).
+    """
+    for key, qs, fields in sections:
+        lines = []
+        for row in iter_keyset(qs, fields, chunk_size=chunk_size):
+            obj = {"resource": key}
+            obj.update((f, row[f]) for f in fields)
+            lines.append(json.dumps(obj, cls=DjangoJSONEncoder))
+            if len(lines) >= chunk_size:
+                if progreso:
+                    progreso(len(lines))
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            if progreso:
+                progreso(len(lines))
+            yield "\n".join(lines) + "\n"
+
+
+def _gzip_stream(chunks):
+    """Comprime en gzip a medida que llegan los bloques (no espera al final)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# formato -> (generador, content-type, extensión)
+STREAM_FORMATS = {
+    "csv": (_csv_stream, "text/csv", "csv"),
+    "ndjson": (_ndjson_stream, "application/x-ndjson", "ndjson"),
+}
+
+
+def _export_querysets(user, filters: dict) -> dict:
+    """{"leads": qs, "propiedades": qs, "eventos": qs} del owner con los filtros del export."""
+    year = filters.get("year")
+    month = filters.get("month")
+    date_from = filters.get("date_from")
+    date_to = filters.get("date_to")
+    estado_propiedad = filters.get("estado_propiedad")
+
+    # rango temporal
+    start_dt = end_dt = None
+    if year and month:
+        start_dt, end_dt = _month_range(int(year), int(month))
+    elif date_from and date_to:
+        start_dt = _parse_dt(date_from)
+        end_dt = _parse_dt(date_to)
+
+    # ⚠️ Normalizar a aware (evita vacíos por naive vs aware)
+    start_dt = _to_aware(start_dt)
+    end_dt = _to_aware(end_dt)
+
+    # ==== Querys ====
+    qs_contactos = Contacto.objects.filter(owner=user)
+    if start_dt and end_dt:
+        qs_contactos = qs_contactos.filter(creado_en__range=(start_dt, end_dt))
+
+    qs_prop = Propiedad.objects.filter(owner=user)
+    if estado_propiedad:
+        qs_prop = qs_prop.filter(estado__in=estado_propiedad)
+    if start_dt and end_dt:
+        qs_prop = qs_prop.filter(fecha_alta__range=(start_dt, end_dt))
+
+    qs_eventos = Evento.objects.filter(owner=user)
+    if start_dt and end_dt:
+        qs_eventos = qs_eventos.filter(fecha_hora__range=(start_dt, end_dt))
+
+    return {
+        "leads": qs_contactos,
+        "propiedades": qs_prop,
+        "eventos": qs_eventos,
+    }
+
+
+def _export_archivo(sources: dict, resources, fmt: str, compress: str, filters: dict, progreso=None):
+    """
+    (bloques, content_type, filename) del export en streaming (csv / ndjson, opcional gzip).
+    `progreso(n)` se llama con las filas escritas en cada bloque.
+    """
+    stream, content_type, ext = STREAM_FORMATS.get(fmt, STREAM_FORMATS["csv"])
+    sections = [(key, sources[key], EXPORT_FIELDS[key]) for key in resources if key in sources]
+    chunks = stream(sections, progreso=progreso)
+
+    year, month = filters.get("year"), filters.get("month")
+    filename = "export"
+    if year and month:
+        filename = f"export_{int(year):04d}_{int(month):02d}"
+    filename = f"{filename}.{ext}"
+    if compress == "gzip":
+        chunks = _gzip_stream(chunks)
+        content_type = "application/gzip"
+        filename += ".gz"
+    return chunks, content_type, filename
+
 
 class ExportView(APIView):
     """
     POST /api/exportacion/export/
     Body JSON:
     {
-      "format": "csv" | "json",
+      "format": "csv" | "json" | "ndjson",
+      "compress": "gzip",            # opcional, solo csv / ndjson
       "resources": ["leads","propiedades","eventos"],
       "filters": {
         "year": 2025,
@@ -85,134 +210,208 @@ class ExportView(APIView):
         "estado_propiedad": ["vendido","reservado"]
       }
     }
+    Para exports muy grandes conviene encolarlo como tarea (POST /api/exportacion/tareas/).
     """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         fmt = (request.data.get("format") or "csv").lower()
+        compress = (request.data.get("compress") or "").lower()
+        if compress not in ("", "gzip"):
+            return JsonResponse({"detail": "compress debe ser 'gzip' o vacío"}, status=400)
         resources = request.data.get("resources") or []
         filters = request.data.get("filters") or {}
 
-        year = filters.get("year")
-        month = filters.get("month")
-        date_from = filters.get("date_from")
-        date_to = filters.get("date_to")
-        estado_propiedad = filters.get("estado_propiedad")
+        sources = _export_querysets(request.user, filters)
 
-        # rango temporal
-        start_dt = end_dt = None
-        if year and month:
-            start_dt, end_dt = _month_range(int(year), int(month))
-        elif date_from and date_to:
-            start_dt = _parse_dt(date_from)
-            end_dt = _parse_dt(date_to)
+        # salida
+        if fmt == "json":
+            data = {
+                key: list(sources[key].values(*EXPORT_FIELDS[key]))
+                for key in EXPORT_FIELDS if key in resources
+            }
+            return JsonResponse(data, safe=False)
 
-        # ⚠️ Normalizar a aware (evita vacíos por naive vs aware)
-        start_dt = _to_aware(start_dt)
-        end_dt = _to_aware(end_dt)
+        # CSV / NDJSON en streaming: se escribe a medida que se leen las filas
+        chunks, content_type, filename = _export_archivo(sources, resources, fmt, compress, filters)
+        resp = StreamingHttpResponse(chunks, content_type=content_type)
+        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return resp
 
-        user = request.user
 
-        # ==== Querys ====
-        qs_contactos = Contacto.objects.filter(owner=user)
-        if start_dt and end_dt:
-            qs_contactos = qs_contactos.filter(creado_en__range=(start_dt, end_dt))
-
-        qs_prop = Propiedad.objects.filter(owner=user)
-        if estado_propiedad:
-            qs_prop = qs_prop.filter(estado__in=estado_propiedad)
-        if start_dt and end_dt:
-            qs_prop = qs_prop.filter(fecha_alta__range=(start_dt, end_dt))
-
-        qs_eventos = Evento.objects.filter(owner=user)
-        if start_dt and end_dt:
-            qs_eventos = qs_eventos.filter(fecha_hora__range=(start_dt, end_dt))
-
-        data = {}
-        if "leads" in resources:
-            data["leads"] = list(
-                qs_contactos.values(
-                    "id", "nombre", "apellido", "email", "telefono",
-                    "estado__fase", "creado_en",
-                )
-            )
-        if "propiedades" in resources:
-            data["propiedades"] = list(
-                qs_prop.values(
-                    "id", "codigo", "titulo", "ubicacion", "tipo_de_propiedad",
-                    "disponibilidad", "precio", "moneda", "ambiente", "antiguedad",
-                    "banos", "superficie", "estado", "fecha_alta", "vendida_en",
-                )
-            )
-        if "eventos" in resources:
-            data["eventos"] = list(
-                qs_eventos.values(
-                    "id", "tipo", "fecha_hora", "propiedad_id", "contacto_id",
-                    "email", "nombre", "apellido"
-                )
-            )
+# =======================
+# Sync incremental
+# =======================
 
-        # salida
-        if fmt == "json":
-            return JsonResponse(data, safe=False)
+# Cada sync vuelve a mandar lo de los últimos minutos antes del cursor: así no se pierden
+# cambios de transacciones largas que confirmaron después de generarse el cursor.
+# Del lado del cliente, aplicar como upserts idempotentes (una fila puede repetirse).
+SYNC_SOLAPAMIENTO = timedelta(minutes=5)
+
+
+def _sync_cursor(dt) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"t": dt.isoformat()}).encode("utf-8")).decode("ascii")
+
+
+def _sync_desde(token: str):
+    raw = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+    dt = datetime.fromisoformat(raw["t"])
+    if dt.tzinfo is None:
+        raise ValueError(token)
+    return dt
+
+
+def _sync_stream(sections, cursor: str):
+    yield from _ndjson_stream(sections)
+    yield json.dumps({"cursor": cursor}) + "\n"
+
+
+class SyncView(APIView):
+    """
+    GET /api/exportacion/sync/?since=<cursor>&resources=leads,propiedades,eventos&compress=gzip
+
+    Lo que cambió desde `since` (sin `since`: todo), en NDJSON y en streaming:
+      {"resource": "leads", "op": "upsert", "id": 1, ..., "actualizado_en": "..."}
+      {"resource": "leads", "op": "delete", "objeto_id": 7, "borrado_en": "..."}
+      {"cursor": "..."}     <- última línea (también en el header X-Sync-Cursor)
+    El cursor se pasa tal cual como `since` en el próximo sync. Los borrados se guardan
+    SYNC_RETENCION_DIAS días (purgar_borrados): un cursor más viejo recibe 410 y hay que
+    sincronizar todo de nuevo, sin `since`.
+    """
+    permission_classes = [IsAuthenticated]
 
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
+    def get(self, request):
+        user = request.user
+        cursor = _sync_cursor(timezone.now())  # antes de leer: lo posterior va en el próximo
 
+        desde = None
+        if request.GET.get("since"):
+            try:
+                desde = _sync_desde(request.GET["since"]) - SYNC_SOLAPAMIENTO
+            except Exception:
+                return JsonResponse({"detail": "Cursor inválido."}, status=400)
+            if desde < timezone.now() - timedelta(days=settings.SYNC_RETENCION_DIAS):
+                # Los tombstones de ese período ya se pudieron purgar: faltarían borrados
+                return JsonResponse({"detail": "Cursor vencido: sincronizar de nuevo sin since."}, status=410)
+
+        resources = [r.strip() for r in (request.GET.get("resources") or ",".join(EXPORT_FIELDS)).split(",") if r.strip()]
+        if not resources or any(r not in EXPORT_FIELDS for r in resources):
+            return JsonResponse({"detail": f"resources debe ser uno o más de: {', '.join(EXPORT_FIELDS)}"}, status=400)
+        compress = (request.GET.get("compress") or "").lower()
+        if compress not in ("", "gzip"):
+            return JsonResponse({"detail": "compress debe ser 'gzip' o vacío"}, status=400)
+
+        sources = _export_querysets(user, {})
+        sections = []
         for key in resources:
-            rows = data.get(key, [])
-            if not rows:
+            qs = sources[key].annotate(op=Value("upsert")).order_by("actualizado_en", "id")
+            if desde is None:
+                sections.append((key, qs, ("op", *EXPORT_FIELDS[key], "actualizado_en")))
                 continue
-            writer.writerow([f"=== {key.upper()} ==="])
-            headers = list(rows[0].keys())
-            writer.writerow(headers)
-            for r in rows:
-                writer.writerow([r.get(h, "") for h in headers])
-            writer.writerow([])
-
-        resp = HttpResponse(buffer.getvalue(), content_type="text/csv")
-        filename = "export.csv"
-        if year and month:
-            filename = f"export_{int(year):04d}_{int(month):02d}.csv"
-        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+            bajas = (
+                Borrado.objects.filter(owner=user, recurso=key, borrado_en__gt=desde)
+                .annotate(op=Value("delete"))
+                .order_by("borrado_en", "id")
+            )
+            sections.append((key, qs.filter(actualizado_en__gt=desde), ("op", *EXPORT_FIELDS[key], "actualizado_en")))
+            sections.append((key, bajas, ("op", "objeto_id", "borrado_en")))
+
+        chunks = _sync_stream(sections, cursor)
+        content_type = "application/x-ndjson"
+        if compress == "gzip":
+            chunks = _gzip_stream(chunks)
+            content_type = "application/gzip"
+        resp = StreamingHttpResponse(chunks, content_type=content_type)
+        resp["X-Sync-Cursor"] = cursor
         return resp
 
 
 class MetricsView(APIView):
     """
     GET /api/exportacion/metrics/?year=2025&month=9
+    GET /api/exportacion/metrics/?from=2024-01&to=2025-12   -> {"from", "to", "months": [...]}
+
+    Todo el rango sale de los resúmenes diarios (una query sobre ResumenDiario); con cache
+    compartido los meses cerrados se cachean (ver metricas.py).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        user = request.user
+
+        if request.GET.get("from") or request.GET.get("to"):
+            try:
+                desde = _parse_mes(request.GET.get("from"))
+                hasta = _parse_mes(request.GET.get("to"))
+            except (TypeError, ValueError):
+                return JsonResponse({"detail": "Parámetros from y to deben tener formato YYYY-MM"}, status=400)
+            meses = len(meses_entre(desde, hasta))
+            if not meses:
+                return JsonResponse({"detail": "from debe ser anterior o igual a to"}, status=400)
+            if meses > METRICAS_MAX_MESES:
+                return JsonResponse({"detail": f"Máximo {METRICAS_MAX_MESES} meses por consulta"}, status=400)
+            return JsonResponse({
+                "from": request.GET["from"],
+                "to": request.GET["to"],
+                "months": metricas_mensuales(user, desde, hasta),
+            })
+
         try:
             year = int(request.GET.get("year"))
             month = int(request.GET.get("month"))
+            if not 1 <= month <= 12:
+                raise ValueError
         except (TypeError, ValueError):
             return JsonResponse({"detail": "Parámetros year y month son obligatorios"}, status=400)
 
-        start_dt, end_dt = _month_range(year, month)
-        start_dt = _to_aware(start_dt)
-        end_dt = _to_aware(end_dt)
+        return JsonResponse(metricas_mensuales(user, (year, month), (year, month))[0])
 
-        user = request.user
 
-        leads_mes = Contacto.objects.filter(owner=user, creado_en__range=(start_dt, end_dt)).count()
+def _parse_mes(val: str) -> tuple[int, int]:
+    """'2024-01' -> (2024, 1)"""
+    year, month = str(val).strip().split("-")
+    year, month = int(year), int(month)
+    if not (1 <= month <= 12 and 1 <= year <= 9999):
+        raise ValueError(val)
+    return year, month
 
-        ventas_qs = Propiedad.objects.filter(owner=user, estado="vendido")
-        ventas_mes = ventas_qs.filter(vendida_en__range=(start_dt, end_dt)).count()
-        if ventas_mes == 0:
-            ventas_mes = ventas_qs.filter(fecha_alta__range=(start_dt, end_dt)).count()
 
-        conversion_pct = round((ventas_mes / leads_mes * 100.0), 2) if leads_mes else 0.0
+# Máximo de días por pedido de /resumen/ (unos 10 años)
+RESUMEN_MAX_DIAS = 3660
 
-        return JsonResponse({
-            "year": year,
-            "month": month,
-            "leads_mes": leads_mes,
-            "ventas_mes": ventas_mes,
-            "conversion_pct": conversion_pct,
-        })
+
+class ResumenView(APIView):
+    """
+    GET /api/exportacion/resumen/?from=2024-01-01&to=2025-12-31&group=day|month
+
+    Series por día (o por mes) desde los resúmenes diarios (ver resumenes.py): solo
+    aparecen los períodos con datos. transiciones va por fase ("" = estado borrado).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            desde = date.fromisoformat(request.GET.get("from", ""))
+            hasta = date.fromisoformat(request.GET.get("to", ""))
+        except ValueError:
+            return JsonResponse({"detail": "Parámetros from y to deben tener formato YYYY-MM-DD"}, status=400)
+        if desde > hasta:
+            return JsonResponse({"detail": "from debe ser anterior o igual a to"}, status=400)
+        if (hasta - desde).days >= RESUMEN_MAX_DIAS:
+            return JsonResponse({"detail": f"Máximo {RESUMEN_MAX_DIAS} días por consulta"}, status=400)
+
+        group = request.GET.get("group", "day")
+        if group not in ("day", "month"):
+            return JsonResponse({"detail": "group debe ser 'day' o 'month'"}, status=400)
+        periodo = (lambda dia: dia.isoformat()) if group == "day" else (lambda dia: f"{dia.year:04d}-{dia.month:02d}")
+
+        rows = resumenes.agrupar(resumenes.del_rango(request.user.pk, desde, hasta), periodo)
+        fases = dict(EstadoLead.objects.values_list("id", "fase"))
+        for row in rows:
+            row["transiciones"] = {
+                (fases.get(int(k), "") if k else ""): n for k, n in row["transiciones"].items()
+            }
+        return JsonResponse({"from": desde.isoformat(), "to": hasta.isoformat(), "group": group, "rows": rows})
 
 
 # =======================
@@ -227,6 +426,7 @@ class ImportView(APIView):
         file: (CSV o JSON)
         resource: "leads" | "propiedades" | "eventos"
         dry_run: "true" | "false" (opcional, default false)
+        mode: "import" | "dry_run" | "validate" (opcional; pisa a dry_run)
     - application/json:
         {
           "resource": "...",
@@ -234,6 +434,13 @@ class ImportView(APIView):
           "rows": [ {...}, {...} ]    # lista de objetos a importar (JSON)
         }
 
+    Modos:
+    - import: aplica los cambios.
+    - dry_run: corre el import real dentro de una transacción que siempre se revierte
+      (conteos exactos, no queda nada guardado).
+    - validate: solo parsea/valida y consulta qué claves existen (no escribe; mucho más
+      rápido). "updated" = filas que caen sobre un registro existente.
+
     CSV esperado (campos más comunes):
     - leads (Contacto): email*, nombre, apellido, telefono, estado_fase, creado_en
     - propiedades: codigo*, titulo, ubicacion, tipo_de_propiedad, disponibilidad,
@@ -251,6 +458,9 @@ class ImportView(APIView):
         # Detectar fuente de datos: archivo (multipart) o JSON "rows"
         resource = (request.data.get("resource") or "").strip().lower()
         dry_run = str(request.data.get("dry_run") or "false").lower() in ("1", "true", "yes")
+        mode = (request.data.get("mode") or ("dry_run" if dry_run else "import")).strip().lower()
+        if mode not in ("import", "dry_run", "validate"):
+            return JsonResponse({"detail": "mode debe ser 'import', 'dry_run' o 'validate'."}, status=400)
 
         if not resource or resource not in ("leads", "propiedades", "eventos"):
             return JsonResponse({"detail": "Parámetro 'resource' inválido."}, status=400)
@@ -260,240 +470,163 @@ class ImportView(APIView):
 
         if file_obj:
             # CSV o JSON subido como archivo
+            # Se lee en streaming: las filas salen de a una mientras se importan
             name = (file_obj.name or "").lower()
-            content = file_obj.read()
-            # Intentar decode con BOM seguro
-            try:
-                text = content.decode("utf-8-sig")
-            except UnicodeDecodeError:
-                try:
-                    text = content.decode("latin-1")
-                except Exception:
-                    return JsonResponse({"detail": "No se pudo decodificar el archivo."}, status=400)
-
+            encoding = detectar_encoding(file_obj)
             if name.endswith(".json"):
-                import json
-                try:
-                    rows = json.loads(text)
-                except Exception as e:
-                    return JsonResponse({"detail": f"JSON inválido: {e}"}, status=400)
-                if not isinstance(rows, list):
-                    return JsonResponse({"detail": "El JSON debe ser una lista de objetos."}, status=400)
+                rows = leer_json(file_obj, encoding)
             else:
                 # asumimos CSV
-                buff = io.StringIO(text)
-                reader = csv.DictReader(buff)
-                rows = list(reader)
+                rows = leer_csv(file_obj, encoding)
         else:
             # application/json con "rows"
             rows = request.data.get("rows")
             if not isinstance(rows, list):
                 return JsonResponse({"detail": "Debe enviar 'file' (CSV/JSON) o 'rows' (lista JSON)."}, status=400)
 
-        created = 0
-        updated = 0
-        errors = []
+        try:
+            if mode == "validate":
+                # solo lecturas: no hace falta transacción
+                result = importar_filas(user, resource, rows, solo_validar=True)
+            else:
+                with transaction.atomic():
+                    result = importar_filas(user, resource, rows)
+                    if mode == "dry_run":
+                        # pipeline real, pero se revierte todo (y los avisos on_commit no salen)
+                        transaction.set_rollback(True)
+        except ArchivoInvalido as e:
+            # el archivo se rompe a mitad de camino: se revierte lo importado hasta ahí
+            return JsonResponse({"detail": str(e)}, status=400)
 
-        # Transacción solo si no es dry_run
-        ctx = transaction.atomic() if not dry_run else _NullCtx()
+        return JsonResponse({
+            "resource": resource,
+            "mode": mode,
+            "dry_run": mode != "import",
+            "created": result["created"],
+            "updated": result["updated"],
+            "errors": result["errors"],
+        }, status=200 if not result["errors"] else 207)
 
-        with ctx:
-            for idx, raw in enumerate(rows, start=1):
-                try:
-                    if resource == "leads":
-                        was_created, was_updated = self._upsert_contacto(user, raw)
-                    elif resource == "propiedades":
-                        was_created, was_updated = self._upsert_propiedad(user, raw)
-                    else:
-                        was_created, was_updated = self._upsert_evento(user, raw)
 
-                    created += int(was_created)
-                    updated += int(was_updated)
-                except Exception as e:
-                    errors.append({"row": idx, "error": str(e)})
+# =======================
+# Tareas en segundo plano
+# =======================
 
-            if dry_run:
-                # no persistimos
-                pass
+def _tarea_json(tarea: Tarea, request, errores_recientes=None) -> dict:
+    data = {
+        "id": tarea.id,
+        "tipo": tarea.tipo,
+        "estado": tarea.estado,
+        "params": tarea.params,
+        "filas_procesadas": tarea.filas_procesadas,
+        "creados": tarea.creados,
+        "actualizados": tarea.actualizados,
+        "errores": tarea.errores,
+        "detalle": tarea.detalle,
+        "creado_en": tarea.creado_en,
+        "iniciado_en": tarea.iniciado_en,
+        "terminado_en": tarea.terminado_en,
+        "descarga": (
+            request.build_absolute_uri(reverse("exportacion-tarea-descargar", args=[tarea.id]))
+            if tarea.resultado else None
+        ),
+    }
+    if errores_recientes is not None:
+        data["errores_recientes"] = errores_recientes
+    return data
 
-        return JsonResponse({
-            "resource": resource,
-            "dry_run": dry_run,
-            "created": created,
-            "updated": updated,
-            "errors": errors,
-        }, status=200 if not errors else 207)
-
-    # ---------- upserts ----------
-
-    def _upsert_contacto(self, user, raw: dict):
-        email = (raw.get("email") or "").strip()
-        if not email:
-            raise ValueError("Contacto requiere 'email' como clave.")
-
-        nombre = (raw.get("nombre") or "").strip()
-        apellido = (raw.get("apellido") or "").strip()
-        telefono = (raw.get("telefono") or "").strip()
-        creado_en = _parse_dt(raw.get("creado_en"))
-
-        # estado por descripción/fase opcional
-        estado_fase = (raw.get("estado_fase") or raw.get("estado") or "").strip() or None
-        estado_obj = None
-        if estado_fase:
-            from leads.models import EstadoLead
-            estado_obj = EstadoLead.objects.filter(fase__iexact=estado_fase).first()
-
-        obj, created = Contacto.objects.get_or_create(
-            owner=user, email__iexact=email,
-            defaults={"owner": user, "email": email}
-        )
 
-        # get_or_create con filtro case-insensitive necesita doble paso
-        if not created and obj.email.lower() != email.lower():
-            obj = Contacto.objects.filter(owner=user, email__iexact=email).first()
-
-        before = (obj.nombre, obj.apellido, obj.telefono, obj.estado_id, obj.creado_en)
-        if nombre:
-            obj.nombre = nombre
-        if apellido:
-            obj.apellido = apellido
-        if telefono:
-            obj.telefono = telefono
-        if estado_obj:
-            obj.estado = estado_obj
-        if creado_en:
-            obj.creado_en = creado_en
-        obj.owner = user
-        obj.save()
-
-        after = (obj.nombre, obj.apellido, obj.telefono, obj.estado_id, obj.creado_en)
-        updated = (not created) and (before != after)
-        return created, updated
-
-    def _upsert_propiedad(self, user, raw: dict):
-        codigo = (raw.get("codigo") or "").strip()
-        if not codigo:
-            raise ValueError("Propiedad requiere 'codigo' como clave.")
-
-        defaults = {"owner": user}
-        # campos opcionales
-        for key in ("titulo", "descripcion", "ubicacion", "tipo_de_propiedad",
-                    "disponibilidad", "moneda", "estado"):
-            val = raw.get(key)
-            if val is not None and val != "":
-                defaults[key] = val
-
-        # numéricos
-        precio = _to_decimal(raw.get("precio"))
-        if precio is not None:
-            defaults["precio"] = precio
-
-        for int_field in ("ambiente", "antiguedad", "banos"):
-            v = raw.get(int_field)
-            try:
-                if v not in (None, ""):
-                    defaults[int_field] = int(v)
-            except Exception:
-                pass
-
-        # decimales
-        superficie = _to_decimal(raw.get("superficie"))
-        if superficie is not None:
-            defaults["superficie"] = superficie
-
-        # fechas
-        fecha_alta = _parse_dt(raw.get("fecha_alta"))
-        if fecha_alta:
-            defaults["fecha_alta"] = fecha_alta
-        vendida_en = _parse_dt(raw.get("vendida_en"))
-        if vendida_en:
-            defaults["vendida_en"] = vendida_en
-
-        obj, created = Propiedad.objects.get_or_create(
-            owner=user, codigo=codigo, defaults=defaults
-        )
+class TareaListView(APIView):
+    """
+    GET  /api/exportacion/tareas/   -> últimas tareas del usuario
+    POST /api/exportacion/tareas/   -> encola un import o un export (responde 202)
+      - import (multipart/form-data): tipo=import, resource, file (CSV o JSON)
+      - export (JSON): {"tipo": "export", "format": "csv" | "ndjson", "compress": "gzip",
+                        "resources": [...], "filters": {...}}   (mismos campos que /export/)
+    El progreso se consulta en /tareas/<id>/ y el resultado en /tareas/<id>/descargar/.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+
+    def get(self, request):
+        tareas = Tarea.objects.filter(owner=request.user)[:20]
+        return JsonResponse({"results": [_tarea_json(t, request) for t in tareas]})
+
+    def post(self, request):
+        tipo = (request.data.get("tipo") or "").strip().lower()
+
+        if tipo == "import":
+            resource = (request.data.get("resource") or "").strip().lower()
+            if resource not in IMPORTADORES:
+                return JsonResponse({"detail": "Parámetro 'resource' inválido."}, status=400)
+            file_obj = request.FILES.get("file")
+            if not file_obj:
+                return JsonResponse({"detail": "Debe enviar 'file' (CSV/JSON)."}, status=400)
+            tarea = Tarea(
+                owner=request.user, tipo="import",
+                params={"resource": resource, "nombre_archivo": file_obj.name or ""},
+            )
+            tarea.archivo.save(file_obj.name or "import", file_obj, save=False)
+            tarea.save()
+
+        elif tipo == "export":
+            fmt = (request.data.get("format") or "csv").lower()
+            compress = (request.data.get("compress") or "").lower()
+            if fmt not in STREAM_FORMATS:
+                return JsonResponse({"detail": "format debe ser 'csv' o 'ndjson'."}, status=400)
+            if compress not in ("", "gzip"):
+                return JsonResponse({"detail": "compress debe ser 'gzip' o vacío"}, status=400)
+            tarea = Tarea.objects.create(
+                owner=request.user, tipo="export",
+                params={
+                    "format": fmt,
+                    "compress": compress,
+                    "resources": request.data.get("resources") or [],
+                    "filters": request.data.get("filters") or {},
+                },
+            )
 
-        if not created:
-            changed = False
-            for k, v in defaults.items():
-                if getattr(obj, k) != v and v is not None:
-                    setattr(obj, k, v)
-                    changed = True
-            if changed:
-                obj.save()
-            return False, changed
-        return True, False
-
-    def _upsert_evento(self, user, raw: dict):
-        tipo = (raw.get("tipo") or "").strip()
-        if not tipo:
-            raise ValueError("Evento requiere 'tipo'.")
-
-        fecha_hora = _parse_dt(raw.get("fecha_hora"))
-        if not fecha_hora:
-            raise ValueError("Evento requiere 'fecha_hora' válida.")
-
-        # Resolver propiedad
-        prop = None
-        prop_id = raw.get("propiedad_id")
-        prop_codigo = raw.get("propiedad_codigo")
-        if prop_id:
-            prop = Propiedad.objects.filter(owner=user, id=prop_id).first()
-        if not prop and prop_codigo:
-            prop = Propiedad.objects.filter(owner=user, codigo=prop_codigo).first()
-        if not prop:
-            raise ValueError("No se encontró la propiedad (propiedad_id o propiedad_codigo).")
-
-        # Resolver contacto
-        ct = None
-        contacto_id = raw.get("contacto_id")
-        contacto_email = (raw.get("contacto_email") or "").strip()
-        if contacto_id:
-            ct = Contacto.objects.filter(owner=user, id=contacto_id).first()
-        if not ct and contacto_email:
-            ct = Contacto.objects.filter(owner=user, email__iexact=contacto_email).first()
-
-        nombre = (raw.get("nombre") or "").strip()
-        apellido = (raw.get("apellido") or "").strip()
-        email = (raw.get("email") or "").strip()
-        notas = (raw.get("notas") or "").strip()
-
-        # Upsert por id si viene
-        ev_id = raw.get("id")
-        if ev_id:
-            ev = Evento.objects.filter(owner=user, id=ev_id).first()
-            if not ev:
-                # crear con id específico no es trivial; creamos normal
-                ev = Evento.objects.create(
-                    owner=user, tipo=tipo, fecha_hora=fecha_hora,
-                    propiedad=prop, contacto=ct, nombre=nombre, apellido=apellido,
-                    email=email or None, notas=notas
-                )
-                return True, False
-            before = (ev.tipo, ev.fecha_hora, ev.propiedad_id, ev.contacto_id, ev.nombre, ev.apellido, ev.email, ev.notas)
-            ev.tipo = tipo
-            ev.fecha_hora = fecha_hora
-            ev.propiedad = prop
-            ev.contacto = ct
-            if nombre: ev.nombre = nombre
-            if apellido: ev.apellido = apellido
-            ev.email = email or None
-            if notas: ev.notas = notas
-            ev.owner = user
-            ev.save()
-            after = (ev.tipo, ev.fecha_hora, ev.propiedad_id, ev.contacto_id, ev.nombre, ev.apellido, ev.email, ev.notas)
-            return False, before != after
-
-        # Crear
-        Evento.objects.create(
-            owner=user, tipo=tipo, fecha_hora=fecha_hora,
-            propiedad=prop, contacto=ct, nombre=nombre, apellido=apellido,
-            email=email or None, notas=notas
+        else:
+            return JsonResponse({"detail": "tipo debe ser 'import' o 'export'."}, status=400)
+
+        return JsonResponse(_tarea_json(tarea, request), status=202)
+
+
+class TareaDetailView(APIView):
+    """GET /api/exportacion/tareas/<id>/ -> estado, progreso y los primeros errores."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        tarea = get_object_or_404(Tarea, pk=pk, owner=request.user)
+        errores = list(tarea.errores_filas.values("fila", "error")[:50])
+        return JsonResponse(_tarea_json(tarea, request, errores_recientes=errores))
+
+
+class TareaCancelarView(APIView):
+    """POST /api/exportacion/tareas/<id>/cancelar/ (lo ya confirmado de un import queda)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        tarea = get_object_or_404(Tarea, pk=pk, owner=request.user)
+        n = Tarea.objects.filter(pk=tarea.pk, estado__in=["pendiente", "en_curso"]).update(
+            estado="cancelada", actualizado_en=timezone.now(),
         )
-        return True, False
+        if not n:
+            return JsonResponse({"detail": "La tarea ya terminó."}, status=409)
+        tarea.refresh_from_db()
+        return JsonResponse(_tarea_json(tarea, request))
 
 
-class _NullCtx:
-    """Context manager nulo para dry_run."""
-    def __enter__(self): return self
-    def __exit__(self, exc_type, exc, tb): return False
+class TareaDescargarView(APIView):
+    """GET /api/exportacion/tareas/<id>/descargar/ -> archivo exportado o reporte de errores."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        tarea = get_object_or_404(Tarea, pk=pk, owner=request.user)
+        if not tarea.resultado:
+            return JsonResponse({"detail": "La tarea no tiene archivo para descargar."}, status=404)
+        try:
+            fh = tarea.resultado.open("rb")
+        except FileNotFoundError:
+            return JsonResponse({"detail": "El archivo ya no está disponible."}, status=410)
+        return FileResponse(fh, as_attachment=True, filename=os.path.basename(tarea.resultado.name))
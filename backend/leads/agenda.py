@@ -0,0 +1,136 @@
+# leads/agenda.py
+"""
+Huecos libres en la agenda de propiedades (para GET /api/propiedades/{id}/slots/).
+
+Una sola query por rango sobre el índice (propiedad, fecha_hora, fecha_fin) trae los
+intervalos ocupados ya ordenados; después un barrido lineal (sweep-line) recorre en
+paralelo las franjas de horario laboral y los eventos, y emite los huecos donde entra
+la duración pedida.
+"""
+from datetime import datetime, timedelta, time as dt_time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Evento, DEFAULT_EVENT_DURATION_MIN, MAX_EVENT_DURATION_MIN
+from .utils import parse_date_or_datetime
+
+# Horario laboral por defecto (sobrescribible con settings.AGENDA_HORARIO_LABORAL)
+HORARIO_LABORAL_DEFAULT = {
+    "desde": "09:00",
+    "hasta": "19:00",
+    "dias": [0, 1, 2, 3, 4, 5],  # lunes=0 ... sábado=5
+}
+
+# Rango máximo consultable de una vez (días)
+MAX_RANGO_DIAS = 93
+
+
+def horario_laboral():
+    conf = {**HORARIO_LABORAL_DEFAULT, **getattr(settings, "AGENDA_HORARIO_LABORAL", {})}
+    desde = datetime.strptime(conf["desde"], "%H:%M").time()
+    hasta = datetime.strptime(conf["hasta"], "%H:%M").time()
+    return desde, hasta, set(conf["dias"])
+
+
+def franjas_laborales(inicio: datetime, fin: datetime):
+    """Franjas [apertura, cierre) en hora local, recortadas a [inicio, fin), en orden."""
+    desde, hasta, dias = horario_laboral()
+    dia = timezone.localtime(inicio).date()
+    ultimo = timezone.localtime(fin).date()
+    while dia <= ultimo:
+        if dia.weekday() in dias:
+            apertura = timezone.make_aware(datetime.combine(dia, desde))
+            cierre = timezone.make_aware(datetime.combine(dia, hasta))
+            a, b = max(apertura, inicio), min(cierre, fin)
+            if a < b:
+                yield a, b
+        dia += timedelta(days=1)
+
+
+def intervalos_ocupados(propiedad_ids, inicio: datetime, fin: datetime) -> dict:
+    """
+    {propiedad_id: [(inicio, fin), ...]} ordenados, con UNA query por rango.
+    Solo lee columnas del índice (propiedad, fecha_hora, fecha_fin).
+    """
+    rows = (
+        Evento.objects.filter(
+            propiedad_id__in=list(propiedad_ids),
+            fecha_hora__gt=inicio - timedelta(minutes=MAX_EVENT_DURATION_MIN),
+            fecha_hora__lt=fin,
+            fecha_fin__gt=inicio,
+        )
+        .order_by("propiedad_id", "fecha_hora")
+        .values_list("propiedad_id", "fecha_hora", "fecha_fin")
+    )
+    ocupados = {pid: [] for pid in propiedad_ids}
+    for pid, ini, end in rows:
+        ocupados.setdefault(pid, []).append((ini, end))
+    return ocupados
+
+
+def huecos_libres(ocupados, franjas, duracion: timedelta):
+    """
+    Sweep-line: `ocupados` y `franjas` ordenados por inicio. Devuelve [(inicio, fin), ...]
+    de tiempo libre dentro de las franjas con al menos `duracion`.
+    """
+    libres = []
+    i = 0
+    n = len(ocupados)
+    for apertura, cierre in franjas:
+        cursor = apertura
+        # Eventos que terminan antes de esta franja ya no sirven para nada
+        while i < n and ocupados[i][1] <= apertura:
+            i += 1
+        j = i
+        while j < n and ocupados[j][0] < cierre:
+            ini, end = ocupados[j]
+            if ini - cursor >= duracion:
+                libres.append((cursor, ini))
+            if end > cursor:
+                cursor = end
+            j += 1
+        if cierre - cursor >= duracion:
+            libres.append((cursor, cierre))
+    return libres
+
+
+def slots_por_propiedad(propiedad_ids, inicio: datetime, fin: datetime, duracion_min: int) -> dict:
+    """{propiedad_id: [(inicio, fin), ...]} de huecos libres (no arranca en el pasado)."""
+    inicio = max(inicio, timezone.now())
+    if inicio >= fin:
+        return {pid: [] for pid in propiedad_ids}
+    franjas = list(franjas_laborales(inicio, fin))
+    duracion = timedelta(minutes=duracion_min)
+    ocupados = intervalos_ocupados(propiedad_ids, inicio, fin)
+    return {pid: huecos_libres(ocupados.get(pid, []), franjas, duracion) for pid in propiedad_ids}
+
+
+def parse_rango_y_duracion(params):
+    """
+    Lee from/to/duration de los query params. Devuelve (inicio, fin, duracion_min, error).
+    Por defecto: desde ahora, 7 días, 60 minutos.
+    """
+    inicio = parse_date_or_datetime(params.get("from") or "") or timezone.localtime()
+    to_s = (params.get("to") or "").strip()
+    if to_s:
+        fin = parse_date_or_datetime(to_s, end_of_day=len(to_s) == 10)
+        if not fin:
+            return None, None, None, "Parámetro 'to' inválido."
+        if len(to_s) == 10:
+            fin = timezone.make_aware(datetime.combine(timezone.localtime(fin).date() + timedelta(days=1), dt_time.min))
+    else:
+        fin = inicio + timedelta(days=7)
+
+    if fin <= inicio:
+        return None, None, None, "'to' debe ser posterior a 'from'."
+    if fin - inicio > timedelta(days=MAX_RANGO_DIAS):
+        return None, None, None, f"El rango no puede superar {MAX_RANGO_DIAS} días."
+
+    try:
+        duracion_min = int(params.get("duration") or DEFAULT_EVENT_DURATION_MIN)
+    except ValueError:
+        return None, None, None, "Parámetro 'duration' inválido."
+    if not (1 <= duracion_min <= MAX_EVENT_DURATION_MIN):
+        return None, None, None, f"'duration' debe estar entre 1 y {MAX_EVENT_DURATION_MIN} minutos."
+    return inicio, fin, duracion_min, None
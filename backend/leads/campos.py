@@ -0,0 +1,238 @@
+# leads/campos.py
+"""
+Sparse fieldsets en los viewsets: ?fields=id,nombre,email y ?expand=estado.
+
+- Sin ?fields= la respuesta es la de siempre (todos los campos del serializer).
+- ?fields= deja solo esos campos. Los anidados (estado_detalle, imagenes, ...) se piden
+  por nombre o con ?expand=<relación> (ver `campos_expandibles` del viewset).
+  Un campo o relación desconocida => 400.
+- Los campos pedidos definen las columnas que se leen: .only() + select_related /
+  prefetch_related cuando hay que instanciar modelos, .values() en los listados.
+- Listados: si todos los campos salen de columnas (o de anotaciones del queryset, p. ej.
+  leads/seguimiento.py), cada fila se arma desde .values() sin instanciar modelos ni
+  recorrer el serializer campo por campo. Si no (relaciones many=True, archivos,
+  SerializerMethodField...), se serializa como siempre con el queryset recortado.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .pagination import ordering_keys
+
+# Campos cuyo valor en .values() ya es su representación
+_SIN_CONVERSION = (
+    drf_fields.CharField,
+    drf_fields.IntegerField,
+    drf_fields.BooleanField,
+    drf_fields.ChoiceField,
+    drf_fields.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# Campos que se representan desde el valor de la columna con su to_representation()
+_CON_CONVERSION = (
+    drf_fields.DateTimeField,
+    drf_fields.DateField,
+    drf_fields.TimeField,
+    drf_fields.DecimalField,
+    drf_fields.FloatField,
+    drf_fields.DurationField,
+    drf_fields.UUIDField,
+)
+
+
+def _lista(request, param) -> list[str]:
+    return [n.strip() for raw in request.query_params.getlist(param) for n in raw.split(",") if n.strip()]
+
+
+def _columna(model, source) -> str | None:
+    """Columna de `source` ("nombre", "estado" -> estado_id, "owner.id" -> owner_id) o None."""
+    partes = source.split(".")
+    try:
+        campo = model._meta.get_field(partes[0])
+    except FieldDoesNotExist:
+        return None
+    if not getattr(campo, "column", None):
+        return None
+    if len(partes) == 1:
+        return campo.attname
+    if len(partes) == 2 and campo.many_to_one and partes[1] in ("id", "pk", campo.target_field.attname):
+        return campo.attname
+    return None
+
+
+def _lector(campo, columna):
+    """row -> representación del campo, o None si el campo no sale de la columna."""
+    if isinstance(campo, _SIN_CONVERSION):
+        return lambda row: row[columna]
+    if isinstance(campo, _CON_CONVERSION):
+        convertir = campo.to_representation
+        return lambda row: None if row[columna] is None else convertir(row[columna])
+    return None
+
+
+def _lector_anidado(fk_columna, lectores):
+    def leer(row):
+        if row[fk_columna] is None:
+            return None
+        return {nombre: lector(row) for nombre, lector in lectores}
+    return leer
+
+
+class _Plan:
+    """Columnas, relaciones y lectores de los campos de un serializer (ya recortado)."""
+
+    def __init__(self, serializer, anotaciones=()):
+        model = serializer.Meta.model
+        self.columnas = {}  # (dict como set ordenado)
+        self.select_related = []
+        self.prefetch_related = []
+        self.lectores = []  # [(nombre, fn(row))]; None si algún campo no sale de .values()
+        self.solo = True  # se puede acotar con .only()
+
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+
+            if campo.source in anotaciones:
+                self.columnas[campo.source] = None
+                self._lector(nombre, _lector(campo, campo.source))
+                continue
+
+            if isinstance(campo, serializers.ListSerializer):
+                self.prefetch_related.append(campo.source)
+                self.lectores = None
+                continue
+
+            if isinstance(campo, serializers.BaseSerializer):
+                self._anidado(model, nombre, campo)
+                continue
+
+            columna = _columna(model, campo.source) if campo.source != "*" else None
+            if columna is None:
+                # Propiedad / método del modelo: hace falta la instancia completa
+                self.solo = False
+                self.lectores = None
+                continue
+            self.columnas[columna] = None
+            if "." in campo.source:
+                # "owner.id": en el camino con instancias, sin una query por fila
+                self.select_related.append(campo.source.split(".")[0])
+            self._lector(nombre, _lector(campo, columna))
+
+    def _lector(self, nombre, lector):
+        if lector is None:
+            self.lectores = None
+        elif self.lectores is not None:
+            self.lectores.append((nombre, lector))
+
+    def _anidado(self, model, nombre, serializer):
+        try:
+            fk = model._meta.get_field(serializer.source)
+        except FieldDoesNotExist:
+            fk = None
+        if fk is None or not fk.many_to_one:
+            self.solo = False
+            self.lectores = None
+            return
+
+        self.select_related.append(fk.name)
+        self.columnas[fk.attname] = None
+        lectores = []
+        for sub_nombre, sub in serializer.fields.items():
+            if sub.write_only:
+                continue
+            columna = _columna(fk.related_model, sub.source) if sub.source != "*" else None
+            if columna is None:
+                self.solo = False
+                self.lectores = None
+                return
+            columna = f"{fk.name}__{columna}"
+            self.columnas[columna] = None
+            lectores.append((sub_nombre, _lector(sub, columna)))
+        if any(lector is None for _, lector in lectores):
+            self.lectores = None
+        else:
+            self._lector(nombre, _lector_anidado(fk.attname, lectores))
+
+    def recortar(self, queryset):
+        """Queryset de instancias con solo lo necesario para serializar estos campos."""
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select_related:
+            queryset = queryset.select_related(*dict.fromkeys(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.solo:
+            # + las claves de orden (la paginación por cursor las lee de la última fila);
+            # las anotaciones vienen siempre
+            campos = {f.name for f in queryset.model._meta.concrete_fields}
+            claves = [name for name, _, _ in ordering_keys(queryset) if name in campos]
+            columnas = [c for c in self.columnas if c not in queryset.query.annotations]
+            queryset = queryset.only(*dict.fromkeys([*columnas, *claves]))
+        return queryset
+
+    def filas(self, queryset):
+        """Queryset de .values() con las columnas de los campos (+ las claves de orden)."""
+        claves = [name for name, _, _ in ordering_keys(queryset)]
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.columnas, *claves]))
+
+    def armar(self, row) -> dict:
+        return {nombre: lector(row) for nombre, lector in self.lectores}
+
+
+class CamposListMixin:
+    """
+    ?fields= / ?expand= para un ModelViewSet (ver el docstring del módulo).
+
+    - campos_expandibles: {"relación": "campo anidado"} para ?expand=.
+    - Los campos cuyo source es una anotación del queryset se leen como columnas.
+    """
+    campos_expandibles = {}
+
+    def campos_pedidos(self, serializer) -> set[str] | None:
+        """Campos pedidos con ?fields= (+ ?expand=), validados; None = todos."""
+        request = self.request
+        expand = _lista(request, "expand")
+        desconocidas = [e for e in expand if e not in self.campos_expandibles]
+        if desconocidas:
+            raise ValidationError({"expand": f"Relaciones desconocidas: {', '.join(desconocidas)}."})
+
+        pedidos = _lista(request, "fields")
+        if not pedidos:
+            return None
+        pedidos += [self.campos_expandibles[e] for e in expand]
+        legibles = {n for n, f in serializer.fields.items() if not f.write_only}
+        desconocidos = [n for n in dict.fromkeys(pedidos) if n not in legibles]
+        if desconocidos:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(desconocidos)}."})
+        return set(pedidos)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request is None or self.request.method != "GET":
+            return serializer  # las escrituras reciben y devuelven el serializer completo
+        base = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+        pedidos = self.campos_pedidos(base)
+        if pedidos is not None:
+            for nombre in [n for n in base.fields if n not in pedidos]:
+                del base.fields[nombre]
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = _Plan(self.get_serializer(), queryset.query.annotations)
+
+        if plan.lectores is None:
+            queryset = plan.recortar(queryset)
+            page = self.paginate_queryset(queryset)
+            data = self.get_serializer(queryset if page is None else page, many=True).data
+        else:
+            filas = plan.filas(queryset)
+            page = self.paginate_queryset(filas)
+            data = [plan.armar(row) for row in (filas if page is None else page)]
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
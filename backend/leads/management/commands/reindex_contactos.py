@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leads.models import Contacto, ContactoToken
+from leads.search import contacto_tokens
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda (ContactoToken) de todos los contactos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None, help="Solo los contactos de este owner (id)")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        qs = Contacto.objects.only("id", "owner_id", "nombre", "apellido", "email", "telefono").order_by("id")
+        tokens_qs = ContactoToken.objects.all()
+        if opts["owner"] is not None:
+            qs = qs.filter(owner_id=opts["owner"])
+            tokens_qs = tokens_qs.filter(owner_id=opts["owner"])
+
+        batch_size = opts["batch_size"]
+        total = 0
+        with transaction.atomic():
+            tokens_qs.delete()
+            batch = []
+            for c in qs.iterator(chunk_size=batch_size):
+                batch.extend(
+                    ContactoToken(contacto_id=c.pk, owner_id=c.owner_id, token=tok)
+                    for tok in contacto_tokens(c)
+                )
+                total += 1
+                if len(batch) >= batch_size:
+                    ContactoToken.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                ContactoToken.objects.bulk_create(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexados {total} contactos."))
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('propiedades', '0003_propiedad_owner_propiedad_vendida_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoLead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fase', models.CharField(max_length=100, unique=True)),
+                ('descripcion', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Contacto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(blank=True, default='', max_length=120)),
+                ('apellido', models.CharField(blank=True, default='', max_length=120)),
+                ('email', models.EmailField(blank=True, default='', max_length=254)),
+                ('telefono', models.CharField(blank=True, default='', max_length=50)),
+                ('last_contact_at', models.DateTimeField(blank=True, null=True)),
+                ('next_contact_at', models.DateTimeField(blank=True, null=True)),
+                ('next_contact_note', models.CharField(blank=True, default='', max_length=255)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contactos', to=settings.AUTH_USER_MODEL)),
+                ('estado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contactos', to='leads.estadolead')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstadoLeadHistorial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('contacto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_estados', to='leads.contacto')),
+                ('estado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='leads.estadolead')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Evento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(blank=True, default='', max_length=120)),
+                ('apellido', models.CharField(blank=True, default='', max_length=120)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('tipo', models.CharField(choices=[('Reunion', 'Reunion'), ('Visita', 'Visita'), ('Llamada', 'Llamada')], max_length=20)),
+                ('fecha_hora', models.DateTimeField()),
+                ('notas', models.TextField(blank=True, default='')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('contacto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos', to='leads.contacto')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to=settings.AUTH_USER_MODEL)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='propiedades.propiedad')),
+            ],
+            options={
+                'ordering': ['-fecha_hora', '-id'],
+            },
+        ),
+    ]
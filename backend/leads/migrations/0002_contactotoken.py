@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_tokens(apps, schema_editor):
+    from leads.search import contacto_tokens
+
+    Contacto = apps.get_model("leads", "Contacto")
+    ContactoToken = apps.get_model("leads", "ContactoToken")
+    batch = []
+    for c in Contacto.objects.only("id", "owner_id", "nombre", "apellido", "email", "telefono").iterator(chunk_size=2000):
+        batch.extend(
+            ContactoToken(contacto_id=c.pk, owner_id=c.owner_id, token=tok)
+            for tok in contacto_tokens(c)
+        )
+        if len(batch) >= 5000:
+            ContactoToken.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ContactoToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactoToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('contacto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='leads.contacto')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'token'], name='leads_conta_owner_i_e58e2f_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_tokens, migrations.RunPython.noop),
+    ]
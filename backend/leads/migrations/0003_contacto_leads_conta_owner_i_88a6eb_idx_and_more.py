@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0002_contactotoken'),
+        ('propiedades', '0003_propiedad_owner_propiedad_vendida_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['owner', 'next_contact_at'], name='leads_conta_owner_i_88a6eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['owner', 'last_contact_at'], name='leads_conta_owner_i_a0f798_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['owner', 'estado'], name='leads_conta_owner_i_1a8397_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['owner', 'fecha_hora', 'id'], name='leads_event_owner_i_8e0340_idx'),
+        ),
+    ]
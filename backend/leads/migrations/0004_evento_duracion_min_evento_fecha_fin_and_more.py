@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:34
+
+import django.core.validators
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def calcular_fecha_fin(apps, schema_editor):
+    # Todos los eventos existentes tenían la duración fija de 60 minutos
+    Evento = apps.get_model("leads", "Evento")
+    Evento.objects.update(fecha_fin=models.F("fecha_hora") + timedelta(minutes=60))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0003_contacto_leads_conta_owner_i_88a6eb_idx_and_more'),
+        ('propiedades', '0003_propiedad_owner_propiedad_vendida_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='duracion_min',
+            field=models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(1440)]),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='fecha_fin',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_fecha_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='evento',
+            name='fecha_fin',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['propiedad', 'fecha_hora', 'fecha_fin'], name='leads_event_propied_205e39_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_evento_duracion_min_evento_fecha_fin_and_more'),
+        ('propiedades', '0004_propiedad_actualizado_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contacto',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['owner', 'actualizado_en', 'id'], name='leads_conta_owner_i_9acf62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['owner', 'actualizado_en', 'id'], name='leads_event_owner_i_d67cea_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from crminm.modelos import ValoresCargadosMixin
 from propiedades.models import Propiedad
 from avisos.models import Aviso
 
@@ -16,7 +20,7 @@ class EstadoLead(models.Model):
         return self.fase
 
 
-class Contacto(models.Model):
+class Contacto(ValoresCargadosMixin, models.Model):
     # === Multi-tenant ===
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -44,11 +48,33 @@ class Contacto(models.Model):
 
     # ✅ timestamp de creación real del lead
     creado_en = models.DateTimeField(auto_now_add=True)
+    # ✅ última modificación (cursor de /api/exportacion/sync/)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Índices por tenant: todo listado filtra owner y después filtra/ordena por estos
+        indexes = [
+            models.Index(fields=["owner", "actualizado_en", "id"]),  # sync incremental
+            models.Index(fields=["owner", "next_contact_at"]),  # buckets de vencimiento / avisos
+            models.Index(fields=["owner", "last_contact_at"]),  # sin seguimiento
+            models.Index(fields=["owner", "estado"]),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}".strip()
 
+    # --- Seguimiento de cambios en memoria: ver ValoresCargadosMixin ---
+    def save(self, *args, **kwargs):
+        # auto_now solo se guarda si está en update_fields: también en los saves parciales
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "actualizado_en"}
+        super().save(*args, **kwargs)
+        # Los derivados anotados por la query (leads/seguimiento.py) pueden haber cambiado
+        for name in _DERIVADOS_SEGUIMIENTO:
+            self.__dict__.pop(name, None)
+
     # --- Helpers de estado derivado (opcionales, útiles para serializers/plantillas) ---
+    # Si la query los anotó (leads.seguimiento.anotar_seguimiento) se usa el valor de la DB.
     @property
     def proximo_contacto_estado(self) -> str:
         """
@@ -58,32 +84,62 @@ class Contacto(models.Model):
           - 'Vence hoy' si es hoy
           - 'Próximo en N días' si es futuro
         """
-        now = timezone.localtime()
-        if not self.next_contact_at:
-            return "Pendiente / Por definir"
-
-        # Normalizamos a fechas (sin hora) solo para el label
-        hoy = now.date()
-        fecha = timezone.localtime(self.next_contact_at).date()
+        if "proximo_contacto_estado" in self.__dict__:
+            return self.__dict__["proximo_contacto_estado"]
+        return proximo_contacto_label(self.next_contact_at)
 
-        if fecha < hoy:
-            return "Vencido"
-        if fecha == hoy:
-            return "Vence hoy"
-        delta = (fecha - hoy).days
-        return f"Próximo en {delta} día{'s' if delta != 1 else ''}"
+    @proximo_contacto_estado.setter
+    def proximo_contacto_estado(self, value):
+        self.__dict__["proximo_contacto_estado"] = value
 
     @property
     def dias_sin_seguimiento(self) -> int | None:
         """
         Retorna días transcurridos desde el último contacto (int) o None si nunca hubo.
         """
-        if not self.last_contact_at:
-            return None
-        now = timezone.localtime()
-        return (now.date() - timezone.localtime(self.last_contact_at).date()).days
+        if "dias_sin_seguimiento" in self.__dict__:
+            return self.__dict__["dias_sin_seguimiento"]
+        return dias_desde(self.last_contact_at)
+
+    @dias_sin_seguimiento.setter
+    def dias_sin_seguimiento(self, value):
+        self.__dict__["dias_sin_seguimiento"] = value
+
+
+# Properties de Contacto que una query puede traer anotadas
+_DERIVADOS_SEGUIMIENTO = ("proximo_contacto_estado", "dias_sin_seguimiento")
+
+
+# --- Versiones sueltas de los derivados (para caminos que trabajan con values()) ---
+def proximo_contacto_label(next_contact_at, hoy=None) -> str:
+    """Label de `Contacto.proximo_contacto_estado`; `hoy` permite calcular la fecha una sola vez."""
+    if not next_contact_at:
+        return "Pendiente / Por definir"
+
+    # Normalizamos a fechas (sin hora) solo para el label
+    hoy = hoy or timezone.localtime().date()
+    fecha = timezone.localtime(next_contact_at).date()
+
+    if fecha < hoy:
+        return "Vencido"
+    if fecha == hoy:
+        return "Vence hoy"
+    delta = (fecha - hoy).days
+    return f"Próximo en {delta} día{'s' if delta != 1 else ''}"
 
 
+def dias_desde(last_contact_at, hoy=None) -> int | None:
+    """Días de `Contacto.dias_sin_seguimiento`; `hoy` permite calcular la fecha una sola vez."""
+    if not last_contact_at:
+        return None
+    hoy = hoy or timezone.localtime().date()
+    return (hoy - timezone.localtime(last_contact_at).date()).days
+
+
+# Duración de eventos (minutos). El máximo acota la búsqueda de solapamientos.
+DEFAULT_EVENT_DURATION_MIN = 60
+MAX_EVENT_DURATION_MIN = 24 * 60
+
 TIPO_EVENTO_CHOICES = [
     ("Reunion", "Reunion"),
     ("Visita", "Visita"),
@@ -91,7 +147,7 @@ TIPO_EVENTO_CHOICES = [
 ]
 
 
-class Evento(models.Model):
+class Evento(ValoresCargadosMixin, models.Model):
     # === Multi-tenant ===
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -110,15 +166,113 @@ class Evento(models.Model):
     propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name="eventos")
     tipo = models.CharField(max_length=20, choices=TIPO_EVENTO_CHOICES)
     fecha_hora = models.DateTimeField()
+    # ✅ duración propia + fin persistido (fecha_hora + duracion_min), lo calcula save()
+    duracion_min = models.PositiveIntegerField(
+        default=DEFAULT_EVENT_DURATION_MIN,
+        validators=[MinValueValidator(1), MaxValueValidator(MAX_EVENT_DURATION_MIN)],
+    )
+    fecha_fin = models.DateTimeField(editable=False)
     notas = models.TextField(blank=True, default="")
     creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)  # cursor de /api/exportacion/sync/
 
     class Meta:
         ordering = ["-fecha_hora", "-id"]
+        indexes = [
+            models.Index(fields=["owner", "actualizado_en", "id"]),  # sync incremental
+            models.Index(fields=["owner", "fecha_hora", "id"]),  # agenda por tenant
+            models.Index(fields=["propiedad", "fecha_hora", "fecha_fin"]),  # solapamientos
+        ]
 
     def __str__(self):
         return f"{self.tipo} {self.fecha_hora:%Y-%m-%d %H:%M}"
 
+    def calcular_fecha_fin(self):
+        if self.fecha_hora:
+            self.fecha_fin = self.fecha_hora + timedelta(minutes=self.duracion_min or DEFAULT_EVENT_DURATION_MIN)
+        return self.fecha_fin
+
+    def save(self, *args, **kwargs):
+        self.calcular_fecha_fin()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and ({"fecha_hora", "duracion_min"} & set(update_fields)):
+            kwargs["update_fields"] = {*update_fields, "fecha_fin"}
+        if update_fields:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "actualizado_en"}
+        super().save(*args, **kwargs)
+
+
+def eventos_solapados(propiedad, inicio, duracion_min=DEFAULT_EVENT_DURATION_MIN, ignore_id=None):
+    """
+    Eventos de la propiedad que se pisan con [inicio, inicio + duracion_min).
+
+    Rango sargable sobre el índice (propiedad, fecha_hora, fecha_fin): como ningún evento
+    dura más de MAX_EVENT_DURATION_MIN, solo puede solapar uno que empiece en
+    (inicio - MAX, fin); fecha_fin > inicio termina de filtrar sobre el mismo índice.
+    """
+    fin = inicio + timedelta(minutes=duracion_min or DEFAULT_EVENT_DURATION_MIN)
+    qs = Evento.objects.filter(
+        propiedad=propiedad,
+        fecha_hora__gt=inicio - timedelta(minutes=MAX_EVENT_DURATION_MIN),
+        fecha_hora__lt=fin,
+        fecha_fin__gt=inicio,
+    )
+    if ignore_id:
+        qs = qs.exclude(id=ignore_id)
+    return qs
+
+
+def bloquear_agenda(propiedad):
+    """
+    Toma un lock de fila (SELECT ... FOR UPDATE) sobre la propiedad hasta el fin de la
+    transacción: dos reservas de la MISMA propiedad se serializan (la segunda ve el evento
+    de la primera al re-chequear solapamientos); propiedades distintas no se bloquean entre sí.
+    Debe llamarse dentro de transaction.atomic().
+    """
+    list(Propiedad.objects.select_for_update().filter(pk=propiedad.pk).values_list("pk", flat=True))
+
+
+def conflicto_de_agenda(propiedad, inicio, duracion_min=DEFAULT_EVENT_DURATION_MIN, ignore_id=None) -> str | None:
+    """
+    Mensaje de error si el horario choca con otro evento de la propiedad (o None).
+    Una sola query: trae los inicios que solapan y distingue duplicado exacto de solapamiento.
+    """
+    inicios = list(
+        eventos_solapados(propiedad, inicio, duracion_min, ignore_id)
+        .order_by("fecha_hora")
+        .values_list("fecha_hora", flat=True)[:20]
+    )
+    if not inicios:
+        return None
+    if inicio in inicios:
+        return "Ya existe un evento exactamente en esa fecha y hora para la misma propiedad."
+    return (
+        "El horario solapa con otro evento en la misma propiedad "
+        f"(desde {timezone.localtime(inicios[0]).isoformat()})."
+    )
+
+
+# ✅ índice de búsqueda (tokens normalizados por contacto, ver leads/search.py)
+class ContactoToken(models.Model):
+    # owner desnormalizado para que el índice (owner, token) sirva a cada tenant
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    contacto = models.ForeignKey(Contacto, on_delete=models.CASCADE, related_name="tokens")
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "token"]),
+        ]
+
+    def __str__(self):
+        return f"{self.contacto_id}: {self.token}"
+
 
 # ✅ historial de cambios de estado
 class EstadoLeadHistorial(models.Model):
@@ -200,12 +354,6 @@ def sync_contacto_and_aviso_from_evento(sender, instance: Evento, created: bool,
         }
     )
 
-@receiver(post_delete, sender=Evento)
-def delete_aviso_on_evento_delete(sender, instance, **kwargs):
-    """
-    Elimina el aviso asociado cuando se elimina el evento.
-    """
-    try:
-        Aviso.objects.get(evento=instance).delete()
-    except Aviso.DoesNotExist:
-        pass
\ No newline at end of file
+# El aviso de un evento borrado lo elimina el CASCADE de Aviso.evento (con sus signals).
+# Borrarlo de nuevo acá en post_delete disparaba las signals de Aviso dos veces para la
+# misma fila (contadores del dashboard descontados dos veces, dos eventos SSE).
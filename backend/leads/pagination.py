@@ -1,6 +1,215 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el orden que ya trae el queryset.
+
+    - Sin COUNT(*) ni OFFSET: cada página es un rango "después de la última fila vista",
+      así que la página 5.000 cuesta lo mismo que la 1.
+    - Desempate estable: si el orden no termina en id/pk, se agrega el pk con la
+      misma dirección que el último campo.
+    - NULLs: se toman como el valor más chico (semántica nativa de MySQL/SQLite:
+      primero en ASC, último en DESC), así el ORDER BY sigue siendo el del índice.
+
+    Respuesta: {"next": url | null, "results": [...]}
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        self._model = queryset.model
+        self.keys = ordering_keys(queryset)
+        queryset = queryset.order_by(*order_by_keys(self.keys))
+
+        values = self._decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(after_q(self.keys, values))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        if not isinstance(last, dict):  # instancias o filas de .values()
+            last = {name: getattr(last, name) for name, _, _ in self.keys}
+        values = [self._dump(last[name]) for name, _, _ in self.keys]
+        token = base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                size = int(raw)
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except ValueError:
+                pass
+        return self.page_size
+
+    # ---------- helpers ----------
+    def _decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+            if not isinstance(raw, list) or len(raw) != len(self.keys):
+                raise ValueError
+            values = []
+            for (name, _, _), val in zip(self.keys, raw):
+                values.append(self._load(name, val))
+            return values
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _load(self, name, val):
+        if val is None:
+            return None
+        try:
+            return self._model._meta.get_field(name).to_python(val)
+        except FieldDoesNotExist:
+            return val
+
+    @staticmethod
+    def _dump(val):
+        if val is None or isinstance(val, (int, float, str, bool)):
+            return val
+        if hasattr(val, "isoformat"):
+            return val.isoformat()
+        return str(val)
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Paginación por número de página (comportamiento de siempre) salvo que el request
+    traiga `?cursor=` (vacío = primera página): en ese caso delega en KeysetPagination.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self._keyset = self.keyset_class()
+            return self._keyset.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self._keyset is not None:
+            return self._keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+# ---------- Keyset: helpers compartidos (paginación y exportaciones por chunks) ----------
+def ordering_keys(queryset):
+    """[(campo, desc, nullable), ...] a partir del order_by del queryset (o Meta.ordering)."""
+    model = queryset.model
+    ordering = list(queryset.query.order_by) or list(model._meta.ordering) or ["-pk"]
+    pk_name = model._meta.pk.name
+
+    keys = []
+    for item in ordering:
+        if not isinstance(item, str):
+            continue  # expresiones: no se pueden usar como clave de cursor
+        desc = item.startswith("-")
+        name = item.lstrip("-")
+        if name == "pk":
+            name = pk_name
+        if "__" in name:
+            continue
+        try:
+            nullable = model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            if name not in queryset.query.annotations:
+                continue
+            nullable = True
+        keys.append((name, desc, nullable))
+
+    if not any(name == pk_name for name, _, _ in keys):
+        last_desc = keys[-1][1] if keys else True
+        keys.append((pk_name, last_desc, False))
+    return keys
+
+
+def order_by_keys(keys):
+    return [f"-{name}" if desc else name for name, desc, _ in keys]
+
+
+def after_q(keys, values):
+    """Q lexicográfico: filas estrictamente posteriores a `values` en el orden `keys`."""
+    (name, desc, nullable), val = keys[0], values[0]
+    tail = after_q(keys[1:], values[1:]) if len(keys) > 1 else None
+
+    if val is None:
+        same = Q(**{f"{name}__isnull": True})
+        strict = None if desc else Q(**{f"{name}__isnull": False})
+    else:
+        same = Q(**{name: val})
+        strict = Q(**{f"{name}__{'lt' if desc else 'gt'}": val})
+        if desc and nullable:
+            strict |= Q(**{f"{name}__isnull": True})
+
+    parts = [p for p in (strict, (same & tail) if tail is not None else None) if p is not None]
+    if not parts:
+        return Q(pk__in=[])
+    result = parts[0]
+    for p in parts[1:]:
+        result |= p
+    return result
+
+
+def iter_keyset(queryset, fields, chunk_size=2000):
+    """
+    Recorre `queryset.values(*fields)` en su propio orden, de a `chunk_size` filas, con
+    keyset (sin OFFSET). A diferencia de `.iterator()`, acota la memoria también en MySQL,
+    cuyo driver carga el resultado completo de cada query en el cliente.
+    Sin orden definido se recorre por pk ascendente (el orden natural de la tabla).
+    """
+    if not queryset.ordered:
+        queryset = queryset.order_by("pk")
+    keys = ordering_keys(queryset)
+    key_names = [name for name, _, _ in keys]
+    qs = queryset.order_by(*order_by_keys(keys)).values(*dict.fromkeys([*fields, *key_names]))
+
+    last = None
+    while True:
+        page = qs if last is None else qs.filter(after_q(keys, last))
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = [rows[-1][name] for name in key_names]
@@ -0,0 +1,157 @@
+# leads/search.py
+"""
+Índice de búsqueda para Contacto.
+
+En lugar de OR'ear cuatro `icontains` (que ningún índice puede servir), mantenemos
+una tabla de tokens (`ContactoToken`) por contacto con índice (owner, token).
+La búsqueda `?q=` se resuelve con prefijos escritos como rango (`token >= 'abc' AND
+token < 'abd'`), que el índice sirve tanto en MySQL como en el SQLite local (un
+`LIKE 'abc%'` no: en SQLite LIKE ignora mayúsculas y no usa índices de columnas BINARY).
+
+- Los tokens se regeneran en post_save (ver signals.py) y se borran en cascada.
+- El ranking es la suma por término: 2 si hay token exacto, 1 si solo prefijo.
+- Todos los términos de la búsqueda deben matchear (AND).
+- Solo prefijos de palabra: "uan" NO encuentra "Juan" (el icontains anterior sí). Los
+  teléfonos se indexan también por sufijos de dígitos (ver contacto_tokens).
+"""
+import re
+import unicodedata
+
+from django.db.models import Q, F, Case, When, Value, IntegerField, Max, Subquery, OuterRef
+
+from .models import Contacto, ContactoToken
+
+# Campos del contacto que alimentan el índice
+SEARCH_FIELDS = ("nombre", "apellido", "email", "telefono")
+
+# Teléfonos: indexamos sufijos de los dígitos para poder buscar "por el medio"
+MIN_PHONE_SUFFIX = 4
+TOKEN_MAX_LEN = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Alfabeto de los tokens, en el orden en que los comparan MySQL y SQLite
+_ALFABETO = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas y sin acentos ('Peréz' -> 'perez')."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower()
+
+
+def tokenize(text: str) -> list[str]:
+    """Separa un texto libre en tokens normalizados (sin repetir, en orden)."""
+    seen = []
+    for tok in _TOKEN_RE.findall(_normalize(text)):
+        tok = tok[:TOKEN_MAX_LEN]
+        if tok not in seen:
+            seen.append(tok)
+    return seen
+
+
+def contacto_tokens(contacto: Contacto) -> set[str]:
+    """Tokens a indexar para un contacto."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(getattr(contacto, field, "") or ""))
+
+    # Teléfono: dígitos corridos + sufijos, así "5551234" encuentra "+54 351 555-1234"
+    digits = re.sub(r"\D", "", contacto.telefono or "")
+    if digits:
+        for i in range(0, max(len(digits) - MIN_PHONE_SUFFIX + 1, 1)):
+            tokens.add(digits[i:][:TOKEN_MAX_LEN])
+    return tokens
+
+
+def reindex_contacto(contacto: Contacto):
+    """Reemplaza los tokens del contacto por los actuales."""
+    ContactoToken.objects.filter(contacto_id=contacto.pk).delete()
+    ContactoToken.objects.bulk_create([
+        ContactoToken(contacto_id=contacto.pk, owner_id=contacto.owner_id, token=tok)
+        for tok in sorted(contacto_tokens(contacto))
+    ])
+
+
+def _siguiente_prefijo(prefijo: str) -> str | None:
+    """Menor string mayor que todos los que empiezan con `prefijo` ('abc' -> 'abd', 'az' -> 'b')."""
+    while prefijo:
+        pos = _ALFABETO.find(prefijo[-1])
+        if 0 <= pos < len(_ALFABETO) - 1:
+            return prefijo[:-1] + _ALFABETO[pos + 1]
+        prefijo = prefijo[:-1]
+    return None  # 'zzz': sin cota superior
+
+
+def _prefijo_q(prefijo: str) -> Q:
+    """token empieza con `prefijo`, como rango sobre el índice (owner, token)."""
+    cond = Q(token__gte=prefijo)
+    hasta = _siguiente_prefijo(prefijo)
+    if hasta is not None:
+        cond &= Q(token__lt=hasta)
+    return cond
+
+
+def _legacy_filter(qs, q: str):
+    """Búsqueda original (sin índice) para queries que no producen tokens, ej. '@'."""
+    return qs.filter(
+        Q(nombre__icontains=q)
+        | Q(apellido__icontains=q)
+        | Q(email__icontains=q)
+        | Q(telefono__icontains=q)
+    )
+
+
+def search_contactos(qs, q: str, owner=None):
+    """
+    Filtra `qs` por la búsqueda `q` usando el índice de tokens y anota `search_rank`.
+    El queryset resultante queda ordenado por relevancia (y luego por -id).
+    `owner` acota la tabla de tokens al tenant (None = sin filtro, p. ej. staff).
+    """
+    terms = tokenize(q)
+    if not terms:
+        return _legacy_filter(qs, q)
+
+    tokens = ContactoToken.objects.all()
+    if owner is not None:
+        tokens = tokens.filter(owner=owner)
+
+    # Solo filas que matchean algún término (rango sobre el índice owner+token)
+    prefix_q = Q()
+    for t in terms:
+        prefix_q |= _prefijo_q(t)
+    tokens = tokens.filter(prefix_q)
+
+    # Puntaje por término: 2 exacto, 1 prefijo, 0 sin match
+    scores = {
+        f"s{i}": Max(
+            Case(
+                When(token=t, then=Value(2)),
+                When(_prefijo_q(t), then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        for i, t in enumerate(terms)
+    }
+    rank_expr = sum((F(name) for name in scores), Value(0))
+    hits = (
+        tokens.values("contacto_id")
+        .annotate(**scores)
+        .filter(**{f"{name}__gt": 0 for name in scores})
+    )
+    # El puntaje de cada fila se recalcula sobre sus propios tokens (índice por contacto_id):
+    # correlacionar contra `hits` recorrería el rango entero de tokens por cada fila.
+    rank = (
+        ContactoToken.objects.filter(contacto_id=OuterRef("pk"))
+        .values("contacto_id")
+        .annotate(**scores)
+        .annotate(rank=rank_expr)
+        .values("rank")[:1]
+    )
+
+    return (
+        qs.filter(pk__in=Subquery(hits.values("contacto_id")))
+        .annotate(search_rank=Subquery(rank, output_field=IntegerField()))
+        .order_by("-search_rank", "-id")
+    )
@@ -0,0 +1,91 @@
+# leads/seguimiento.py
+"""
+Derivados de seguimiento de Contacto calculados en la DB (anotaciones del queryset), para
+filtrar, ordenar y contar por ellos sin recorrer filas en Python:
+
+- proximo_contacto_estado: el mismo texto que la property del modelo ("Vencido",
+  "Vence hoy", "Próximo en N días", "Pendiente / Por definir").
+- dias_sin_seguimiento: días desde last_contact_at (NULL si nunca hubo).
+- dias_para_contacto: días hasta next_contact_at (negativo = vencido, 0 = hoy).
+- seguimiento_orden: 0 vencido, 1 vence hoy, 2 próximo, 3 pendiente (orden por urgencia).
+
+Los cortes del día (medianoche local, TIME_ZONE) se calculan una vez en Python y van a
+la query como parámetros: la DB no convierte zonas horarias (MySQL sin tablas de zonas).
+Vencido / hoy / próximo salen de comparar contra esos cortes; los N días, de dividir la
+diferencia por 24 h (con cambio de horario, una fila a menos de una hora de la
+medianoche puede correrse un día).
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import (
+    Case, CharField, Count, DurationField, ExpressionWrapper, F, FloatField, IntegerField, Value, When,
+)
+from django.db.models.functions import Cast, Concat, Floor
+from django.utils import timezone
+
+DIA_US = 24 * 60 * 60 * 10**6
+
+# seguimiento_orden -> clave de contar()
+ORDEN_VENCIDO, ORDEN_HOY, ORDEN_PROXIMO, ORDEN_PENDIENTE = 0, 1, 2, 3
+CLAVES = {
+    ORDEN_VENCIDO: "vencidos",
+    ORDEN_HOY: "vence_hoy",
+    ORDEN_PROXIMO: "proximos",
+    ORDEN_PENDIENTE: "pendientes",
+}
+
+
+def cortes_del_dia(ahora=None) -> tuple[datetime, datetime]:
+    """(inicio de hoy, inicio de mañana) en hora local (aware)."""
+    hoy = timezone.localdate(ahora)
+    return (
+        timezone.make_aware(datetime.combine(hoy, time.min)),
+        timezone.make_aware(datetime.combine(hoy + timedelta(days=1), time.min)),
+    )
+
+
+def _dias(desde, hasta):
+    """floor((hasta - desde) / 24 h) en SQL (NULL si alguno es NULL)."""
+    diferencia = ExpressionWrapper(hasta - desde, output_field=DurationField())  # microsegundos
+    return Cast(Floor(Cast(diferencia, FloatField()) / Value(float(DIA_US))), IntegerField())
+
+
+def anotar_seguimiento(qs, ahora=None):
+    """`qs` de Contacto con proximo_contacto_estado, dias_sin_seguimiento, dias_para_contacto y seguimiento_orden."""
+    inicio_hoy, inicio_manana = cortes_del_dia(ahora)
+    qs = qs.annotate(
+        dias_para_contacto=_dias(Value(inicio_hoy), F("next_contact_at")),
+        # Último instante de hoy: hoy 00:00 => 0 días, ayer 23:59 => 1
+        dias_sin_seguimiento=_dias(F("last_contact_at"), Value(inicio_manana - timedelta(microseconds=1))),
+        seguimiento_orden=Case(
+            When(next_contact_at__isnull=True, then=Value(ORDEN_PENDIENTE)),
+            When(next_contact_at__lt=inicio_hoy, then=Value(ORDEN_VENCIDO)),
+            When(next_contact_at__lt=inicio_manana, then=Value(ORDEN_HOY)),
+            default=Value(ORDEN_PROXIMO),
+            output_field=IntegerField(),
+        ),
+    )
+    return qs.annotate(
+        proximo_contacto_estado=Case(
+            When(seguimiento_orden=ORDEN_PENDIENTE, then=Value("Pendiente / Por definir")),
+            When(seguimiento_orden=ORDEN_VENCIDO, then=Value("Vencido")),
+            When(seguimiento_orden=ORDEN_HOY, then=Value("Vence hoy")),
+            When(dias_para_contacto__lte=1, then=Value("Próximo en 1 día")),
+            default=Concat(Value("Próximo en "), Cast("dias_para_contacto", CharField()), Value(" días")),
+            output_field=CharField(),
+        ),
+    )
+
+
+def contar(qs, ahora=None) -> dict:
+    """{"vencidos", "vence_hoy", "proximos", "pendientes"} de un queryset de Contacto (una query)."""
+    filas = (
+        anotar_seguimiento(qs, ahora)
+        .order_by()
+        .values("seguimiento_orden")
+        .annotate(total=Count("id"))
+    )
+    conteo = dict.fromkeys(CLAVES.values(), 0)
+    for fila in filas:
+        conteo[CLAVES[fila["seguimiento_orden"]]] = fila["total"]
+    return conteo
@@ -1,17 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import F, Value, ExpressionWrapper, DateTimeField
 from django.utils import timezone
-from datetime import timedelta
 
 # Importamos Aviso para gestionar el quick-contact
 from avisos.models import Aviso 
 from .models import EstadoLead, Contacto, Evento, EstadoLeadHistorial
 from propiedades.models import Propiedad
 
-# Duración por defecto de un evento (minutos)
-DEFAULT_EVENT_DURATION_MIN = 60
-
 class EstadoLeadSerializer(serializers.ModelSerializer):
     class Meta:
         model = EstadoLead
@@ -20,7 +15,7 @@ class EstadoLeadSerializer(serializers.ModelSerializer):
 
 class ContactoSerializer(serializers.ModelSerializer):
     # read-only para multi-tenant (id del auth.User dueño)
-    owner = serializers.ReadOnlyField(source="owner.id")
+    owner = serializers.ReadOnlyField(source="owner_id")  # la columna: sin cargar el User por fila
 
     # escribible por id
     estado = serializers.PrimaryKeyRelatedField(
@@ -150,7 +145,7 @@ class EstadoLeadHistorialSerializer(serializers.ModelSerializer):
 
 class EventoSerializer(serializers.ModelSerializer):
     # read-only para multi-tenant
-    owner = serializers.ReadOnlyField(source="owner.id")
+    owner = serializers.ReadOnlyField(source="owner_id")  # la columna: sin cargar el User por fila
 
     contacto = serializers.PrimaryKeyRelatedField(
         queryset=Contacto.objects.all(), allow_null=True, required=False
@@ -169,10 +164,12 @@ class EventoSerializer(serializers.ModelSerializer):
             "propiedad",
             "tipo",
             "fecha_hora",
+            "duracion_min",
+            "fecha_fin",
             "notas",
             "creado_en",
         ]
-        read_only_fields = ["id", "creado_en"]
+        read_only_fields = ["id", "fecha_fin", "creado_en"]
 
     # ----- Filtro de queryset por usuario autenticado (anti cross-tenant) -----
     def __init__(self, *args, **kwargs):
@@ -203,13 +200,12 @@ class EventoSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Propiedad no pertenece al usuario autenticado.")
         return value
 
-    # ----- Validación anti-solapamiento, duplicado y fecha pasada (por propiedad) -----
+    # ----- Validación de fecha pasada -----
     def validate(self, attrs):
         """
-        - Previene eventos en el pasado (fecha_hora < ahora).
-        - Previene duplicados exactos: misma propiedad + misma fecha_hora
-        - Previene solapamiento: intervalo [fecha_hora, fecha_hora + duration) no debe
-          intersectar con otros eventos de la misma propiedad.
+        Previene eventos en el pasado (fecha_hora < ahora).
+        Duplicados / solapamientos se chequean en EventoViewSet.perform_create/perform_update,
+        dentro del lock de la propiedad: acá, fuera del lock, el resultado no garantiza nada.
         """
         fecha_hora = attrs.get("fecha_hora", getattr(self.instance, "fecha_hora", None))
         propiedad = attrs.get("propiedad", getattr(self.instance, "propiedad", None))
@@ -223,33 +219,4 @@ class EventoSerializer(serializers.ModelSerializer):
         if fecha_hora_local < now_local:
             raise serializers.ValidationError("No se puede programar un evento en una fecha/hora pasada.")
 
-        duration_min = DEFAULT_EVENT_DURATION_MIN
-        new_start = fecha_hora_local
-        new_end = new_start + timedelta(minutes=duration_min)
-
-        # Construimos queryset base (mismo propiedad), excluimos si estamos en update
-        base_qs = Evento.objects.filter(propiedad=propiedad)
-        if self.instance and getattr(self.instance, "id", None):
-            base_qs = base_qs.exclude(id=self.instance.id)
-
-        # Duplicado exacto
-        if base_qs.filter(fecha_hora=fecha_hora).exists():
-            raise serializers.ValidationError("Ya existe un evento exactamente en esa fecha y hora para la misma propiedad.")
-
-        # Anotamos existing_end = fecha_hora + duration y chequeamos overlap:
-        existing_end_expr = ExpressionWrapper(
-            F("fecha_hora") + Value(timedelta(minutes=duration_min)),
-            output_field=DateTimeField(),
-        )
-        overlap_qs = base_qs.annotate(existing_end=existing_end_expr).filter(
-            fecha_hora__lt=new_end,
-            existing_end__gt=new_start,
-        )
-
-        if overlap_qs.exists():
-            first = overlap_qs.order_by("fecha_hora").first()
-            raise serializers.ValidationError(
-                f"El horario solapa con otro evento en la misma propiedad (desde {timezone.localtime(first.fecha_hora).isoformat()})."
-            )
-
         return attrs
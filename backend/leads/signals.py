@@ -1,8 +1,12 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Contacto, EstadoLeadHistorial
+from propiedades.models import Propiedad, PropiedadImagen
+
+from . import versiones
+from .models import Contacto, EstadoLead, EstadoLeadHistorial, Evento
+from .search import SEARCH_FIELDS, reindex_contacto
 
 
 # =========================
@@ -10,47 +14,115 @@ from .models import Contacto, EstadoLeadHistorial
 # =========================
 @receiver(pre_save, sender=Contacto, dispatch_uid="leads_contacto_cache_old_estado_v1")
 def _cache_old_estado(sender, instance: Contacto, **kwargs):
-    if instance.pk:
-        try:
-            old = Contacto.objects.only("estado_id").get(pk=instance.pk)
-            instance._old_estado_id = old.estado_id
-        except Contacto.DoesNotExist:
-            instance._old_estado_id = None
-    else:
-        instance._old_estado_id = None
+    """
+    El estado anterior sale de lo que se cargó de la DB (Contacto.from_db), sin query.
+    Solo si la instancia no vino de la DB (p. ej. Contacto(pk=..)) o se cargó sin
+    estado (.only(...)), se lee la fila como antes.
+    """
+    instance._old_estado_id = None
+    if not instance.pk or instance._state.adding or not _saves_estado(kwargs.get("update_fields")):
+        return
+
+    missing = object()
+    old_id = instance.loaded_value("estado_id", missing)
+    if old_id is missing:
+        old_id = Contacto.objects.filter(pk=instance.pk).values_list("estado_id", flat=True).first()
+    instance._old_estado_id = old_id
+
+
+def _saves_estado(update_fields) -> bool:
+    return update_fields is None or bool({"estado", "estado_id"} & set(update_fields))
 
 
 # =========================================
 # Log de historial cuando cambia el estado
 # =========================================
 @receiver(post_save, sender=Contacto, dispatch_uid="leads_contacto_log_estado_change_v2")
-def _log_estado_change(sender, instance: Contacto, created, **kwargs):
+def _log_estado_change(sender, instance: Contacto, created, update_fields=None, raw=False, **kwargs):
     """
     Crea historial SOLO cuando:
       - El contacto se crea con estado, o
-      - El estado efectivamente CAMBIÓ.
-    Además, evita duplicados consecutivos con el mismo estado (p. ej. si la signal
-    se dispara dos veces por autoreload o por dos saves seguidos sin cambio real).
+      - El estado efectivamente CAMBIÓ (comparación en memoria, sin lecturas extra).
     """
-    if not instance.estado_id:
+    if raw or not _saves_estado(update_fields) or not instance.estado_id:
         return
 
-    # Evitar duplicados consecutivos del mismo estado
-    last = (
-        EstadoLeadHistorial.objects
-        .filter(contacto=instance)
-        .only("estado_id", "changed_at")
-        .order_by("-changed_at")
-        .first()
-    )
-    if last and last.estado_id == instance.estado_id:
-        # Ya tenemos registrado este mismo estado como último evento; no repetir
-        return
-
-    if created:
+    if created or getattr(instance, "_old_estado_id", None) != instance.estado_id:
         EstadoLeadHistorial.objects.create(contacto=instance, estado_id=instance.estado_id)
+
+
+# =========================================
+# Índice de búsqueda (?q=) en sync con Contacto
+# =========================================
+@receiver(post_save, sender=Contacto, dispatch_uid="leads_contacto_reindex_busqueda_v1")
+def _reindex_busqueda(sender, instance: Contacto, created, update_fields=None, raw=False, **kwargs):
+    """
+    Regenera los tokens de búsqueda del contacto. Si el save no toca campos indexados
+    (por update_fields o porque no cambiaron desde que se cargó), no hacemos nada.
+    Los borrados se limpian solos (FK con CASCADE).
+    """
+    if raw:
         return
+    if update_fields is not None and not (set(update_fields) & {*SEARCH_FIELDS, "owner"}):
+        return
+    # Si vino de la DB y ningún campo indexado cambió, los tokens siguen valiendo
+    if not created and getattr(instance, "_loaded_values", None):
+        tracked = {*SEARCH_FIELDS, "owner_id"}
+        if tracked <= instance._loaded_values.keys() and not (instance.changed_fields() & tracked):
+            return
+    reindex_contacto(instance)
 
-    old_id = getattr(instance, "_old_estado_id", None)
-    if old_id != instance.estado_id:
-        EstadoLeadHistorial.objects.create(contacto=instance, estado_id=instance.estado_id)
+
+# =========================================
+# Versiones de los listados (ETag, snapshots del dashboard)
+# =========================================
+@receiver(pre_save, sender=Contacto, dispatch_uid="leads_version_contacto_owner_previo_v1")
+def _version_owner_previo(sender, instance: Contacto, **kwargs):
+    missing = object()
+    owner_id = instance.loaded_value("owner_id", missing)
+    instance._version_owner_previo = None if owner_id is missing else owner_id
+
+
+@receiver(post_save, sender=Contacto, dispatch_uid="leads_version_contacto_guardado_v1")
+@receiver(post_delete, sender=Contacto, dispatch_uid="leads_version_contacto_borrado_v1")
+def _version_contacto(sender, instance: Contacto, **kwargs):
+    versiones.incrementar(instance.owner_id, "contactos")
+    previo = getattr(instance, "_version_owner_previo", None)
+    if previo is not None and previo != instance.owner_id:
+        versiones.incrementar(previo, "contactos")
+
+
+@receiver(post_save, sender=Evento, dispatch_uid="leads_version_evento_guardado_v1")
+@receiver(post_delete, sender=Evento, dispatch_uid="leads_version_evento_borrado_v1")
+def _version_evento(sender, instance: Evento, **kwargs):
+    versiones.incrementar(instance.owner_id, "eventos")
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="leads_version_propiedad_guardada_v1")
+@receiver(post_delete, sender=Propiedad, dispatch_uid="leads_version_propiedad_borrada_v1")
+def _version_propiedad(sender, instance: Propiedad, **kwargs):
+    versiones.incrementar(instance.owner_id, "propiedades")
+
+
+@receiver(post_save, sender=PropiedadImagen, dispatch_uid="leads_version_imagen_guardada_v1")
+@receiver(post_delete, sender=PropiedadImagen, dispatch_uid="leads_version_imagen_borrada_v1")
+def _version_imagen(sender, instance: PropiedadImagen, origin=None, **kwargs):
+    # `origin`: lo que se mandó borrar (instancia o queryset)
+    en_cascada = "created" not in kwargs and not (
+        isinstance(origin, PropiedadImagen) or getattr(origin, "model", None) is PropiedadImagen
+    )
+    if en_cascada:
+        return  # se borró la propiedad (o el usuario): su propio post_delete ya versionó
+    propiedad = instance._state.fields_cache.get("propiedad")  # la del serializer/view, si ya se cargó
+    if propiedad is not None:
+        owner_id = propiedad.owner_id
+    else:
+        owner_id = Propiedad.objects.filter(pk=instance.propiedad_id).values_list("owner_id", flat=True).first()
+    versiones.incrementar(owner_id, "propiedades")
+
+
+@receiver(post_save, sender=EstadoLead, dispatch_uid="leads_version_estado_guardado_v1")
+@receiver(post_delete, sender=EstadoLead, dispatch_uid="leads_version_estado_borrado_v1")
+def _version_estado(sender, instance: EstadoLead, **kwargs):
+    # Compartidos entre tenants (y borrar uno deja contactos con estado NULL)
+    versiones.incrementar(versiones.GLOBAL, "estados")
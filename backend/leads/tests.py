@@ -1,3 +1,871 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import DateTimeField, ExpressionWrapper, F, Value
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from avisos.models import Aviso
+from avisos.views import AvisoViewSet
+from propiedades.models import Propiedad, PropiedadImagen
+from propiedades.views import PropiedadViewSet
+
+from . import campos
+from .seguimiento import anotar_seguimiento, cortes_del_dia
+from .models import (
+    DEFAULT_EVENT_DURATION_MIN,
+    Contacto,
+    ContactoToken,
+    EstadoLead,
+    EstadoLeadHistorial,
+    Evento,
+    conflicto_de_agenda,
+    eventos_solapados,
+)
+from .search import _legacy_filter, contacto_tokens, search_contactos
+from .views import ContactoViewSet, EventoViewSet
+
+User = get_user_model()
+
+# Benchmarks (lentos, imprimen tiempos): CRMINM_BENCH=1 python manage.py test leads
+BENCH = bool(os.environ.get("CRMINM_BENCH"))
+
+
+def _ids(response):
+    return [row["id"] for row in response.json()["results"]]
+
+
+def _cronometrar(fn, veces=20) -> float:
+    """Milisegundos promedio de `fn()`."""
+    inicio = time.perf_counter()
+    for _ in range(veces):
+        fn()
+    return (time.perf_counter() - inicio) * 1000 / veces
+
+
+# === Búsqueda ?q= (leads/search.py) ===
+class BusquedaContactosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.otro = User.objects.create_user("otro", "otro@x.com", "x")
+        cls.juan = Contacto.objects.create(
+            owner=cls.user, nombre="Juan", apellido="Pérez", email="juan.perez@gmail.com", telefono="+54 351 555-1234"
+        )
+        cls.juana = Contacto.objects.create(owner=cls.user, nombre="Juana", apellido="Gómez", email="jg@x.com")
+        cls.ajeno = Contacto.objects.create(owner=cls.otro, nombre="Juan", apellido="Ajeno")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def buscar(self, q):
+        return _ids(self.client.get("/api/contactos/", {"q": q}))
+
+    def test_prefijo_y_relevancia(self):
+        # token exacto antes que prefijo; nunca contactos de otro owner
+        self.assertEqual(self.buscar("juan"), [self.juan.id, self.juana.id])
+        self.assertEqual(self.buscar("ju"), [self.juana.id, self.juan.id])  # empate: -id
+
+    def test_todos_los_terminos(self):
+        self.assertEqual(self.buscar("juan perez"), [self.juan.id])
+        self.assertEqual(self.buscar("PEREZ Juan"), [self.juan.id])  # sin acentos ni mayúsculas
+        self.assertEqual(self.buscar("gómez"), [self.juana.id])
+        self.assertEqual(self.buscar("juan zzz"), [])
+
+    def test_telefono_por_sufijo(self):
+        self.assertEqual(self.buscar("5551234"), [self.juan.id])
+        self.assertEqual(self.buscar("1234"), [self.juan.id])
+
+    def test_subcadena_dentro_de_palabra_no_matchea(self):
+        # Cambio de comportamiento respecto del icontains: solo prefijos de palabra
+        self.assertEqual(self.buscar("uan"), [])
+        self.assertEqual(self.buscar("erez"), [])
+        qs = Contacto.objects.filter(owner=self.user)
+        self.assertEqual(_legacy_filter(qs, "uan").count(), 2)
+
+    def test_sin_tokens_usa_icontains(self):
+        self.assertEqual(sorted(self.buscar("@")), sorted([self.juan.id, self.juana.id]))
+
+    def test_indice_sigue_a_save_y_delete(self):
+        self.juan.nombre = "Pedro"
+        self.juan.email = "pedro@x.com"
+        self.juan.save()
+        self.assertEqual(self.buscar("juan"), [self.juana.id])
+        self.assertEqual(self.buscar("pedro"), [self.juan.id])
+        self.juana.delete()
+        self.assertFalse(ContactoToken.objects.filter(contacto_id=self.juana.id).exists())
+
+    def test_mismos_resultados_que_icontains_por_palabra(self):
+        qs = Contacto.objects.filter(owner=self.user)
+        for q in ("juan", "perez", "jg", "gmail", "555"):
+            with self.subTest(q=q):
+                self.assertEqual(
+                    set(search_contactos(qs, q, owner=self.user).values_list("id", flat=True)),
+                    set(_legacy_filter(qs, q).values_list("id", flat=True)),
+                )
+
+    def test_plan_usa_indice_owner_token(self):
+        indice = ContactoToken._meta.indexes[0].name
+        qs = search_contactos(Contacto.objects.filter(owner=self.user), "juan", owner=self.user)
+        self.assertIn(indice, qs.explain())
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class BusquedaContactosBenchmark(TestCase):
+    """Índice de tokens vs los cuatro icontains, con CRMINM_BENCH_N contactos (100k) por owner."""
+
+    def test_tokens_vs_icontains(self):
+        n = int(os.environ.get("CRMINM_BENCH_N", 100_000))
+        user = User.objects.create_user("bench")
+        Contacto.objects.bulk_create(
+            Contacto(owner=user, nombre=f"nombre{i}", apellido=f"apellido{i % 997}", email=f"c{i}@mail{i % 50}.com")
+            for i in range(n)
+        )
+        ContactoToken.objects.bulk_create(
+            (
+                ContactoToken(contacto_id=c.pk, owner_id=user.pk, token=tok)
+                for c in Contacto.objects.filter(owner=user).iterator(chunk_size=5000)
+                for tok in contacto_tokens(c)
+            ),
+            batch_size=5000,
+        )
+        qs = Contacto.objects.filter(owner=user)
+        # selectivo (pocas filas) / ~1% de las filas / ~2%
+        for q in ("nombre12345", "apellido42", "mail7"):
+            tokens = _cronometrar(lambda: list(search_contactos(qs, q, owner=user)[:20]))
+            icontains = _cronometrar(lambda: list(_legacy_filter(qs, q).order_by("-id")[:20]))
+            print(f"\n{n} contactos, q={q!r}: tokens {tokens:.1f} ms, icontains {icontains:.1f} ms")
+            if q == "nombre12345":
+                self.assertLess(tokens, icontains)
+
+
+# === Paginación por cursor (leads/pagination.py) ===
+def _cursor(*values) -> str:
+    """Cursor de KeysetPagination posicionado después de una fila con estas claves."""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode("utf-8")).decode("ascii")
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        ahora = timezone.now()
+        for i in range(23):
+            # varios NULL y empates en next_contact_at: el pk desempata
+            proximo = None if i % 4 == 0 else ahora + timedelta(days=i % 5)
+            Contacto.objects.create(owner=cls.user, nombre=f"n{i}", next_contact_at=proximo)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def recorrer(self, **params):
+        """ids de todas las páginas siguiendo `next`, y las queries de cada página."""
+        ids, queries = [], []
+        url, params = "/api/contactos/", {"cursor": "", "page_size": 5, **params}
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url, params).json()
+            queries.append([q["sql"] for q in ctx.captured_queries])
+            ids += [row["id"] for row in data["results"]]
+            url, params = data["next"], None
+        return ids, queries
+
+    def test_recorre_cada_orden_sin_huecos_ni_repetidos(self):
+        for ordering, orden in (
+            ("-id", ["-id"]),
+            ("next_contact_at", ["next_contact_at", "id"]),
+            ("-next_contact_at", ["-next_contact_at", "-id"]),
+            ("-creado_en", ["-creado_en", "-id"]),
+        ):
+            with self.subTest(ordering=ordering):
+                ids, _ = self.recorrer(ordering=ordering)
+                esperado = list(Contacto.objects.order_by(*orden).values_list("id", flat=True))
+                self.assertEqual(ids, esperado)
+
+    def test_sin_count_ni_offset(self):
+        _, queries = self.recorrer()
+        self.assertEqual(len(queries), 5)
+        self.assertEqual(len({len(page) for page in queries}), 1)  # mismas queries en cada página
+        for sql in (s for page in queries for s in page):
+            self.assertNotIn("COUNT(", sql.upper())
+            self.assertNotIn("OFFSET", sql.upper())
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get("/api/contactos/", {"cursor": "basura"}).status_code, 404)
+
+    def test_sin_cursor_paginacion_de_siempre(self):
+        data = self.client.get("/api/contactos/").json()
+        self.assertEqual(data["count"], 23)
+        self.assertIn("previous", data)
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class KeysetPaginationBenchmark(TestCase):
+    """Página 1 vs página 5.000 (20 por página) con cursor y con ?page= (COUNT + OFFSET)."""
+
+    def test_pagina_profunda(self):
+        paginas = 5_000
+        user = User.objects.create_user("bench")
+        Contacto.objects.bulk_create(Contacto(owner=user, nombre=f"n{i}") for i in range(paginas * 20))
+        client = APIClient()
+        client.force_authenticate(user)
+        # última fila de la página 4.999 en el orden por defecto (-id)
+        ultimo = Contacto.objects.order_by("-id").values_list("id", flat=True)[(paginas - 1) * 20 - 1]
+
+        def pedir(params):
+            response = client.get("/api/contactos/", params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), 20)
+
+        cursor_1 = _cronometrar(lambda: pedir({"cursor": ""}))
+        cursor_n = _cronometrar(lambda: pedir({"cursor": _cursor(ultimo)}))
+        offset_1 = _cronometrar(lambda: pedir({"page": 1}))
+        offset_n = _cronometrar(lambda: pedir({"page": paginas}))
+        print(
+            f"\ncursor: página 1 {cursor_1:.1f} ms, página {paginas} {cursor_n:.1f} ms"
+            f"\n?page=: página 1 {offset_1:.1f} ms, página {paginas} {offset_n:.1f} ms"
+        )
+        self.assertLess(cursor_n, cursor_1 * 2)
+
+
+# === Índices por tenant (leads/migrations/0003) ===
+def _indice(model, *fields) -> str:
+    return next(i.name for i in model._meta.indexes if tuple(i.fields) == fields)
+
+
+class IndicesPorTenantTests(TestCase):
+    """El plan de cada filtro de los listados usa el índice compuesto (owner, ...)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        otro = User.objects.create_user("otro", "otro@x.com", "x")
+        ahora = timezone.now()
+        Contacto.objects.bulk_create(
+            Contacto(
+                owner=owner,
+                nombre=f"n{i}",
+                next_contact_at=None if i % 5 == 0 else ahora + timedelta(days=i % 11 - 5),
+                last_contact_at=None if i % 3 == 0 else ahora - timedelta(days=i % 17),
+            )
+            for owner in (cls.user, otro)
+            for i in range(200)
+        )
+
+    def plan(self, viewset, **params):
+        request = Request(APIRequestFactory().get("/", params))
+        request.user = self.user
+        return viewset(request=request, format_kwarg=None, action="list").get_queryset().explain()
+
+    def test_vencimiento_usa_owner_next_contact_at(self):
+        indice = _indice(Contacto, "owner", "next_contact_at")
+        for vencimiento in ("pendiente", "vencido", "hoy", "proximo"):
+            with self.subTest(vencimiento=vencimiento):
+                self.assertIn(indice, self.plan(ContactoViewSet, vencimiento=vencimiento))
+
+    def test_orden_por_last_contact_at_usa_owner_last_contact_at(self):
+        # sin seguimiento: el índice da el orden (sin ordenar en memoria)
+        plan = self.plan(ContactoViewSet, ordering="last_contact_at")
+        self.assertIn(_indice(Contacto, "owner", "last_contact_at"), plan)
+
+    def test_estado_usa_owner_estado(self):
+        self.assertIn(_indice(Contacto, "owner", "estado"), self.plan(ContactoViewSet, estado=1))
+
+    def test_agenda_usa_owner_fecha_hora(self):
+        plan = self.plan(EventoViewSet, **{"from": "2026-01-01", "to": "2026-01-31"})
+        self.assertIn(_indice(Evento, "owner", "fecha_hora", "id"), plan)
+
+
+# === /api/contactos/avisos/ ===
+class AvisosContactosQueriesTests(TestCase):
+    """Conteos en una query y items en otra (+ la preferencia del usuario si no viene por parámetro)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sembrar(self, n):
+        ahora = timezone.now()
+        for dias in (None, -3, 0, 2, 30):  # pendiente, vencido, hoy, próximo, fuera de rango
+            Contacto.objects.bulk_create(
+                Contacto(
+                    owner=self.user,
+                    next_contact_at=None if dias is None else ahora + timedelta(days=dias),
+                    last_contact_at=None if i % 2 else ahora - timedelta(days=10),
+                )
+                for i in range(n)
+            )
+
+    def test_queries_constantes(self):
+        for n in (2, 8):
+            self.sembrar(n)
+            with self.subTest(n=n), self.assertNumQueries(3):
+                data = self.client.get("/api/contactos/avisos/").json()
+            self.assertEqual(data["vencidos"]["count"], Contacto.objects.filter(
+                next_contact_at__lt=timezone.now() - timedelta(days=1)).count())
+            with self.subTest(n=n), self.assertNumQueries(2):
+                self.client.get("/api/contactos/avisos/", {"recordame_cada": 5})
+
+
+# === Seguimiento de cambios de Contacto en memoria (Contacto.from_db) ===
+class ContactoSaveQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.nuevo = EstadoLead.objects.create(fase="Nuevo")
+        cls.contactado = EstadoLead.objects.create(fase="Contactado")
+        cls.id = Contacto.objects.create(owner=cls.user, nombre="Juan", estado=cls.nuevo).id
+
+    def setUp(self):
+        self.contacto = Contacto.objects.get(pk=self.id)
+
+    def test_update_sin_cambio_de_estado_es_un_solo_update(self):
+        self.contacto.next_contact_note = "llamar"
+        with self.assertNumQueries(1):
+            self.contacto.save()
+
+    def test_cambio_de_estado_sin_lecturas(self):
+        self.contacto.estado = self.contactado
+        with CaptureQueriesContext(connection) as ctx:
+            self.contacto.save()
+        lecturas = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and ("leads_contacto" in q["sql"] or "leads_estadoleadhistorial" in q["sql"])
+        ]
+        self.assertEqual(lecturas, [])
+        self.assertEqual(
+            list(EstadoLeadHistorial.objects.filter(contacto_id=self.id).order_by("id").values_list("estado_id", flat=True)),
+            [self.nuevo.id, self.contactado.id],
+        )
+
+        # mismo estado otra vez: ni historial ni queries extra
+        with self.assertNumQueries(1):
+            self.contacto.save()
+        self.assertEqual(EstadoLeadHistorial.objects.filter(contacto_id=self.id).count(), 2)
+
+
+# === Listados desde .values() (leads/campos.py) ===
+# (viewset, url, params, sale de .values()): sin ?fields= y recortados, con y sin cursor
+LISTADOS = [
+    (ContactoViewSet, "/api/contactos/", {}, True),
+    (ContactoViewSet, "/api/contactos/", {"cursor": "", "page_size": 7}, True),
+    (ContactoViewSet, "/api/contactos/", {"fields": "id,nombre,email,proximo_contacto_estado,dias_sin_seguimiento"}, True),
+    (ContactoViewSet, "/api/contactos/", {"fields": "id,nombre", "expand": "estado", "ordering": "next_contact_at"}, True),
+    (EventoViewSet, "/api/eventos/", {}, True),
+    (EventoViewSet, "/api/eventos/", {"fields": "id,fecha_hora,fecha_fin,contacto"}, True),
+    (PropiedadViewSet, "/api/propiedades/", {}, False),  # imagenes: serializer
+    (PropiedadViewSet, "/api/propiedades/", {"fields": "id,codigo,titulo,precio,estado", "cursor": ""}, True),
+    (AvisoViewSet, "/api/avisos/", {}, True),
+    (AvisoViewSet, "/api/avisos/", {"fields": "id,titulo,fecha", "expand": "lead"}, True),
+]
+
+
+def _camino_serializer():
+    """Parchea _Plan para que el listado vaya por el serializer con instancias completas (lo de antes)."""
+    original = campos._Plan.__init__
+
+    def init(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        self.lectores = None
+        self.solo = False
+
+    return mock.patch.object(campos._Plan, "__init__", init)
+
+
+def _sembrar_listados(user, n):
+    """n contactos / propiedades / eventos / avisos con nulos y fechas variadas."""
+    estados = [EstadoLead.objects.create(fase=f) for f in ("Nuevo", "Contactado")]
+    ahora = timezone.now()
+    props = Propiedad.objects.bulk_create(
+        Propiedad(owner=user, codigo=f"L{user.pk}-{i}", titulo=f"Casa {i}", ubicacion="Centro",
+                  disponibilidad="venta", precio=1000 + i, superficie=10 + i % 7)
+        for i in range(n)
+    )
+    contactos = Contacto.objects.bulk_create(
+        Contacto(
+            owner=user, nombre=f"n{i}", email=f"c{i}@x.com",
+            estado=estados[i % 3] if i % 3 < 2 else None,
+            next_contact_at=None if i % 5 == 0 else ahora + timedelta(days=i % 7 - 3, hours=i % 24),
+            last_contact_at=None if i % 4 == 0 else ahora - timedelta(days=i % 9),
+        )
+        for i in range(n)
+    )
+    eventos = Evento.objects.bulk_create(
+        Evento(
+            owner=user, propiedad=props[i], contacto=contactos[i] if i % 4 else None, tipo="Visita",
+            fecha_hora=ahora + timedelta(days=1, minutes=90 * i), fecha_fin=ahora + timedelta(days=1, minutes=90 * i + 60),
+        )
+        for i in range(n)
+    )
+    Aviso.objects.bulk_create(
+        Aviso(titulo=f"a{i}", fecha=ahora + timedelta(hours=i), lead=contactos[i],
+              propiedad=props[i] if i % 3 else None, evento=eventos[i] if i % 2 else None)
+        for i in range(n)
+    )
+
+
+class ListadosValuesTests(TestCase):
+    """La respuesta armada desde .values() es la misma que la del serializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        _sembrar_listados(cls.user, 30)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_igual_que_el_serializer(self):
+        for _, url, params, por_values in LISTADOS:
+            with self.subTest(url=url, **params):
+                with mock.patch.object(campos._Plan, "armar", autospec=True, side_effect=campos._Plan.armar) as armar:
+                    values = self.client.get(url, params)
+                self.assertEqual(values.status_code, 200)
+                self.assertEqual(armar.called, por_values)
+                with _camino_serializer():
+                    serializer = self.client.get(url, params)
+                self.assertEqual(values.json(), serializer.json())
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class ListadosValuesBenchmark(TestCase):
+    """Filas/s de cada listado (páginas de 100), .values() vs serializer, con CRMINM_BENCH_N filas."""
+
+    def test_filas_por_segundo(self):
+        n = int(os.environ.get("CRMINM_BENCH_N", 100_000))
+        user = User.objects.create_user("bench")
+        _sembrar_listados(user, n)
+        factory = APIRequestFactory()
+
+        def filas_por_segundo(viewset, url, params, veces=20):
+            view = viewset.as_view({"get": "list"})
+            request = factory.get(url, {"cursor": "", "page_size": 100, **params})
+            force_authenticate(request, user)
+            inicio, filas = time.perf_counter(), 0
+            for _ in range(veces):
+                response = view(request)
+                response.render()
+                filas += len(response.data["results"])
+            return filas / (time.perf_counter() - inicio)
+
+        for viewset, url, params, por_values in LISTADOS:
+            if "cursor" in params or not por_values:
+                continue
+            values = filas_por_segundo(viewset, url, params)
+            with _camino_serializer():
+                serializer = filas_por_segundo(viewset, url, params)
+            print(f"\n{url} {params}: values {values:.0f} filas/s, serializer {serializer:.0f} filas/s "
+                  f"(x{values / serializer:.1f})")
+            if viewset is ContactoViewSet and not params:
+                # avisos pagina por número (COUNT + 20 filas): ahí manda la query, no el armado
+                self.assertGreater(values, serializer)
+
+
+# === Presupuesto de queries por endpoint (sin N+1) ===
+class PresupuestoQueriesMixin:
+    """
+    Cada endpoint hace las mismas queries con pocas filas que con más: un N+1 suma una por
+    fila. Se siembran `tamanios[0]` filas de cada recurso, se cuentan las queries de cada URL,
+    se siembran `tamanios[1]` más y cada URL tiene que hacer exactamente esas queries.
+
+    - urls: listados y detalles; los detalles llevan {contacto}, {evento}, {propiedad},
+      {aviso} o {estado}: la última fila sembrada, que tiene tantas imágenes / cambios de
+      estado como filas tiene la tanda.
+    - Se mide como owner, como staff (salvo medir_staff = False) y con los listados
+      forzados al camino del serializer.
+    """
+    urls = ()
+    tamanios = (3, 9)
+    medir_staff = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.staff = User.objects.create_user("staff", "staff@x.com", "x", is_staff=True)
+        cls.estados = [EstadoLead.objects.create(fase=f) for f in ("Nuevo", "Contactado")]
+
+    def sembrar(self, n) -> dict:
+        inicio = Propiedad.objects.count()
+        manana = timezone.now() + timedelta(days=1)
+        for i in range(inicio, inicio + n):
+            propiedad = _propiedad(self.user, f"Q{i}")
+            PropiedadImagen.objects.bulk_create(
+                PropiedadImagen(propiedad=propiedad, imagen=f"propiedades/{i}-{k}.jpg") for k in range(n)
+            )
+            contacto = Contacto.objects.create(owner=self.user, nombre=f"n{i}", email=f"c{i}@x.com", estado=self.estados[0])
+            for k in range(n):  # historial de estados
+                contacto.estado = self.estados[(k + 1) % 2]
+                contacto.save()
+            evento = Evento.objects.create(
+                owner=self.user, propiedad=propiedad, contacto=contacto, tipo="Visita",
+                fecha_hora=manana + timedelta(minutes=90 * i),
+            )
+        return {
+            "contacto": contacto.id, "evento": evento.id, "propiedad": propiedad.id,
+            "aviso": Aviso.objects.get(evento=evento).id, "estado": self.estados[0].id,
+        }
+
+    def contar(self, url) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def assertQueriesConstantes(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        chico, grande = self.tamanios
+        ids = self.sembrar(chico)
+        presupuesto = {url: self.contar(url.format(**ids)) for url in self.urls}
+        ids = self.sembrar(grande)
+        for url, queries in presupuesto.items():
+            with self.subTest(url=url, staff=user.is_staff), self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url.format(**ids)).status_code, 200)
+
+    def test_queries_constantes_owner(self):
+        self.assertQueriesConstantes(self.user)
+
+    def test_queries_constantes_staff(self):
+        if not self.medir_staff:
+            self.skipTest("el viewset no lista de más para staff")
+        self.assertQueriesConstantes(self.staff)
+
+    def test_queries_constantes_camino_serializer(self):
+        with _camino_serializer():
+            self.assertQueriesConstantes(self.user)
+
+
+class PresupuestoQueriesTests(PresupuestoQueriesMixin, TestCase):
+    urls = (
+        "/api/estados-lead/",
+        "/api/estados-lead/{estado}/",
+        "/api/contactos/",
+        "/api/contactos/?cursor=",
+        "/api/contactos/?q=n1",
+        "/api/contactos/?ordering=proximo_contacto_estado",
+        "/api/contactos/?fields=id,nombre&expand=estado",
+        "/api/contactos/avisos/",
+        "/api/contactos/{contacto}/",
+        "/api/contactos/{contacto}/estado-historial/",
+        "/api/eventos/",
+        "/api/eventos/?cursor=",
+        "/api/eventos/{evento}/",
+    )
+
+
+# === ETag / 304 de los listados (leads/versiones.py) ===
+@override_settings(VERSIONES_EN_CACHE=True)
+class ListadoETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.staff = User.objects.create_user("staff", "staff@x.com", "x", is_staff=True)
+        Contacto.objects.create(owner=cls.user, nombre="Juan")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def etag(self):
+        response = self.client.get("/api/contactos/")
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_304_sin_sql(self):
+        etag = self.etag()
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/contactos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_escritura_cambia_el_etag(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            Contacto.objects.create(owner=self.user, nombre="Ana")
+        response = self.client.get("/api/contactos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_contacto_sin_owner_cambia_el_etag_de_staff(self):
+        self.client.force_authenticate(self.staff)
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            Contacto.objects.create(owner=None, nombre="Huérfano")
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_imagen_versiona_su_propiedad_sin_releerla(self):
+        propiedad = _propiedad(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            PropiedadImagen.objects.create(propiedad=propiedad, imagen="propiedades/0.jpg")
+        response = self.client.get("/api/propiedades/")
+        etag = response["ETag"]
+
+        with mock.patch("leads.versiones.incrementar") as incrementar, CaptureQueriesContext(connection) as ctx:
+            PropiedadImagen.objects.create(propiedad=propiedad, imagen="propiedades/1.jpg")  # relación en cache
+        incrementar.assert_called_once_with(self.user.pk, "propiedades")
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith("SELECT")])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropiedadImagen.objects.filter(imagen="propiedades/0.jpg").get().delete()  # sin la relación: la lee
+        self.assertNotEqual(self.client.get("/api/propiedades/")["ETag"], etag)
+
+    def test_imagenes_en_cascada_no_versionan_de_nuevo(self):
+        propiedad = _propiedad(self.user)
+        PropiedadImagen.objects.bulk_create(
+            PropiedadImagen(propiedad=propiedad, imagen=f"propiedades/{k}.jpg") for k in range(3)
+        )
+        with mock.patch("leads.versiones.incrementar") as incrementar:
+            propiedad.delete()
+        incrementar.assert_called_once_with(self.user.pk, "propiedades")  # el de la propiedad
+
+    @override_settings(VERSIONES_EN_CACHE=False)
+    def test_sin_cache_compartido_no_hay_etag(self):
+        response = self.client.get("/api/contactos/", HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
+# === Reservas de agenda (EventoViewSet.perform_create / perform_update) ===
+def _propiedad(owner, codigo="P1"):
+    return Propiedad.objects.create(
+        owner=owner, codigo=codigo, titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1, superficie=1
+    )
+
+
+def _manana(hora, minuto=0):
+    dia = timezone.localdate() + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(dia, dt_time(hora, minuto)))
+
+
+class EventoAgendaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.propiedad = _propiedad(cls.user)
+        cls.evento = Evento.objects.create(
+            owner=cls.user, propiedad=cls.propiedad, tipo="Visita", fecha_hora=_manana(10), duracion_min=60
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def reservar(self, inicio, duracion=60):
+        return self.client.post("/api/eventos/", {
+            "propiedad": self.propiedad.id, "tipo": "Visita", "fecha_hora": inicio.isoformat(), "duracion_min": duracion,
+        })
+
+    def test_solapamiento_y_duplicado(self):
+        for inicio in (_manana(10), _manana(10, 30), _manana(9, 30)):
+            with self.subTest(inicio=inicio):
+                response = self.reservar(inicio)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("non_field_errors", response.json())
+        self.assertEqual(self.reservar(_manana(11)).status_code, 201)  # contiguo
+        self.assertEqual(self.reservar(_manana(9), duracion=60).status_code, 201)
+
+    def test_update_ignora_el_propio_evento(self):
+        response = self.client.patch(f"/api/eventos/{self.evento.id}/", {"fecha_hora": _manana(10, 15).isoformat()})
+        self.assertEqual(response.status_code, 200)
+
+    def test_un_solo_chequeo_de_solapamiento_por_request(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.reservar(_manana(10, 30)).status_code, 400)
+        chequeos = [q for q in ctx.captured_queries if '"fecha_fin" >' in q["sql"] or "`fecha_fin` >" in q["sql"]]
+        self.assertEqual(len(chequeos), 1)
+
+
+def _solapados_con_anotacion(propiedad, inicio):
+    """Lo que había antes de fecha_fin: el fin calculado en la query (no sargable)."""
+    fin = inicio + timedelta(minutes=DEFAULT_EVENT_DURATION_MIN)
+    return Evento.objects.annotate(
+        fin=ExpressionWrapper(
+            F("fecha_hora") + Value(timedelta(minutes=DEFAULT_EVENT_DURATION_MIN)), output_field=DateTimeField()
+        )
+    ).filter(propiedad=propiedad, fecha_hora__lt=fin, fin__gt=inicio)
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class SolapamientosBenchmark(TestCase):
+    """Chequeo de solapamiento en una propiedad con CRMINM_BENCH_N eventos (50k): rango sobre el índice vs fin anotado."""
+
+    def test_50k_eventos_por_propiedad(self):
+        n = int(os.environ.get("CRMINM_BENCH_N", 50_000))
+        user = User.objects.create_user("bench")
+        propiedad = _propiedad(user)
+        desde = _manana(8)
+        Evento.objects.bulk_create(
+            (
+                Evento(owner=user, propiedad=propiedad, tipo="Visita", fecha_hora=desde + timedelta(minutes=90 * i),
+                       duracion_min=60, fecha_fin=desde + timedelta(minutes=90 * i + 60))
+                for i in range(n)
+            ),
+            batch_size=5000,
+        )
+        # mitad chocan (mitad del evento i), mitad caen en el hueco entre dos eventos
+        rnd = random.Random(0)
+        inicios = [desde + timedelta(minutes=90 * rnd.randrange(n) + rnd.choice((30, 60))) for _ in range(50)]
+
+        plan = eventos_solapados(propiedad, inicios[0]).explain()
+        self.assertIn(_indice(Evento, "propiedad", "fecha_hora", "fecha_fin"), plan)
+
+        rango = _cronometrar(lambda: [conflicto_de_agenda(propiedad, i) for i in inicios], veces=5) / len(inicios)
+        anotado = _cronometrar(
+            lambda: [list(_solapados_con_anotacion(propiedad, i).values_list("fecha_hora", flat=True)[:20]) for i in inicios],
+            veces=1,
+        ) / len(inicios)
+        self.assertEqual(
+            [conflicto_de_agenda(propiedad, i) is None for i in inicios],
+            [not _solapados_con_anotacion(propiedad, i).exists() for i in inicios],
+        )
+        print(f"\n{n} eventos en una propiedad: conflicto_de_agenda {rango:.2f} ms, fin anotado {anotado:.2f} ms por chequeo")
+        self.assertLess(rango * 10, anotado)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ReservasConcurrentesTests(TransactionTestCase):
+    """
+    Reservas simultáneas desde varios threads (cada uno con su conexión). Requiere una DB
+    con SELECT ... FOR UPDATE (MySQL): en SQLite el lock no existe y es la propia DB la que
+    serializa las escrituras, con errores de "database is locked" en lugar de un 400.
+    """
+    hilos = 16
+
+    def setUp(self):
+        self.user = User.objects.create_user("agente", "agente@x.com", "x")
+
+    def reservar_en_paralelo(self, reservas):
+        """POST de cada (propiedad_id, inicio) desde un pool de threads => [status_code]."""
+        largada = threading.Event()
+
+        def reservar(reserva):
+            propiedad_id, inicio = reserva
+            largada.wait(5)  # la primera tanda (un request por thread) sale a la vez
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                return client.post("/api/eventos/", {
+                    "propiedad": propiedad_id, "tipo": "Visita", "fecha_hora": inicio.isoformat(), "duracion_min": 60,
+                }).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.hilos) as pool:
+            resultados = pool.map(reservar, reservas)
+            largada.set()
+            return list(resultados)
+
+    def test_mismo_horario_una_sola_reserva(self):
+        propiedad = _propiedad(self.user)
+        codigos = self.reservar_en_paralelo([(propiedad.id, _manana(10))] * 200)
+        self.assertEqual(codigos.count(201), 1)
+        self.assertEqual(codigos.count(400), 199)
+        self.assertEqual(Evento.objects.filter(propiedad=propiedad).count(), 1)
+
+    def test_sin_solapamientos(self):
+        propiedades = [_propiedad(self.user, f"P{i}") for i in range(4)]
+        # cada propiedad: inicios cada 20 minutos durante 10 horas => muchos choques de a pares
+        reservas = [(p.id, _manana(8) + timedelta(minutes=20 * i)) for p in propiedades for i in range(30)]
+        random.Random(0).shuffle(reservas)
+        inicio = time.perf_counter()
+        codigos = self.reservar_en_paralelo(reservas)
+        segundos = time.perf_counter() - inicio
+        self.assertEqual(set(codigos), {201, 400})
+
+        for p in propiedades:
+            eventos = list(Evento.objects.filter(propiedad=p).order_by("fecha_hora").values_list("fecha_hora", "fecha_fin"))
+            for (_, fin), (siguiente, _) in zip(eventos, eventos[1:]):
+                self.assertLessEqual(fin, siguiente)
+        if BENCH:
+            print(f"\n{len(reservas)} reservas en {segundos:.2f} s ({len(reservas) / segundos:.0f}/s), "
+                  f"{codigos.count(201)} aceptadas")
+
+
+# === Derivados de seguimiento en la DB (leads/seguimiento.py) vs las properties del modelo ===
+class SeguimientoAnotadoTests(TestCase):
+    """Bordes de medianoche local. TIME_ZONE (Córdoba) no tiene horario de verano: cada día dura 24 h."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.hoy = datetime(2026, 3, 10)
+        inicio_hoy, inicio_manana = cortes_del_dia(timezone.make_aware(cls.hoy))
+        assert inicio_manana - inicio_hoy == timedelta(days=1)
+        us = timedelta(microseconds=1)
+        dia = timedelta(days=1)
+        # Un NULL en cada columna: next_contact_at distintos => orden sin empates
+        proximos = [
+            inicio_hoy - 3 * dia, inicio_hoy - us, inicio_hoy, inicio_manana - us, inicio_manana,
+            inicio_manana + dia - us, inicio_manana + dia, inicio_manana + 9 * dia + timedelta(hours=12), None,
+        ]
+        ultimos = [
+            inicio_hoy, inicio_hoy - us, None, inicio_hoy - dia, inicio_manana - us, inicio_hoy - 30 * dia - us,
+            inicio_manana, inicio_hoy - dia - us, inicio_hoy - 365 * dia,
+        ]
+        for i, (proximo, ultimo) in enumerate(zip(proximos, ultimos)):
+            Contacto.objects.create(owner=cls.user, nombre=f"C{i}", next_contact_at=proximo, last_contact_at=ultimo)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def a_las(self, *hora):
+        ahora = timezone.make_aware(datetime.combine(self.hoy.date(), dt_time(*hora)))
+        return mock.patch.object(timezone, "now", return_value=ahora)
+
+    def test_anotacion_igual_a_las_properties(self):
+        for hora in ((0, 0), (0, 0, 0, 1), (12, 0), (23, 59, 59, 999999)):
+            with self.subTest(hora=hora), self.a_las(*hora):
+                anotados = {
+                    c.pk: (c.proximo_contacto_estado, c.dias_sin_seguimiento)
+                    for c in anotar_seguimiento(Contacto.objects.filter(owner=self.user))
+                }
+                # Instancias sin anotar: las properties calculan en Python
+                esperado = {
+                    c.pk: (c.proximo_contacto_estado, c.dias_sin_seguimiento)
+                    for c in Contacto.objects.filter(owner=self.user)
+                }
+                self.assertEqual(anotados, esperado)
+        self.assertEqual(
+            sorted(estado for estado, _ in esperado.values()),
+            sorted(["Vencido", "Vencido", "Vence hoy", "Vence hoy", "Próximo en 1 día", "Próximo en 1 día",
+                    "Próximo en 2 días", "Próximo en 10 días", "Pendiente / Por definir"]),
+        )
+
+    def test_ordering(self):
+        with self.a_las(12, 0):
+            contactos = list(Contacto.objects.filter(owner=self.user))
+            urgencia = ["Vencido", "Vence hoy", "Próximo", "Pendiente"]
+            por_estado = sorted(
+                contactos,
+                key=lambda c: ([u in c.proximo_contacto_estado for u in urgencia].index(True), c.next_contact_at or 0),
+            )
+            for signo, orden in (("", por_estado), ("-", por_estado[::-1])):
+                response = self.client.get("/api/contactos/", {"ordering": f"{signo}proximo_contacto_estado"})
+                self.assertEqual(_ids(response), [c.pk for c in orden])
+
+            # dias_sin_seguimiento: NULL primero (como en SQL)
+            dias = sorted((c.dias_sin_seguimiento for c in contactos), key=lambda d: (d is not None, d))
+            for signo, orden in (("", dias), ("-", dias[::-1])):
+                response = self.client.get("/api/contactos/", {"ordering": f"{signo}dias_sin_seguimiento"})
+                self.assertEqual([c["dias_sin_seguimiento"] for c in response.json()["results"]], orden)
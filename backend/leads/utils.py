@@ -0,0 +1,43 @@
+# leads/utils.py
+from datetime import datetime, time as dt_time
+
+from django.utils import timezone
+
+
+# ---------- Helpers de fecha/hora (sin dependencias externas) ----------
+def to_local_aware(dt: datetime) -> datetime:
+    """Asegura datetimes conscientes en la tz local."""
+    if dt.tzinfo is None:
+        return timezone.make_aware(dt)
+    return timezone.localtime(dt)
+
+
+def parse_date_or_datetime(s: str, end_of_day: bool = False) -> datetime | None:
+    """
+    Admite:
+      - 'YYYY-MM-DD'  -> 00:00 (o fin de día si end_of_day=True)
+      - ISO parcial/total 'YYYY-MM-DDTHH:MM[:SS]' (sin tz): se asume local tz
+      - ISO con tz: se normaliza a tz local
+    """
+    if not s:
+        return None
+    s = s.strip()
+    # Solo fecha
+    if len(s) == 10 and s[4] == "-" and s[7] == "-":
+        try:
+            d = datetime.strptime(s, "%Y-%m-%d").date()
+            base = datetime.combine(d, dt_time.max if end_of_day else dt_time.min)
+            return to_local_aware(base)
+        except Exception:
+            return None
+    # ISO con hora (permite sin segundos)
+    try:
+        dt = datetime.fromisoformat(s)
+        return to_local_aware(dt)
+    except Exception:
+        # Intento sin tz HH:MM
+        try:
+            dt = datetime.strptime(s, "%Y-%m-%d %H:%M")
+            return to_local_aware(dt)
+        except Exception:
+            return None
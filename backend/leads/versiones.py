@@ -0,0 +1,124 @@
+# leads/versiones.py
+"""
+Versiones de datos por owner y recurso (en el Django cache), para saber sin tocar la DB
+si un listado puede haber cambiado.
+
+- Cada escritura (signals; el import las sube a mano) incrementa la versión de
+  (owner, recurso) y la de (TODOS, recurso) al confirmarse la transacción.
+- Lo compartido entre tenants (estados) y los registros sin owner van con owner GLOBAL.
+- Si el cache pierde una versión, se regenera con la hora actual: nunca vuelve a un
+  valor que ya se usó.
+- Solo valen si todos los procesos ven el mismo cache (settings.VERSIONES_EN_CACHE, que
+  por defecto exige CACHE_URL): con LocMemCache cada worker tendría sus propias
+  versiones y respondería 304 con datos viejos. Si no, ETag y snapshots se apagan.
+
+Lo usan los listados con ETag (ETagListMixin) y los snapshots del dashboard.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+# Owner "todos" (listados de staff, que ven todo) y owner de lo compartido
+TODOS = "todos"
+GLOBAL = "global"
+
+
+def habilitadas() -> bool:
+    """Si hay cache compartido: versiones, ETag, snapshots y métricas cacheadas se pueden usar."""
+    return settings.VERSIONES_EN_CACHE
+
+
+def _clave(owner_id, recurso) -> str:
+    return f"versiones:{owner_id}:{recurso}"
+
+
+def actuales(pares) -> list:
+    """Versiones de [(owner_id, recurso), ...] (una lectura del cache si ya existen)."""
+    claves = [_clave(*par) for par in pares]
+    valores = cache.get_many(claves)
+    resultado = []
+    for clave in claves:
+        v = valores.get(clave)
+        if v is None:
+            cache.add(clave, time.time_ns(), None)
+            v = cache.get(clave, 0)
+        resultado.append(v)
+    return resultado
+
+
+def _incrementar(claves):
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            pass  # no estaba: la próxima lectura la regenera
+
+
+def incrementar(owner_id, *recursos):
+    """
+    Nueva versión de esos recursos del owner (y de TODOS) al confirmarse la transacción.
+    Sin owner (registros huérfanos, que solo ve staff) sube la GLOBAL.
+    """
+    if owner_id is None:
+        owner_id = GLOBAL
+    owners = (owner_id,) if owner_id == GLOBAL else (owner_id, TODOS)
+    claves = [_clave(o, r) for r in recursos for o in owners]
+    transaction.on_commit(lambda: _incrementar(claves))
+
+
+# =========================
+# Listados con ETag / 304
+# =========================
+def _if_none_match(request) -> set[str]:
+    header = request.headers.get("If-None-Match", "")
+    return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+
+class ETagListMixin:
+    """
+    GET de listado con ETag: versión de los recursos de los que depende + usuario +
+    query params (+ el día, si hay derivados por fecha). Con If-None-Match igual se
+    responde 304 antes de armar el queryset (sin SQL más allá de la autenticación).
+
+    - etag_recursos: recursos del owner que cambian el listado ("estados" es GLOBAL).
+    - etag_por_dia: el listado depende de la fecha de hoy (vencimientos, días sin seguimiento).
+    """
+    etag_recursos = ()
+    etag_por_dia = False
+
+    def listado_etag(self, request) -> str:
+        user = request.user
+        owner = TODOS if (user.is_staff or user.is_superuser) else user.pk
+        pares = [(GLOBAL if r == "estados" else owner, r) for r in self.etag_recursos]
+        if owner == TODOS:  # staff ve también los registros sin owner
+            pares += [(GLOBAL, r) for r in self.etag_recursos if r != "estados"]
+        partes = [
+            request.path,
+            sorted(request.query_params.lists()),
+            getattr(request, "accepted_media_type", ""),
+            owner,
+            actuales(pares),
+            timezone.localdate().isoformat() if self.etag_por_dia else "",
+        ]
+        return 'W/"{}"'.format(hashlib.md5(repr(partes).encode(), usedforsecurity=False).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        if not habilitadas():
+            return super().list(request, *args, **kwargs)
+        etag = self.listado_etag(request)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        vistos = _if_none_match(request)
+        if etag in vistos or "*" in vistos:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for k, v in headers.items():
+                response[k] = v
+        return response
@@ -1,6 +1,7 @@
 # leads/views.py
 from datetime import datetime, timedelta, time as dt_time
-from django.db.models import Q, F, ExpressionWrapper, DateTimeField, Value
+from django.db.models import Q, F, Value, Count, Case, When, IntegerField, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from django.db import transaction
 
@@ -9,55 +10,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField as DateTimeSerializerField
+from rest_framework.settings import api_settings
 
-from .models import EstadoLead, Contacto, Evento, EstadoLeadHistorial
+from .models import (
+    EstadoLead, Contacto, Evento, EstadoLeadHistorial,
+    DEFAULT_EVENT_DURATION_MIN, bloquear_agenda, conflicto_de_agenda,
+)
 from .serializers import (
     EstadoLeadSerializer,
     ContactoSerializer,
     EventoSerializer,
     EstadoLeadHistorialSerializer,
 )
-
-# Duración por defecto de un evento en minutos (ajustable)
-DEFAULT_EVENT_DURATION_MIN = 60
-
-# ---------- Helpers de fecha/hora (sin dependencias externas) ----------
-def _to_local_aware(dt: datetime) -> datetime:
-    """Asegura datetimes conscientes en la tz local."""
-    if dt.tzinfo is None:
-        return timezone.make_aware(dt)
-    return timezone.localtime(dt)
-
-def _parse_date_or_datetime(s: str, end_of_day: bool = False) -> datetime | None:
-    """
-    Admite:
-      - 'YYYY-MM-DD'  -> 00:00 (o fin de día si end_of_day=True)
-      - ISO parcial/total 'YYYY-MM-DDTHH:MM[:SS]' (sin tz): se asume local tz
-      - ISO con tz: se normaliza a tz local
-    """
-    if not s:
-        return None
-    s = s.strip()
-    # Solo fecha
-    if len(s) == 10 and s[4] == "-" and s[7] == "-":
-        try:
-            d = datetime.strptime(s, "%Y-%m-%d").date()
-            base = datetime.combine(d, dt_time.max if end_of_day else dt_time.min)
-            return _to_local_aware(base)
-        except Exception:
-            return None
-    # ISO con hora (permite sin segundos)
-    try:
-        dt = datetime.fromisoformat(s)
-        return _to_local_aware(dt)
-    except Exception:
-        # Intento sin tz HH:MM
-        try:
-            dt = datetime.strptime(s, "%Y-%m-%d %H:%M")
-            return _to_local_aware(dt)
-        except Exception:
-            return None
-
+from .search import search_contactos
+from .seguimiento import (
+    ORDEN_HOY, ORDEN_PENDIENTE, ORDEN_PROXIMO, ORDEN_VENCIDO, anotar_seguimiento, cortes_del_dia,
+)
+from .pagination import OptInKeysetPagination
+from .versiones import ETagListMixin
+from .campos import CamposListMixin
+from .utils import parse_date_or_datetime
 
 # ---------- Mixin multi-tenant ----------
 class OwnedQuerysetMixin:
@@ -87,25 +60,27 @@ class EstadoLeadViewSet(viewsets.ModelViewSet):
 
 
 # === Contactos ===
-class ContactoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
-    queryset = Contacto.objects.all().order_by("-id")
+class ContactoViewSet(ETagListMixin, CamposListMixin, OwnedQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Contacto.objects.all().select_related("estado").order_by("-id")  # estado_detalle
     serializer_class = ContactoSerializer
+    pagination_class = OptInKeysetPagination  # ?cursor= para paginar sin COUNT/OFFSET
+    etag_recursos = ("contactos", "estados")  # estado_detalle
+    etag_por_dia = True  # proximo_contacto_estado, dias_sin_seguimiento, ?vencimiento=
+    campos_expandibles = {"estado": "estado_detalle"}  # ?fields=...&expand=estado
 
     # --------- Búsqueda / Filtros / Orden ----------
     def get_queryset(self):
-        qs = super().get_queryset()
+        # proximo_contacto_estado / dias_sin_seguimiento calculados en la DB (filtrables y ordenables)
+        qs = anotar_seguimiento(super().get_queryset())
         request = self.request
         params = request.query_params
 
-        # Búsqueda simple
+        # Búsqueda (índice de tokens, ordena por relevancia salvo ?ordering=)
         q = params.get("q")
         if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q)
-                | Q(apellido__icontains=q)
-                | Q(email__icontains=q)
-                | Q(telefono__icontains=q)
-            )
+            user = request.user
+            owner = None if (user.is_staff or user.is_superuser) else user
+            qs = search_contactos(qs, q, owner=owner)
 
         # Filtro por estado
         estado_id = params.get("estado")
@@ -120,25 +95,18 @@ class ContactoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
         except ValueError:
             proximo_en_dias = 3
 
-        now = timezone.localtime()
-        hoy = now.date()
-        manana = hoy + timedelta(days=1)
+        # Mismos cortes de día que la anotación; rangos sobre la columna (índice owner+next_contact_at)
+        inicio_hoy, inicio_manana = cortes_del_dia()
+        hoy = inicio_hoy.date()
         limite_proximo = hoy + timedelta(days=proximo_en_dias)
 
         if vencimiento == "pendiente":
             qs = qs.filter(next_contact_at__isnull=True)
         elif vencimiento == "vencido":
-            qs = qs.filter(
-                next_contact_at__lt=timezone.make_aware(
-                    datetime.combine(hoy, dt_time.min)
-                )
-            )
+            qs = qs.filter(next_contact_at__lt=inicio_hoy)
         elif vencimiento == "hoy":
-            inicio_hoy = timezone.make_aware(datetime.combine(hoy, dt_time.min))
-            fin_hoy = inicio_hoy + timedelta(days=1)
-            qs = qs.filter(next_contact_at__gte=inicio_hoy, next_contact_at__lt=fin_hoy)
+            qs = qs.filter(next_contact_at__gte=inicio_hoy, next_contact_at__lt=inicio_manana)
         elif vencimiento == "proximo":
-            inicio_manana = timezone.make_aware(datetime.combine(manana, dt_time.min))
             fin_limite = timezone.make_aware(
                 datetime.combine(limite_proximo + timedelta(days=1), dt_time.min)
             )
@@ -155,17 +123,20 @@ class ContactoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
             except ValueError:
                 pass
 
-        # Ordenamiento
+        # Ordenamiento (proximo_contacto_estado = por urgencia: vencidos, hoy, próximos, pendientes)
         ordering = params.get("ordering")
-        allowed = {"id", "creado_en", "last_contact_at", "next_contact_at"}
+        allowed = {"id", "creado_en", "last_contact_at", "next_contact_at", "dias_sin_seguimiento"}
         if ordering:
             raw = ordering.split(",")
             safe_fields = []
             for f in raw:
                 f = f.strip()
-                base = f[1:] if f.startswith("-") else f
+                signo = "-" if f.startswith("-") else ""
+                base = f.lstrip("-")
                 if base in allowed:
                     safe_fields.append(f)
+                elif base == "proximo_contacto_estado":
+                    safe_fields += [f"{signo}seguimiento_orden", f"{signo}next_contact_at"]
             if safe_fields:
                 qs = qs.order_by(*safe_fields)
 
@@ -224,44 +195,62 @@ class ContactoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
         except ValueError:
             limit = 50
 
-        now = timezone.localtime()
-        hoy = now.date()
-        inicio_hoy = timezone.make_aware(datetime.combine(hoy, dt_time.min))
-        fin_hoy = inicio_hoy + timedelta(days=1)
-        inicio_manana = fin_hoy
-        fin_proximos = timezone.make_aware(
-            datetime.combine(hoy + timedelta(days=proximo_en_dias + 1), dt_time.min)
-        )
-        borde_sin_seg = hoy - timedelta(days=recordame_cada)
-        borde_sin_seg_dt = timezone.make_aware(datetime.combine(borde_sin_seg, dt_time.min))
-
-        base_qs = self.get_queryset()
+        base_qs = self.get_queryset().order_by()  # ya anotado (leads/seguimiento.py)
+
+        # Condición + orden de cada bucket (mismo criterio que antes), sobre las anotaciones
+        buckets = {
+            "pendientes": (Q(seguimiento_orden=ORDEN_PENDIENTE), F("id").desc()),
+            "vencidos": (Q(seguimiento_orden=ORDEN_VENCIDO), F("next_contact_at").asc()),
+            "vence_hoy": (Q(seguimiento_orden=ORDEN_HOY), F("next_contact_at").asc()),
+            "proximos": (
+                Q(seguimiento_orden=ORDEN_PROXIMO, dias_para_contacto__lte=proximo_en_dias),
+                F("next_contact_at").asc(),
+            ),
+            "sin_seguimiento": (
+                Q(dias_sin_seguimiento__gt=recordame_cada) | Q(last_contact_at__isnull=True),
+                F("last_contact_at").asc(),
+            ),
+        }
 
-        def serialize_subset(qs):
-            qs = qs.only(
-                "id", "nombre", "apellido", "last_contact_at", "next_contact_at", "next_contact_note", "creado_en"
-            )
-            data = ContactoSerializer(qs, many=True, context={"request": request}).data
-            return [
-                {
-                    "id": it["id"],
-                    "nombre": it["nombre"],
-                    "apellido": it["apellido"],
-                    "last_contact_at": it["last_contact_at"],
-                    "next_contact_at": it["next_contact_at"],
-                    "next_contact_note": it["next_contact_note"],
-                    "proximo_contacto_estado": it["proximo_contacto_estado"],
-                    "dias_sin_seguimiento": it["dias_sin_seguimiento"],
-                    "creado_en": it["creado_en"],
-                }
-                for it in data
-            ]
-
-        pendientes_qs = base_qs.filter(next_contact_at__isnull=True).order_by("-id")[:limit]
-        vencidos_qs = base_qs.filter(next_contact_at__lt=inicio_hoy).order_by("next_contact_at")[:limit]
-        hoy_qs = base_qs.filter(next_contact_at__gte=inicio_hoy, next_contact_at__lt=fin_hoy).order_by("next_contact_at")[:limit]
-        proximos_qs = base_qs.filter(next_contact_at__gte=inicio_manana, next_contact_at__lt=fin_proximos).order_by("next_contact_at")[:limit]
-        sin_seg_qs = base_qs.filter(Q(last_contact_at__lt=borde_sin_seg_dt) | Q(last_contact_at__isnull=True)).order_by("last_contact_at")[:limit]
+        # 1) Todos los counts en una sola pasada (agregación condicional)
+        counts = base_qs.aggregate(**{
+            key: Count("id", filter=cond) for key, (cond, _) in buckets.items()
+        })
+
+        # 2) Todos los items en una sola query: row_number() por bucket.
+        #    Cada ventana particiona por "está / no está en el bucket"; nos quedamos con
+        #    las primeras `limit` filas de cada uno (las de la partición "no está" se descartan acá).
+        fields = (
+            "id", "nombre", "apellido", "last_contact_at", "next_contact_at", "next_contact_note", "creado_en",
+            "proximo_contacto_estado", "dias_sin_seguimiento",
+        )
+        annotations = {}
+        for key, (cond, order) in buckets.items():
+            flag = Case(When(cond, then=Value(1)), default=Value(0), output_field=IntegerField())
+            annotations[f"in_{key}"] = flag
+            annotations[f"rn_{key}"] = Window(RowNumber(), partition_by=[flag], order_by=[order, F("id").asc()])
+
+        rows = []
+        if limit > 0:
+            top_q = Q()
+            for key in buckets:
+                top_q |= Q(**{f"rn_{key}__lte": limit})
+            rows = list(base_qs.annotate(**annotations).filter(top_q).values(*fields, *annotations))
+
+        dt_field = DateTimeSerializerField()
+
+        def as_item(row):
+            return {
+                "id": row["id"],
+                "nombre": row["nombre"],
+                "apellido": row["apellido"],
+                "last_contact_at": dt_field.to_representation(row["last_contact_at"]) if row["last_contact_at"] else None,
+                "next_contact_at": dt_field.to_representation(row["next_contact_at"]) if row["next_contact_at"] else None,
+                "next_contact_note": row["next_contact_note"],
+                "proximo_contacto_estado": row["proximo_contacto_estado"],
+                "dias_sin_seguimiento": row["dias_sin_seguimiento"],
+                "creado_en": dt_field.to_representation(row["creado_en"]) if row["creado_en"] else None,
+            }
 
         payload = {
             "params": {
@@ -269,19 +258,20 @@ class ContactoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
                 "proximo_en_dias": proximo_en_dias,
                 "limit": limit,
             },
-            "pendientes": {"count": pendientes_qs.count(), "items": serialize_subset(pendientes_qs)},
-            "vencidos": {"count": vencidos_qs.count(), "items": serialize_subset(vencidos_qs)},
-            "vence_hoy": {"count": hoy_qs.count(), "items": serialize_subset(hoy_qs)},
-            "proximos": {"count": proximos_qs.count(), "items": serialize_subset(proximos_qs)},
-            "sin_seguimiento": {"count": sin_seg_qs.count(), "items": serialize_subset(sin_seg_qs)},
         }
+        for key in buckets:
+            mine = [r for r in rows if r[f"in_{key}"] == 1 and r[f"rn_{key}"] <= limit]
+            mine.sort(key=lambda r: r[f"rn_{key}"])
+            payload[key] = {"count": counts[key], "items": [as_item(r) for r in mine]}
         return Response(payload)
 
 
 # === Eventos ===
-class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
+class EventoViewSet(ETagListMixin, CamposListMixin, OwnedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Evento.objects.all().select_related("contacto", "propiedad").order_by("-fecha_hora", "-id")
     serializer_class = EventoSerializer
+    pagination_class = OptInKeysetPagination  # ?cursor= para paginar sin COUNT/OFFSET
+    etag_recursos = ("eventos", "contactos")  # borrar un contacto deja contacto=NULL sin signal de Evento
 
     # --------- Filtros / Orden para listar agenda (Paso 1) ----------
     def get_queryset(self):
@@ -293,9 +283,9 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
         # - date=YYYY-MM-DD (atajo para todo ese día)
         date_only = p.get("date")
         if date_only and not p.get("from") and not p.get("to"):
-            start = _parse_date_or_datetime(date_only, end_of_day=False)
+            start = parse_date_or_datetime(date_only, end_of_day=False)
             if start:
-                end = _parse_date_or_datetime(date_only, end_of_day=True)
+                end = parse_date_or_datetime(date_only, end_of_day=True)
                 end = end + timedelta(microseconds=1)  # evitar colisión max time
                 qs = qs.filter(fecha_hora__gte=start, fecha_hora__lt=end)
 
@@ -303,16 +293,16 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
             start_s = p.get("from")
             end_s = p.get("to")
             if start_s:
-                start = _parse_date_or_datetime(start_s, end_of_day=False)
+                start = parse_date_or_datetime(start_s, end_of_day=False)
                 if start:
                     qs = qs.filter(fecha_hora__gte=start)
             if end_s:
                 # Si viene solo fecha, interpretamos fin de día (exclusivo -> +1 día)
                 if len(end_s.strip()) == 10:
-                    end = _parse_date_or_datetime(end_s, end_of_day=True)
+                    end = parse_date_or_datetime(end_s, end_of_day=True)
                     end = end + timedelta(microseconds=1)
                 else:
-                    end = _parse_date_or_datetime(end_s, end_of_day=False)
+                    end = parse_date_or_datetime(end_s, end_of_day=False)
                 if end:
                     qs = qs.filter(fecha_hora__lt=end)
 
@@ -345,39 +335,18 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
 
         return qs
 
-    # ---------- Helpers de validación server-side (re-check en DB) ----------
-    def _events_overlapping(self, propiedad, new_start, duration_minutes=DEFAULT_EVENT_DURATION_MIN, ignore_id=None):
-        """
-        Retorna queryset de eventos que solapan con el rango [new_start, new_start + duration).
-        Solo compara eventos de la misma propiedad.
-        """
-        new_start = timezone.localtime(new_start)
-        new_end = new_start + timedelta(minutes=duration_minutes)
-
-        base_qs = Evento.objects.filter(propiedad=propiedad)
-        if ignore_id:
-            base_qs = base_qs.exclude(id=ignore_id)
-
-        # Annotate existing_end = fecha_hora + duration
-        existing_end_expr = ExpressionWrapper(
-            F("fecha_hora") + Value(timedelta(minutes=duration_minutes)),
-            output_field=DateTimeField(),
-        )
-        qs = base_qs.annotate(existing_end=existing_end_expr).filter(
-            fecha_hora__lt=new_end,
-            existing_end__gt=new_start,
-        )
-        return qs
-
     def perform_create(self, serializer):
         """
         Revalidación en transacción para evitar race conditions:
+        - lockea la fila de la propiedad (las reservas concurrentes de la misma
+          propiedad esperan su turno; las de otras propiedades no)
         - evita eventos en el pasado
         - evita duplicado exacto (misma propiedad + misma fecha_hora)
         - evita solapamiento (misma propiedad + interval overlap)
         """
         fecha_hora = serializer.validated_data.get("fecha_hora")
         propiedad = serializer.validated_data.get("propiedad")
+        duracion = serializer.validated_data.get("duracion_min", DEFAULT_EVENT_DURATION_MIN)
         if fecha_hora and propiedad:
             now_local = timezone.localtime(timezone.now())
             fecha_local = timezone.localtime(fecha_hora)
@@ -385,17 +354,11 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
                 raise ValidationError("No se puede crear un evento en el pasado.")
 
             with transaction.atomic():
-                # duplicado exacto
-                dup = Evento.objects.filter(propiedad=propiedad, fecha_hora=fecha_hora).exists()
-                if dup:
-                    raise ValidationError("Ya existe un evento exactamente en esa fecha y hora para la misma propiedad.")
-                # solapamientos
-                overlap_qs = self._events_overlapping(propiedad, fecha_hora)
-                if overlap_qs.exists():
-                    first = overlap_qs.order_by("fecha_hora").first()
-                    raise ValidationError(
-                        f"El horario solapa con otro evento en la misma propiedad (desde {timezone.localtime(first.fecha_hora).isoformat()})."
-                    )
+                bloquear_agenda(propiedad)
+                # duplicado exacto / solapamientos (una sola query por rango)
+                error = conflicto_de_agenda(propiedad, fecha_hora, duracion)
+                if error:
+                    raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [error]})
                 # si todo ok, guardamos con owner (OwnedQuerysetMixin.perform_create)
                 super().perform_create(serializer)
         else:
@@ -404,11 +367,15 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         """
-        Mismo re-check para updates: ignoramos el propio id en la búsqueda.
+        Mismo re-check (y mismo lock sobre la propiedad destino) para updates:
+        ignoramos el propio id en la búsqueda.
         Además valida que no se mueva la fecha a pasado.
         """
         fecha_hora = serializer.validated_data.get("fecha_hora", getattr(serializer.instance, "fecha_hora", None))
         propiedad = serializer.validated_data.get("propiedad", getattr(serializer.instance, "propiedad", None))
+        duracion = serializer.validated_data.get(
+            "duracion_min", getattr(serializer.instance, "duracion_min", None) or DEFAULT_EVENT_DURATION_MIN
+        )
         ignore_id = getattr(serializer.instance, "id", None)
         if fecha_hora and propiedad:
             now_local = timezone.localtime(timezone.now())
@@ -417,17 +384,11 @@ class EventoViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
                 raise ValidationError("No se puede actualizar un evento a una fecha en el pasado.")
 
             with transaction.atomic():
-                # duplicado exacto
-                dup = Evento.objects.filter(propiedad=propiedad, fecha_hora=fecha_hora).exclude(id=ignore_id).exists()
-                if dup:
-                    raise ValidationError("Ya existe un evento exactamente en esa fecha y hora para la misma propiedad.")
-                # solapamientos
-                overlap_qs = self._events_overlapping(propiedad, fecha_hora, ignore_id=ignore_id)
-                if overlap_qs.exists():
-                    first = overlap_qs.order_by("fecha_hora").first()
-                    raise ValidationError(
-                        f"El horario solapa con otro evento en la misma propiedad (desde {timezone.localtime(first.fecha_hora).isoformat()})."
-                    )
+                bloquear_agenda(propiedad)
+                # duplicado exacto / solapamientos (una sola query por rango)
+                error = conflicto_de_agenda(propiedad, fecha_hora, duracion, ignore_id=ignore_id)
+                if error:
+                    raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [error]})
                 super().perform_update(serializer)
         else:
             super().perform_update(serializer)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0003_propiedad_owner_propiedad_vendida_en_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedad',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['owner', 'actualizado_en', 'id'], name='propiedades_owner_i_a1b05c_idx'),
+        ),
+    ]
@@ -2,8 +2,10 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.conf import settings  # <-- NUEVO
 
+from crminm.modelos import ValoresCargadosMixin
 
-class Propiedad(models.Model):
+
+class Propiedad(ValoresCargadosMixin, models.Model):
     TIPO_DE_PROPIEDAD_CHOICES = [
         ("casa", "Casa"),
         ("departamento", "Departamento"),
@@ -69,9 +71,13 @@ class Propiedad(models.Model):
     # ✅ NUEVO: marca de tiempo efectiva de venta (para métricas exactas)
     vendida_en = models.DateTimeField(null=True, blank=True)
 
+    # ✅ última modificación (cursor de /api/exportacion/sync/)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ["-fecha_alta"]
         indexes = [
+            models.Index(fields=["owner", "actualizado_en", "id"]),  # sync incremental
             models.Index(fields=["tipo_de_propiedad"]),
             models.Index(fields=["estado"]),
             models.Index(fields=["disponibilidad"]),
@@ -85,6 +91,12 @@ class Propiedad(models.Model):
             f"{self.tipo_de_propiedad} - {self.estado} - {self.precio} {self.moneda}"
         )
 
+    def save(self, *args, **kwargs):
+        # auto_now solo se guarda si está en update_fields: también en los saves parciales
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "actualizado_en"}
+        super().save(*args, **kwargs)
+
 
 class PropiedadImagen(models.Model):
     propiedad = models.ForeignKey(
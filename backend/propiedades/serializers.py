@@ -12,7 +12,7 @@ class PropiedadImagenSerializer(serializers.ModelSerializer):
 
 class PropiedadSerializer(serializers.ModelSerializer):
     # multi-tenant (solo lectura): id del auth.User dueño
-    owner = serializers.ReadOnlyField(source="owner.id")
+    owner = serializers.ReadOnlyField(source="owner_id")  # la columna: sin cargar el User por fila
     imagenes = PropiedadImagenSerializer(many=True, read_only=True)
 
     class Meta:
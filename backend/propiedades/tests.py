@@ -1,3 +1,146 @@
+import gc
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from leads.agenda import franjas_laborales, slots_por_propiedad
+from leads.models import Evento, eventos_solapados
+from leads.tests import PresupuestoQueriesMixin
+
+from .models import Propiedad
+
+User = get_user_model()
+
+# Benchmarks (lentos, imprimen tiempos): CRMINM_BENCH=1 python manage.py test propiedades
+BENCH = bool(os.environ.get("CRMINM_BENCH"))
+
+
+def _propiedad(owner, codigo):
+    return Propiedad.objects.create(
+        owner=owner, codigo=codigo, titulo="Casa", ubicacion="Centro", disponibilidad="venta", precio=1, superficie=1
+    )
+
+
+def _libres_por_consulta(propiedad, inicio, fin, duracion_min, paso_min):
+    """
+    Lo que había antes del buscador: probar cada horario candidato contra la DB
+    (una query de solapamiento por slot). Devuelve los inicios libres.
+    """
+    libres = []
+    paso, duracion = timedelta(minutes=paso_min), timedelta(minutes=duracion_min)
+    for apertura, cierre in franjas_laborales(inicio, fin):
+        candidato = apertura
+        while candidato + duracion <= cierre:
+            if not eventos_solapados(propiedad, candidato, duracion_min).exists():
+                libres.append(candidato)
+            candidato += paso
+    return libres
+
+
+def _inicios_en(huecos, inicio, fin, duracion_min, paso_min):
+    """Inicios candidatos (cada `paso_min` desde cada apertura) que entran en algún hueco del sweep-line."""
+    paso, duracion = timedelta(minutes=paso_min), timedelta(minutes=duracion_min)
+    inicios = []
+    for apertura, cierre in franjas_laborales(inicio, fin):
+        candidato = apertura
+        while candidato + duracion <= cierre:
+            if any(a <= candidato and candidato + duracion <= b for a, b in huecos):
+                inicios.append(candidato)
+            candidato += paso
+    return inicios
+
+
+# === Huecos libres de agenda (leads/agenda.py, /api/propiedades/.../slots/) ===
+class SlotsTests(TestCase):
+    propiedades = 50
+    dias = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("agente", "agente@x.com", "x")
+        cls.props = [_propiedad(cls.user, f"P{i}") for i in range(cls.propiedades)]
+        # arranca un martes a más de un día de hoy (el buscador no devuelve pasado)
+        dia = timezone.localdate() + timedelta(days=2)
+        while dia.weekday() != 1:
+            dia += timedelta(days=1)
+        cls.desde = dia
+        cls.inicio = timezone.make_aware(datetime.combine(dia, dt_time.min))
+        cls.fin = cls.inicio + timedelta(days=cls.dias)
+        eventos = []
+        for n, p in enumerate(cls.props):
+            for k in range(cls.dias):
+                # duraciones y horarios variados (algunos pegados, algunos fuera de horario)
+                ini = cls.inicio + timedelta(days=k, hours=8 + (k + n) % 11, minutes=15 * (k % 4))
+                eventos.append(Evento(
+                    owner=cls.user, propiedad=p, tipo="Visita", fecha_hora=ini,
+                    fecha_fin=ini + timedelta(minutes=30 + 30 * ((k + n) % 4)),
+                ))
+        Evento.objects.bulk_create(eventos)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_igual_que_probar_cada_slot_contra_la_db(self):
+        fin = self.inicio + timedelta(days=7)
+        for p in self.props[:5]:
+            for duracion in (30, 60, 150):
+                with self.subTest(propiedad=p.codigo, duracion=duracion):
+                    huecos = slots_por_propiedad([p.id], self.inicio, fin, duracion)[p.id]
+                    self.assertEqual(
+                        _inicios_en(huecos, self.inicio, fin, duracion, paso_min=15),
+                        _libres_por_consulta(p, self.inicio, fin, duracion, paso_min=15),
+                    )
+
+    def test_multiples_queries_constantes(self):
+        params = {"from": self.desde.isoformat(), "to": (self.desde + timedelta(days=self.dias - 1)).isoformat()}
+        for ids in (self.props[:5], self.props):
+            with self.subTest(propiedades=len(ids)), self.assertNumQueries(2):  # ids del usuario + eventos
+                response = self.client.get(
+                    "/api/propiedades/slots/", {**params, "ids": ",".join(str(p.id) for p in ids)}
+                )
+            self.assertEqual(len(response.json()["propiedades"]), len(ids))
+
+
+# === Presupuesto de queries (ver leads.tests.PresupuestoQueriesMixin) ===
+class PresupuestoQueriesTests(PresupuestoQueriesMixin, TestCase):
+    urls = (
+        "/api/propiedades/",
+        "/api/propiedades/?cursor=",
+        "/api/propiedades/?fields=id,titulo",
+        "/api/propiedades/?fields=id,imagenes",
+        "/api/propiedades/slots/",
+        "/api/propiedades/{propiedad}/",
+        "/api/propiedades/{propiedad}/slots/",
+    )
+
+
+@skipUnless(BENCH, "benchmark: CRMINM_BENCH=1")
+class SlotsBenchmark(SlotsTests):
+    """Un mes para 50 propiedades: sweep-line (una query) vs una query de solapamiento por slot."""
+
+    def test_mes_50_propiedades(self):
+        params = {"from": self.desde.isoformat(), "to": (self.desde + timedelta(days=self.dias - 1)).isoformat()}
+        self.client.get("/api/propiedades/slots/", params)  # calentar (URLconf, zona horaria)
+        tiempos = []
+        gc.collect()
+        for _ in range(10):
+            inicio = time.perf_counter()
+            self.assertEqual(self.client.get("/api/propiedades/slots/", params).status_code, 200)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        sweep = min(tiempos)  # el mínimo: en una máquina compartida el promedio mide más el ruido que el código
 
-# Create your tests here.
+        inicio = time.perf_counter()
+        for p in self.props:
+            _libres_por_consulta(p, self.inicio, self.fin, 60, paso_min=30)
+        por_slot = (time.perf_counter() - inicio) * 1000
+        print(f"\n{self.dias} días x {self.propiedades} propiedades: sweep-line {sweep:.1f} ms (objetivo < 50), "
+              f"slot por slot {por_slot:.0f} ms")
+        # el absoluto depende de la máquina; lo que no puede pasar es volver a una query por slot
+        self.assertLess(sweep * 50, por_slot)
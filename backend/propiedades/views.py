@@ -1,8 +1,14 @@
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from leads.agenda import parse_rango_y_duracion, slots_por_propiedad
+from leads.campos import CamposListMixin
+from leads.pagination import OptInKeysetPagination
+from leads.versiones import ETagListMixin
+
 from .models import Propiedad, PropiedadImagen
 from .serializers import PropiedadSerializer, SubirImagenesSerializer, PropiedadImagenSerializer
 
@@ -27,9 +33,12 @@ class OwnedQuerysetMixin:
         serializer.save(owner=self.request.user)
 
 
-class PropiedadViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
-    queryset = Propiedad.objects.all()
+class PropiedadViewSet(ETagListMixin, CamposListMixin, OwnedQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Propiedad.objects.all().prefetch_related("imagenes")
     serializer_class = PropiedadSerializer
+    pagination_class = OptInKeysetPagination  # ?cursor= para paginar sin COUNT/OFFSET
+    etag_recursos = ("propiedades",)  # incluye las imágenes
+    campos_expandibles = {"imagenes": "imagenes"}  # con imágenes el listado usa el serializer
 
     @action(detail=True, methods=["post"], url_path="subir-imagenes")
     def subir_imagenes(self, request, pk=None):
@@ -70,3 +79,60 @@ class PropiedadViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
 
         data = PropiedadImagenSerializer(imagenes_subidas, many=True).data
         return Response({"subidas": len(imagenes_subidas), "imagenes": data}, status=status.HTTP_201_CREATED)
+
+    # ---------- Huecos libres de agenda ----------
+    @staticmethod
+    def _slots_payload(slots):
+        # un mes x 50 propiedades son miles de slots: resolver la zona una vez (localtime() la busca en cada llamada)
+        tz = timezone.get_current_timezone()
+        return [{"inicio": ini.astimezone(tz).isoformat(), "fin": fin.astimezone(tz).isoformat()} for ini, fin in slots]
+
+    # GET /api/propiedades/{id}/slots/?from=&to=&duration=
+    @action(detail=True, methods=["get"], url_path="slots")
+    def slots(self, request, pk=None):
+        """
+        Huecos libres (dentro del horario laboral) donde entra un evento de `duration`
+        minutos para la propiedad {pk}, entre `from` y `to`.
+        """
+        if not self.get_queryset().filter(pk=pk).exists():
+            return Response({"detail": "Propiedad no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+
+        inicio, fin, duracion, error = parse_rango_y_duracion(request.query_params)
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        pid = int(pk)
+        libres = slots_por_propiedad([pid], inicio, fin, duracion)[pid]
+        return Response({
+            "propiedad": pid,
+            "from": inicio.isoformat(),
+            "to": fin.isoformat(),
+            "duration": duracion,
+            "slots": self._slots_payload(libres),
+        })
+
+    # GET /api/propiedades/slots/?ids=1,2,3&from=&to=&duration=
+    @action(detail=False, methods=["get"], url_path="slots")
+    def slots_multiples(self, request):
+        """Igual que /{id}/slots/ pero para varias propiedades (todas las del usuario si no hay `ids`)."""
+        inicio, fin, duracion, error = parse_rango_y_duracion(request.query_params)
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        qs = self.get_queryset()
+        raw_ids = request.query_params.get("ids")
+        if raw_ids:
+            try:
+                ids = [int(x) for x in raw_ids.split(",") if x.strip()]
+            except ValueError:
+                return Response({"detail": "Parámetro 'ids' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(pk__in=ids)
+        propiedad_ids = list(qs.order_by("pk").values_list("pk", flat=True)[:200])
+
+        libres = slots_por_propiedad(propiedad_ids, inicio, fin, duracion)
+        return Response({
+            "from": inicio.isoformat(),
+            "to": fin.isoformat(),
+            "duration": duracion,
+            "propiedades": {str(pid): self._slots_payload(libres[pid]) for pid in propiedad_ids},
+        })
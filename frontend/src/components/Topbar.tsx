@@ -2,7 +2,7 @@ import { useEffect, useMemo, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { FiSearch, FiBell, FiAlertCircle, FiCalendar, FiClock } from "react-icons/fi";
 import ThemeToggle from "@/components/ThemeToggle";
-import { api } from "@/lib/api"; 
+import { api, API_BASE } from "@/lib/api"; 
 
 // Helper para formato de fecha con hora (Ej: 15/10/2025 10:00)
 const formatDateWithTime = (d: string | Date) => {
@@ -103,6 +103,8 @@ export default function Topbar({ title }: { title: string }) {
 
     // Variable de referencia para mantener el ID del intervalo activo
     const intervalRef = useRef<number | undefined>(undefined); 
+    // Stream SSE de avisos (push); el intervalo queda solo como fallback
+    const streamRef = useRef<EventSource | null>(null);
 
     // Cerrar popovers al click fuera / Esc
     useEffect(() => {
@@ -241,11 +243,15 @@ export default function Topbar({ title }: { title: string }) {
             // 🔑 CORRECCIÓN CRÍTICA 401: Si el token falla, detenemos el polling
             if (e.response && e.response.status === 401) {
                  setAvisos(null);
-                 // 🛑 Detener el intervalo si falla por 401
+                 // 🛑 Detener el intervalo / stream si falla por 401
                  if (intervalRef.current !== undefined) {
                      clearInterval(intervalRef.current);
                      intervalRef.current = undefined; // Marcar como detenido
                  }
+                 if (streamRef.current) {
+                     streamRef.current.close();
+                     streamRef.current = null;
+                 }
             } else {
                  setErrorAvisos("No se pudieron cargar los avisos.");
                  setAvisos(null);
@@ -257,6 +263,9 @@ export default function Topbar({ title }: { title: string }) {
 
     // 🔑 CLAVE: Control de Polling y Listeners
     useEffect(() => {
+        // false al desmontar: lo que termine después (ticket, reconexión) no abre nada
+        let activo = true;
+
         // Handlers para el evento global de refresco (desde Avisos/index.tsx)
         const handleRefresh = () => {
             if (localStorage.getItem('rc_token')) {
@@ -264,24 +273,78 @@ export default function Topbar({ title }: { title: string }) {
             }
         };
         
-        // 🛑 Función para detener completamente el polling
+        // 🛑 Función para detener completamente el polling / stream
         const stopPolling = () => {
             if (intervalRef.current !== undefined) {
                 clearInterval(intervalRef.current);
                 intervalRef.current = undefined;
             }
+            if (streamRef.current) {
+                streamRef.current.close();
+                streamRef.current = null;
+            }
             window.removeEventListener('avisos:refresh', handleRefresh);
         }
 
+        // Fallback: polling cada 60s (si no hay EventSource o el stream no está disponible)
+        const startInterval = () => {
+            if (activo && intervalRef.current === undefined) {
+                intervalRef.current = window.setInterval(fetchAvisos, 60_000) as unknown as number;
+            }
+        };
+
+        // Push: el backend avisa por SSE cuando cambia algo; recién ahí refrescamos.
+        // Una pestaña inactiva no genera requests.
+        // EventSource no manda headers: pedimos un ticket de un minuto (solo sirve para el
+        // stream) en lugar de poner el JWT en la URL.
+        const startStream = async () => {
+            if (typeof EventSource === "undefined") return false;
+            let ticket: string;
+            try {
+                const res = await api.post(`/avisos/stream/ticket/`);
+                ticket = res.data.ticket;
+            } catch {
+                return false;
+            }
+            if (!activo || !localStorage.getItem('rc_token')) return true; // desmontado / logout mientras tanto
+            const es = new EventSource(`${API_BASE}avisos/stream/?ticket=${encodeURIComponent(ticket)}`);
+            let ready = false;
+            let debounce: number | undefined;
+            es.addEventListener("ready", () => {
+                ready = true;
+            });
+            es.addEventListener("avisos", () => {
+                // Varios cambios seguidos (evento + contacto + aviso) => un solo fetch
+                window.clearTimeout(debounce);
+                debounce = window.setTimeout(fetchAvisos, 500);
+            });
+            es.onerror = () => {
+                // CLOSED = el server rechazó la conexión (401, sin ASGI, etc.)
+                if (es.readyState === EventSource.CLOSED) {
+                    streamRef.current = null;
+                    // Si el stream ya había andado, el ticket venció al reconectar: pedimos otro.
+                    // Si nunca llegó a andar, volvemos al polling.
+                    if (ready) {
+                        fetchAvisos(); // lo que haya cambiado mientras estuvo cortado
+                        startStream().then((ok) => { if (!ok) startInterval(); });
+                    } else {
+                        startInterval();
+                    }
+                }
+            };
+            streamRef.current = es;
+            return true;
+        };
+
         // Función para iniciar el polling
         const startPolling = () => {
              // Detener cualquier polling existente para evitar duplicados
             stopPolling(); 
 
-            if (localStorage.getItem('rc_token')) {
+            const token = localStorage.getItem('rc_token');
+            if (token) {
                 fetchAvisos(); // Carga inicial
-                // Usamos window.setInterval para el entorno web y guardamos el ID
-                intervalRef.current = window.setInterval(fetchAvisos, 60_000) as unknown as number;
+                startStream().then((ok) => { if (!ok) startInterval(); });
                 window.addEventListener('avisos:refresh', handleRefresh);
             } else {
                 // Si no hay token, aseguramos que el estado esté limpio
@@ -294,6 +357,7 @@ export default function Topbar({ title }: { title: string }) {
 
         return () => {
             // Cleanup al desmontar el componente
+            activo = false;
             stopPolling();
         };
     }, []); // Dependencia vacía para montar/desmontar
@@ -95,6 +95,17 @@ export async function fetchPropiedades(params: Record<string, any> = {}) {
   return data.results ?? data;
 }
 
+/** Huecos libres de agenda: [{inicio, fin}] (ISO) dentro del horario laboral */
+export type Slot = { inicio: string; fin: string };
+
+export async function fetchSlots(
+  propiedadId: number,
+  params: { from?: string; to?: string; duration?: number } = {}
+): Promise<Slot[]> {
+  const { data } = await api.get(`propiedades/${propiedadId}/slots/`, { params });
+  return data.slots;
+}
+
 /* ----- Usuarios ----- */
 export type Usuario = {
   id: number;
@@ -122,6 +133,8 @@ export type Evento = {
   propiedad: number;
   tipo: "Reunion" | "Visita" | "Llamada";
   fecha_hora: string; // ISO
+  duracion_min?: number; // default 60
+  fecha_fin?: string; // ISO (read-only, fecha_hora + duracion_min)
   notas?: string;
   creado_en?: string;
 };
@@ -131,6 +144,7 @@ export type EventoCreate = {
   propiedad: number;
   tipo: "Reunion" | "Visita" | "Llamada";
   fecha_hora: string; 
+  duracion_min?: number;
   notas?: string;
 };
 
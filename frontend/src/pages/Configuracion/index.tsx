@@ -37,6 +37,7 @@ type Metrics = {
 
 type ImportResult = {
   resource: string;
+  mode?: "import" | "dry_run" | "validate";
   dry_run: boolean;
   created: number;
   updated: number;
@@ -225,7 +226,8 @@ export default function ConfiguracionPage() {
   }, []);
 
   // Export
-  const [format, setFormat] = useState<"csv" | "json">("csv");
+  const [format, setFormat] = useState<"csv" | "json" | "ndjson">("csv");
+  const [gzip, setGzip] = useState(false);
   const [resLeads, setResLeads] = useState(true);
   const [resProps, setResProps] = useState(true);
   const [resEventos, setResEventos] = useState(false);
@@ -243,6 +245,7 @@ export default function ConfiguracionPage() {
   const [importResource, setImportResource] =
     useState<"leads" | "propiedades" | "eventos">("propiedades");
   const [dryRun, setDryRun] = useState(true);
+  const [validateOnly, setValidateOnly] = useState(false);
   const fileRef = useRef<HTMLInputElement | null>(null);
 
   // Password change
@@ -318,8 +321,10 @@ export default function ConfiguracionPage() {
       if (resources.length === 0)
         throw new Error("Seleccioná al menos un recurso");
 
+      const compress = gzip && format !== "json" ? "gzip" : undefined;
       const payload = {
         format,
+        compress,
         resources,
         filters: {
           year,
@@ -329,9 +334,10 @@ export default function ConfiguracionPage() {
       };
 
       const url = "/api/exportacion/export/";
-      if (format === "csv") {
+      if (format !== "json") {
+        // CSV / NDJSON llegan en streaming (opcionalmente .gz)
         const { data } = await api.post(url, payload, { responseType: "blob" });
-        const fname = `export_${year}_${fmt(month)}.csv`;
+        const fname = `export_${year}_${fmt(month)}.${format}${compress ? ".gz" : ""}`;
         downloadBlob(data, fname);
       } else {
         const { data } = await api.post(url, payload, {
@@ -381,6 +387,7 @@ export default function ConfiguracionPage() {
       form.append("file", file);
       form.append("resource", importResource);
       form.append("dry_run", String(dryRun));
+      if (validateOnly) form.append("mode", "validate");
       const { data } = await api.post<ImportResult>(
         "/api/exportacion/import/",
         form,
@@ -544,6 +551,24 @@ export default function ConfiguracionPage() {
                   />
                   JSON
                 </label>
+                <label className="flex items-center gap-2 text-sm">
+                  <input
+                    type="radio"
+                    name="fmt"
+                    checked={format === "ndjson"}
+                    onChange={() => setFormat("ndjson")}
+                  />
+                  NDJSON
+                </label>
+                <label className="flex items-center gap-2 text-sm">
+                  <input
+                    type="checkbox"
+                    checked={gzip}
+                    disabled={format === "json"}
+                    onChange={(e) => setGzip(e.target.checked)}
+                  />
+                  Comprimir (.gz)
+                </label>
               </div>
             </div>
           </Row>
@@ -668,6 +693,14 @@ export default function ConfiguracionPage() {
               />
               Dry-run (preview sin guardar)
             </label>
+            <label className="flex items-center gap-2 text-sm">
+              <input
+                type="checkbox"
+                checked={validateOnly}
+                onChange={(e) => setValidateOnly(e.target.checked)}
+              />
+              Solo validar (rápido, sin escribir)
+            </label>
             <Button onClick={handleImport} disabled={importLoading}>
               {importLoading ? "Procesando…" : "Procesar"}
             </Button>
@@ -681,7 +714,13 @@ export default function ConfiguracionPage() {
             <div className="mt-4 space-y-2 text-sm">
               <Alert kind={importRes.errors.length ? "info" : "success"}>
                 <div className="font-medium mb-1">
-                  Resultado ({importRes.dry_run ? "preview" : "aplicado"})
+                  Resultado (
+                  {importRes.mode === "validate"
+                    ? "validación"
+                    : importRes.dry_run
+                      ? "preview"
+                      : "aplicado"}
+                  )
                 </div>
                 <div>
                   Creado: <b>{importRes.created}</b> · Actualizado:{" "}
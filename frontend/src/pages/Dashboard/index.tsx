@@ -29,6 +29,8 @@ type DashboardData = {
   ultimos_contactos: { id: number; nombre: string; apellido: string; email: string }[];
   avisos_pendientes: number; 
   avisos_atrasados: number; 
+  // Contactos por estado de seguimiento (día local)
+  seguimiento?: { vencidos: number; vence_hoy: number; proximos: number; pendientes: number };
 };
 
 /** ✅ Ítem de historial de cambios de estado */
@@ -237,7 +239,8 @@ export default function DashboardPage() {
     try {
       const [cRes, pRes, dRes] = await Promise.all([
         api.get("contactos/"),
-        api.get("propiedades/"),
+        // Solo lo que usan los KPIs y el selector (listado sin imágenes ni serializer fila a fila)
+        api.get("propiedades/", { params: { fields: "id,titulo,estado,disponibilidad" } }),
         api.get("dashboard/data/"), 
       ]);
       const toArr = (d: any) => Array.isArray(d) ? d : Array.isArray(d?.results) ? d.results : [];
@@ -397,6 +397,8 @@ export default function LeadsPage() {
           <option value="last_contact_at">Último contacto (asc)</option>
           <option value="-creado_en">Creado (desc)</option>
           <option value="creado_en">Creado (asc)</option>
+          <option value="proximo_contacto_estado">Urgencia de seguimiento</option>
+          <option value="-dias_sin_seguimiento">Días sin seguimiento (desc)</option>
         </select>
       </div>
 